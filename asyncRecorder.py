@@ -0,0 +1,193 @@
+"""asyncio API for embedding recording and replay in a service.
+
+    async with Recorder() as recorder:
+        async for event in recorder:  # finished events as they are captured
+            ...
+            await recorder.stop()  # or from another task; the loop then ends
+
+    telemetry = await replay('keyboard_recording.mrec', speed=2.0)
+
+Capture still needs the pynput listener threads, but events are handed to
+the loop as they finish and stopping runs off it. Replay runs entirely on
+the loop through AsyncDeadlineScheduler, so any number of replays and
+captures share one loop without a thread per timer. Cancelling a replay
+task stops it and releases everything it was holding.
+"""
+import asyncio
+
+from keyNames import resolve_button, resolve_key
+from replayPipeline import iter_replay_events
+from replayPlan import ReplayPlan, compile_plan
+from replayScheduler import AsyncDeadlineScheduler
+from replayTelemetry import MOVE, PRESS, RELEASE, SCROLL, ReplayTelemetry
+
+_DONE = object()
+
+
+class Recorder:
+    """Records while open; iterating it yields every finished event until it stops.
+
+    Keyword arguments are passed to InputRecorder, or pass recorder= to
+    use an existing one.
+    """
+
+    def __init__(self, recorder=None, **options):
+        self.recorder = recorder
+        self.options = options
+        self.queue = asyncio.Queue()
+        self.loop = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    @property
+    def is_recording(self):
+        return self.recorder is not None and self.recorder.is_recording
+
+    @property
+    def events(self):
+        """Everything recorded so far"""
+        return self.recorder.recorded_keys
+
+    async def start(self):
+        if self.recorder is None:
+            # Imported here so replay-only services never load pynput listeners
+            from inputRecorder import InputRecorder
+            self.recorder = InputRecorder(**self.options)
+        self.loop = asyncio.get_running_loop()
+        self.recorder.event_listeners.append(self._publish)
+        self.recorder.start_recording()
+
+    def _publish(self, event):
+        # Runs on the recorder's drain thread
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, event)
+
+    async def stop(self):
+        """Stop recording; iteration ends after the last event"""
+        if not self.is_recording:
+            return
+        # Joins the drain thread and saves the recording, so keep it off the loop
+        await self.loop.run_in_executor(None, self.recorder.stop_recording)
+        self.recorder.event_listeners.remove(self._publish)
+        self.queue.put_nowait(_DONE)
+
+    def add_marker(self, label=None):
+        self.recorder.add_marker(label)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        event = await self.queue.get()
+        if event is _DONE:
+            self.queue.put_nowait(_DONE)  # Later iterations end right away too
+            raise StopAsyncIteration
+        return event
+
+
+def load_plan(source):
+    """ReplayPlan for a plan, a recording path, an EventStore or a list of events"""
+    if isinstance(source, ReplayPlan):
+        return source
+    return compile_plan(iter_replay_events(source), resolve_key, resolve_button)
+
+
+async def replay(plan, speed=1.0, backend=None):
+    """Replay a plan (or any recording source) on the running loop; returns its ReplayTelemetry.
+
+    Cancel the task to stop early: keys and buttons still held are released
+    before asyncio.CancelledError propagates. Anything but a ReplayPlan is
+    read and compiled on the default executor, so other tasks keep running.
+    """
+    if not isinstance(plan, ReplayPlan):
+        plan = await asyncio.get_running_loop().run_in_executor(None, load_plan, plan)
+    if backend is None:
+        from outputBackends import PynputBackend
+        backend = PynputBackend()
+    scheduler = AsyncDeadlineScheduler(realtime=backend.realtime)
+    backend.start(scheduler)
+    telemetry = ReplayTelemetry()
+    held_keys = set()
+    held_buttons = set()
+
+    def timed(kind, held=None, item=None):
+        # Times the action once the backend has injected it, then updates what is held
+        deadline = scheduler.current_deadline
+
+        def sent(call_start, latency):
+            telemetry.record(kind, deadline, call_start - scheduler.start_time, latency)
+            if held is not None:
+                held(item)
+        return sent
+
+    def press_key(key, key_str):
+        try:
+            backend.send('press_key', (key,), timed(PRESS, held_keys.add, key))
+        except Exception as e:
+            print(f"Error handling key {key_str}: {str(e)}")
+
+    def release_key(key):
+        try:
+            backend.send('release_key', (key,), timed(RELEASE, held_keys.discard, key))
+        except Exception as e:
+            print(f"Error releasing key {key}: {str(e)}")
+
+    def press_mouse(button, button_name):
+        try:
+            backend.send('press_button', (button,), timed(PRESS, held_buttons.add, button))
+        except Exception as e:
+            print(f"Error handling mouse {button_name}: {str(e)}")
+
+    def release_mouse(button):
+        try:
+            backend.send('release_button', (button,), timed(RELEASE, held_buttons.discard, button))
+        except Exception as e:
+            print(f"Error releasing mouse {button}: {str(e)}")
+
+    def scroll(event):
+        try:
+            if 'dy' in event:
+                backend.send('scroll', (event['dx'], event['dy']), timed(SCROLL))
+            else:
+                # Older recordings only store one tick's direction
+                backend.send('scroll', (0, 1 if event['direction'] == 'up' else -1), timed(SCROLL))
+        except Exception as e:
+            print(f"Error scrolling {event['direction']}: {str(e)}")
+
+    def move_mouse(x, y):
+        try:
+            backend.send('move_to', (x, y), timed(MOVE))
+        except Exception as e:
+            print(f"Error moving mouse to ({x}, {y}): {str(e)}")
+
+    handlers = {
+        'press_key': press_key,
+        'release_key': release_key,
+        'press_mouse': press_mouse,
+        'release_mouse': release_mouse,
+        'scroll': scroll,
+        'move_start': lambda event: None,
+        'move_mouse': move_mouse,
+    }
+    try:
+        await scheduler.run(plan.timeline(handlers, speed), on_tick=backend.flush)
+    finally:
+        # Also runs on cancellation, so nothing stays held down; what is
+        # still queued is injected first so its presses get released too
+        backend.flush()
+        for key in held_keys:
+            try:
+                backend.release_key(key)
+            except Exception:
+                pass
+        for button in held_buttons:
+            try:
+                backend.release_button(button)
+            except Exception:
+                pass
+        backend.close()
+    return telemetry
@@ -0,0 +1,509 @@
+"""Headless benchmark suite for InputRecorder.
+
+Runs on a machine without a display: pynput is replaced by in-memory
+stand-ins for the keyboard/mouse controllers and listeners, and synthetic
+recordings with a realistic mix of keys, clicks, scrolls and mouse moves are
+generated at each requested size. Results are written as JSON so runs can be
+compared across versions:
+
+    python benchmark.py --sizes 1000,10000,100000 --output benchmark_results.json
+"""
+import argparse
+import contextlib
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+KEY_CHARS = 'etaoinshrdlucmfwypvbgkjqxz'
+SPECIAL_KEYS = ('Key.space', 'Key.shift', 'Key.enter', 'Key.backspace', 'Key.ctrl_l')
+
+
+class FakeKeyCode:
+    """Stand-in for pynput.keyboard.KeyCode"""
+
+    def __init__(self, char=None):
+        self.char = char
+
+    @classmethod
+    def from_char(cls, char):
+        return cls(char)
+
+    def __eq__(self, other):
+        return isinstance(other, FakeKeyCode) and other.char == self.char
+
+    def __hash__(self):
+        return hash(self.char)
+
+    def __repr__(self):
+        return repr(self.char)
+
+
+class FakeSpecialKey:
+    """Stand-in for a pynput.keyboard.Key or pynput.mouse.Button member"""
+
+    def __init__(self, name, prefix='Key'):
+        self.name = name
+        self.prefix = prefix
+
+    def __repr__(self):
+        return f'{self.prefix}.{self.name}'
+
+    __str__ = __repr__
+
+
+class FakeKeyNamespace:
+    """Stand-in for pynput.keyboard.Key: any attribute is a special key"""
+
+    def __init__(self):
+        self._members = {}
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if name not in self._members:
+            self._members[name] = FakeSpecialKey(name)
+        return self._members[name]
+
+
+class FakeButton:
+    """Stand-in for pynput.mouse.Button"""
+    left = FakeSpecialKey('left', 'Button')
+    right = FakeSpecialKey('right', 'Button')
+    middle = FakeSpecialKey('middle', 'Button')
+
+
+class FakeKeyboardController:
+    """Counts injected key events instead of sending them to the OS"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def press(self, key):
+        self.calls += 1
+
+    def release(self, key):
+        self.calls += 1
+
+
+class FakeMouseController:
+    """Counts injected mouse events instead of sending them to the OS"""
+
+    def __init__(self):
+        self.calls = 0
+        self._position = (0, 0)
+
+    @property
+    def position(self):
+        return self._position
+
+    @position.setter
+    def position(self, value):
+        self.calls += 1
+        self._position = value
+
+    def press(self, button):
+        self.calls += 1
+
+    def release(self, button):
+        self.calls += 1
+
+    def scroll(self, dx, dy):
+        self.calls += 1
+
+
+class FakeListener:
+    """Listener that never hooks the OS; benchmarks call the callbacks directly"""
+
+    def __init__(self, **callbacks):
+        self.callbacks = callbacks
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def join(self, timeout=None):
+        pass
+
+
+def install_fake_pynput():
+    """Register in-memory pynput modules so inputRecorder imports without a display"""
+    keyboard_module = types.ModuleType('pynput.keyboard')
+    keyboard_module.Key = FakeKeyNamespace()
+    keyboard_module.KeyCode = FakeKeyCode
+    keyboard_module.Controller = FakeKeyboardController
+    keyboard_module.Listener = FakeListener
+    mouse_module = types.ModuleType('pynput.mouse')
+    mouse_module.Button = FakeButton
+    mouse_module.Controller = FakeMouseController
+    mouse_module.Listener = FakeListener
+    package = types.ModuleType('pynput')
+    package.keyboard = keyboard_module
+    package.mouse = mouse_module
+    sys.modules.update({'pynput': package, 'pynput.keyboard': keyboard_module,
+                        'pynput.mouse': mouse_module})
+
+
+def generate_recording(count, seed=0, mix=(0.70, 0.10, 0.05, 0.15)):
+    """Synthetic time-sorted recording of `count` events.
+
+    mix is the share of key presses, clicks, scroll ticks and mouse moves.
+    Typing follows bursts of short gaps with occasional pauses, and moves
+    carry simplified curved paths like real captures.
+    """
+    rng = random.Random(seed)
+    kinds = rng.choices(('key', 'click', 'scroll', 'move'), weights=mix, k=count)
+    events = []
+    t = 0.5
+    x, y = 960, 540
+    for kind in kinds:
+        # Mostly quick succession, sometimes a thinking pause
+        t += rng.expovariate(1 / 0.12) if rng.random() < 0.95 else rng.uniform(1.0, 4.0)
+        press_time = round(t, 6)
+        if kind == 'move':
+            duration = rng.uniform(0.1, 0.8)
+            end_x = min(max(x + rng.randint(-600, 600), 0), 1919)
+            end_y = min(max(y + rng.randint(-400, 400), 0), 1079)
+            bend = rng.uniform(-0.3, 0.3)
+            path = []
+            for i in range(8):
+                f = i / 7
+                path.append([round(duration * f, 6),
+                             int(x + (end_x - x) * f + bend * (end_y - y) * f * (1 - f)),
+                             int(y + (end_y - y) * f - bend * (end_x - x) * f * (1 - f))])
+            distance = math.hypot(end_x - x, end_y - y)
+            events.append({
+                'key': 'mouse_move', 'start_x': x, 'start_y': y, 'end_x': end_x, 'end_y': end_y,
+                'total_distance': distance, 'avg_speed': distance / duration,
+                'direction': math.atan2(end_y - y, end_x - x),
+                'duration': round(duration, 6), 'time': press_time, 'path': path,
+            })
+            x, y = end_x, end_y
+            t += duration
+        elif kind == 'scroll':
+            events.append({'key': 'scroll', 'direction': rng.choice(('up', 'down')),
+                           'press_time': press_time, 'release_time': press_time, 'duration': 0.0})
+        else:
+            if kind == 'click':
+                key = rng.choice(('mouse_left', 'mouse_left', 'mouse_left', 'mouse_right'))
+            elif rng.random() < 0.15:
+                key = rng.choice(SPECIAL_KEYS)
+            else:
+                key = rng.choice(KEY_CHARS)
+            duration = max(0.02, rng.gauss(0.1, 0.03))
+            events.append({'key': key, 'press_time': press_time,
+                           'release_time': round(t + duration, 6), 'duration': round(duration, 6)})
+    return events
+
+
+def callback_stream(events):
+    """Translate a recording back into the raw listener callbacks it came from"""
+    Key = sys.modules['pynput.keyboard'].Key
+    calls = []
+    for event in events:
+        key = event['key']
+        if key == 'mouse_move':
+            for _, x, y in event['path']:
+                calls.append(('on_mouse_move', (x, y)))
+        elif key == 'scroll':
+            calls.append(('on_mouse_scroll', (0, 0, 0, 1 if event['direction'] == 'up' else -1)))
+        elif key.startswith('mouse_'):
+            button = getattr(FakeButton, key[6:])
+            calls.append(('on_mouse_click', (0, 0, button, True)))
+            calls.append(('on_mouse_click', (0, 0, button, False)))
+        else:
+            code = getattr(Key, key[4:]) if key.startswith('Key.') else FakeKeyCode.from_char(key)
+            calls.append(('on_key_press', (code,)))
+            calls.append(('on_key_release', (code,)))
+    return calls
+
+
+@contextlib.contextmanager
+def silenced():
+    """Discard the recorder's console output while measuring"""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def bench_capture(inputRecorder, events, workdir):
+    """Callback throughput on the listener side and drain time at stop"""
+    recorder = inputRecorder.InputRecorder()
+    recorder.output_file = os.path.join(workdir, 'capture.json')
+    recorder.logger.enabled = False
+    calls = callback_stream(events)
+    with silenced():
+        recorder.start_recording()
+        bound = [(getattr(recorder, name), args) for name, args in calls]
+        start = time.perf_counter()
+        for callback, args in bound:
+            callback(*args)
+        callback_time = time.perf_counter() - start
+        stop_time, _ = timed(recorder.stop_recording)
+    stats = recorder.capture_stats
+    return {
+        'callbacks': len(calls),
+        'callbacks_per_second': len(calls) / callback_time if callback_time else None,
+        'mean_callback_us': stats.total_time / stats.callbacks * 1e6 if stats.callbacks else None,
+        'max_callback_us': stats.max_time * 1e6,
+        'buffer_high_water': recorder.capture_ring.high_water,
+        'dropped': recorder.capture_ring.dropped,
+        'stop_seconds': stop_time,
+    }
+
+
+def bench_storage(events, workdir):
+    """Save and load times for every recording format"""
+    import binaryFormat
+    from recordingWriter import read_event_stream
+
+    json_path = os.path.join(workdir, 'bench.json')
+    jsonl_path = os.path.join(workdir, 'bench.jsonl')
+    mrec_path = os.path.join(workdir, 'bench.mrec')
+
+    def save_json():
+        with open(json_path, 'w') as f:
+            json.dump(events, f, indent=2)
+
+    def load_json():
+        with open(json_path) as f:
+            return json.load(f)
+
+    def save_jsonl():
+        with open(jsonl_path, 'w') as f:
+            f.writelines(json.dumps(event) + '\n' for event in events)
+
+    def open_mrec():
+        recording = binaryFormat.BinaryRecording(mrec_path)
+        recording.close()
+
+    def scan_mrec():
+        with binaryFormat.BinaryRecording(mrec_path) as recording:
+            for _ in recording:
+                pass
+
+    results = {}
+    for name, function in (('json_save', save_json), ('json_load', load_json),
+                           ('jsonl_save', save_jsonl),
+                           ('jsonl_load', lambda: read_event_stream(jsonl_path)),
+                           ('mrec_save', lambda: binaryFormat.write_binary(events, mrec_path)),
+                           ('mrec_open', open_mrec), ('mrec_decode_all', scan_mrec)):
+        results[name + '_seconds'], _ = timed(function)
+    for name, path in (('json', json_path), ('jsonl', jsonl_path), ('mrec', mrec_path)):
+        results[name + '_bytes'] = os.path.getsize(path)
+    return results
+
+
+def bench_replay_overhead(inputRecorder, events):
+    """Per-action cost of replay into an in-memory sink at unlimited speed"""
+    from outputBackends import DeferringBackend, MemorySink
+
+    recorder = inputRecorder.InputRecorder(backend=MemorySink())
+    recorder.recorded_keys = events
+    with silenced():
+        elapsed, _ = timed(recorder.replay_recording, countdown=0)
+        deferring = DeferringBackend(MemorySink())
+        deferred_elapsed, _ = timed(recorder.replay_recording, countdown=0, backend=deferring)
+    actions = len(recorder.last_replay_telemetry)
+    return {
+        'actions': actions,
+        'seconds': elapsed,
+        'us_per_action': elapsed / actions * 1e6 if actions else None,
+        'deferred_seconds': deferred_elapsed,
+        'deferred_us_per_action': deferred_elapsed / actions * 1e6 if actions else None,
+        'deferred_calls': deferring.sent,
+        'deferred_moves_coalesced': deferring.coalesced,
+    }
+
+
+def bench_event_store(events):
+    """Memory per event and sort/filter time of EventStore against a list of dicts"""
+    import numpy as np
+    from binaryFormat import KIND_MOVE
+    from eventStore import EventStore
+    from recordingWriter import event_time
+
+    tracemalloc.start()
+    copied = json.loads(json.dumps(events))
+    list_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    tracemalloc.start()
+    store = EventStore.from_events(copied)
+    store_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del copied
+    build_time, store = timed(EventStore.from_events, events)
+
+    # Reverse the order so both sides have real sorting to do
+    backwards = events[::-1]
+    list_sort_time, _ = timed(sorted, backwards, key=event_time)
+    reversed_store = store.take(np.arange(len(store))[::-1])
+    store_sort_time, _ = timed(reversed_store.sort)
+    list_filter_time, _ = timed(lambda: [event for event in events if event['key'] == 'mouse_move'])
+    store_filter_time, _ = timed(lambda: store.filter(store.columns()['kind'] == KIND_MOVE))
+    return {
+        'list_bytes_per_event': list_bytes / len(events) if events else None,
+        'store_bytes_per_event': store_bytes / len(events) if events else None,
+        'build_seconds': build_time,
+        'list_sort_seconds': list_sort_time,
+        'store_sort_seconds': store_sort_time,
+        'list_filter_seconds': list_filter_time,
+        'store_filter_seconds': store_filter_time,
+    }
+
+
+def bench_event_bus(events, capacity=65536):
+    """Publish and read cost of the shared memory event bus"""
+    from eventBus import EventBus, EventBusReader
+
+    name = f"macro_bench_{os.getpid()}"
+    with EventBus(name, capacity) as bus, EventBusReader(name) as reader:
+        publish_time = 0.0
+        read_time = 0.0
+        read = 0
+        # Read after every half lap, like a reader that keeps up
+        step = capacity // 2
+        for i in range(0, len(events), step):
+            chunk = events[i:i + step]
+            elapsed, _ = timed(lambda: [bus.publish(event) for event in chunk])
+            publish_time += elapsed
+            elapsed, received = timed(reader.read)
+            read_time += elapsed
+            read += len(received)
+        kept_up_missed = reader.missed
+        # A reader that never keeps up misses everything but the last lap
+        for event in events:
+            bus.publish(event)
+        reader.read()
+    return {
+        'publish_us_per_event': publish_time / len(events) * 1e6 if events else None,
+        'read_us_per_event': read_time / read * 1e6 if read else None,
+        'missed_keeping_up': kept_up_missed,
+        'missed_lagging': reader.missed - kept_up_missed,
+    }
+
+
+def bench_timing_error(inputRecorder, events, speed_multiplier):
+    """Real-time replay of a short recording, reported as dispatch lateness"""
+    recorder = inputRecorder.InputRecorder()
+    recorder.recorded_keys = events
+    with silenced():
+        recorder.replay_recording(speed_multiplier=speed_multiplier, countdown=0)
+    report = recorder.last_replay_telemetry.report()
+    report.pop('by_type', None)
+    report['speed_multiplier'] = speed_multiplier
+    return report
+
+
+# Runs the command line in a fresh interpreter and reports whether pynput got imported
+STARTUP_SCRIPT = ("import atexit, sys, recordMacro; "
+                  "atexit.register(lambda: 'pynput' in sys.modules and sys.stderr.write('pynput loaded')); "
+                  "recordMacro.main(sys.argv[1:])")
+
+
+def bench_startup(events, workdir, repeats=3):
+    """Wall time of the offline commands, from interpreter start to exit"""
+    source = os.path.join(workdir, 'startup.json')
+    with open(source, 'w') as f:
+        json.dump(events, f)
+    binary = os.path.join(workdir, 'startup.mrec')
+    commands = {
+        'help': ['--help'],
+        'convert': ['convert', source, binary],
+        'analyze': ['analyze', source],
+        'optimize': ['optimize', source, os.path.join(workdir, 'startup_optimized.json')],
+        'diff': ['diff', source, binary],
+    }
+    results = {}
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name, args in commands.items():
+        best = None
+        for _ in range(repeats):
+            start = time.perf_counter()
+            process = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT] + args, cwd=here,
+                                     capture_output=True, text=True)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        results[name] = {
+            'seconds': best,
+            'exit_code': process.returncode,
+            'pynput_loaded': 'pynput loaded' in process.stderr,
+        }
+    return results
+
+
+def git_version():
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], capture_output=True,
+                              text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return None
+
+
+def run(sizes=DEFAULT_SIZES, timing_events=500, timing_speed=20.0, seed=0):
+    install_fake_pynput()
+    import inputRecorder
+
+    results = {
+        'version': git_version(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'sizes': {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        print("Measuring command line startup...", file=sys.stderr)
+        results['startup'] = bench_startup(generate_recording(1000, seed), workdir)
+        for size in sizes:
+            print(f"Benchmarking {size} events...", file=sys.stderr)
+            generate_time, events = timed(generate_recording, size, seed)
+            results['sizes'][str(size)] = {
+                'generate_seconds': generate_time,
+                'capture': bench_capture(inputRecorder, events, workdir),
+                'storage': bench_storage(events, workdir),
+                'replay_overhead': bench_replay_overhead(inputRecorder, events),
+                'event_store': bench_event_store(events),
+                'event_bus': bench_event_bus(events),
+            }
+    print("Measuring replay timing error...", file=sys.stderr)
+    results['timing_error'] = bench_timing_error(
+        inputRecorder, generate_recording(timing_events, seed), timing_speed)
+    return results
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Headless InputRecorder benchmarks")
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+                        help="comma separated recording sizes in events")
+    parser.add_argument('--timing-events', type=int, default=500,
+                        help="events in the real-time timing error run")
+    parser.add_argument('--timing-speed', type=float, default=20.0,
+                        help="speed multiplier of the timing error run")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='benchmark_results.json')
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    results = run(sizes, args.timing_events, args.timing_speed, args.seed)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+"""Compact binary recording format (.mrec).
+
+Layout (all little endian):
+
+    header    HEADER struct, see below
+    keys      interned key/button names: u16 length + utf-8 bytes each
+    records   fixed-width RECORD structs, one per event, in recording order
+              (a-d hold move start/end coordinates, or scroll dx/dy)
+    moves     MOVE structs for mouse_move records (derived speed/direction + path slice)
+    points    POINT structs, the simplified mouse paths
+    extras    u32 length + utf-8 JSON blobs for fields outside the schema
+
+Record start times are delta-encoded in microseconds (64-bit, so pauses of
+any length fit) against the previous record, so the file has to be read
+front to back to recover absolute times; that is what replay and analysis
+do anyway. The file is opened
+through mmap and records are decoded on demand, so opening a recording only
+costs the header and the key table.
+
+Every record is checked on write by decoding it again; anything the fixed
+layout cannot reproduce exactly is kept in the extras blob, and records that
+do not fit the schema at all are stored whole as KIND_RAW. Converting JSON
+to binary and back therefore returns the same events.
+"""
+import argparse
+from array import array
+import itertools
+import json
+import mmap
+import struct
+
+MAGIC = b'MREC'
+VERSION = 3  # 2: scroll dx/dy, 3: 64-bit start deltas
+
+# magic, version, header size, records, keys, moves, points,
+# key/record/move/point/extra section offsets, extra section size
+HEADER = struct.Struct('<4sHHIIII6Q')
+# kind, flags, key id, start delta us, hold us, duration us,
+# a, b, c, d (coordinates), move index, extra offset
+RECORD = struct.Struct('<BBHqIIiiiiII')
+# Versions 1 and 2 stored the start delta in 32 bits (gaps up to ~35 minutes)
+RECORD_V2 = struct.Struct('<BBHiIIiiiiII')
+# total_distance, avg_speed, direction, first point, point count
+MOVE = struct.Struct('<dddII')
+# offset us from movement start, x, y
+POINT = struct.Struct('<iii')
+
+KIND_KEY = 0
+KIND_CLICK = 1
+KIND_SCROLL = 2
+KIND_MOVE = 3
+KIND_RAW = 4  # Whole event stored as JSON in the extras section
+
+FLAG_EXTRA = 0x01
+FLAG_RELEASE = 0x02
+FLAG_SCROLL_UP = 0x04
+FLAG_PATH = 0x08
+FLAG_SCROLL_DELTA = 0x10
+
+PRESS_FIELDS = ('key', 'press_time', 'release_time', 'duration')
+SCROLL_FIELDS = ('key', 'direction', 'dx', 'dy', 'press_time', 'release_time', 'duration')
+MOVE_FIELDS = ('key', 'start_x', 'start_y', 'end_x', 'end_y', 'total_distance',
+               'avg_speed', 'direction', 'duration', 'time', 'path')
+
+
+def to_us(seconds):
+    return int(round(seconds * 1e6))
+
+
+def from_us(us):
+    return us / 1e6
+
+
+def event_start(event):
+    start = event.get('press_time', event.get('time', 0))
+    return start if isinstance(start, (int, float)) else 0
+
+
+class BinaryRecordingWriter:
+    """Builds the sections of a .mrec file from events in recording order"""
+
+    def __init__(self):
+        self.keys = []
+        self.key_ids = {}
+        self.records = bytearray()
+        self.moves = bytearray()
+        self.points = bytearray()
+        self.extras = bytearray()
+        self.record_count = 0
+        self.move_count = 0
+        self.point_count = 0
+        self.last_start_us = 0
+
+    def key_id(self, name):
+        """Intern a key/button name"""
+        if name not in self.key_ids:
+            self.key_ids[name] = len(self.keys)
+            self.keys.append(name)
+        return self.key_ids[name]
+
+    def pack_extra(self, fields):
+        blob = json.dumps(fields).encode('utf-8')
+        return struct.pack('<I', len(blob)) + blob
+
+    def add_extra(self, fields):
+        offset = len(self.extras)
+        self.extras += self.pack_extra(fields)
+        return offset
+
+    def add(self, event):
+        start_us = to_us(event_start(event))
+        record = self.encode(event, start_us)
+        if record is None:
+            record = self.encode_raw(event, start_us)
+        self.records += record
+        self.record_count += 1
+        self.last_start_us = start_us
+
+    def encode(self, event, start_us):
+        """Encode an event in the fixed layout, or return None if it does not fit"""
+        key = event.get('key')
+        if not isinstance(key, str):
+            return None
+        delta = start_us - self.last_start_us
+        # The key is only interned and the extras blob only stored once the
+        # record has been verified, so a KIND_RAW fallback leaves nothing behind
+        key_id = self.key_ids.get(key, len(self.keys))
+        try:
+            if key == 'mouse_move':
+                kind, fields = KIND_MOVE, MOVE_FIELDS
+                flags = FLAG_PATH if 'path' in event else 0
+                path = event.get('path', [])
+                move_index = self.move_count
+                move = MOVE.pack(event['total_distance'], event['avg_speed'], event['direction'],
+                                 self.point_count, len(path))
+                points = b''.join(POINT.pack(to_us(t), x, y) for t, x, y in path)
+                record = [kind, flags, key_id, delta, 0, to_us(event['duration']),
+                          event['start_x'], event['start_y'], event['end_x'], event['end_y'],
+                          move_index, 0]
+            else:
+                if key == 'scroll':
+                    kind, fields = KIND_SCROLL, SCROLL_FIELDS
+                    flags = FLAG_SCROLL_UP if event['direction'] == 'up' else 0
+                elif key.startswith('mouse_'):
+                    kind, fields, flags = KIND_CLICK, PRESS_FIELDS, 0
+                else:
+                    kind, fields, flags = KIND_KEY, PRESS_FIELDS, 0
+                hold = 0
+                if 'release_time' in event:
+                    flags |= FLAG_RELEASE
+                    hold = to_us(event['release_time']) - start_us
+                dx = dy = 0
+                if kind == KIND_SCROLL and 'dy' in event:
+                    flags |= FLAG_SCROLL_DELTA
+                    dx, dy = event['dx'], event['dy']
+                record = [kind, flags, key_id, delta, hold, to_us(event['duration']),
+                          dx, dy, 0, 0, 0, 0]
+                move = points = b''
+            # Anything outside the schema goes into the extras blob
+            extra = {name: value for name, value in event.items() if name not in fields}
+            extra_blob = b''
+            if extra:
+                record[1] |= FLAG_EXTRA
+                record[11] = len(self.extras)
+                extra_blob = self.pack_extra(extra)
+            packed = RECORD.pack(*record)
+        except (KeyError, TypeError, ValueError, struct.error):
+            return None
+
+        # Verify the round trip before committing the key, extras and move/point sections
+        keys = self.keys if key in self.key_ids else self.keys + [key]
+        decoded = decode_record(RECORD.unpack(packed), from_us(start_us), keys,
+                                move and MOVE.unpack(move), points, self.point_count, None)
+        if extra:
+            decoded.update(extra)
+        if decoded != event:
+            return None
+        self.key_id(key)
+        self.extras += extra_blob
+        if move:
+            self.moves += move
+            self.points += points
+            self.move_count += 1
+            self.point_count += len(path)
+        return packed
+
+    def encode_raw(self, event, start_us):
+        key = event.get('key')
+        key_id = self.key_id(key) if isinstance(key, str) else 0
+        return RECORD.pack(KIND_RAW, FLAG_EXTRA, key_id, start_us - self.last_start_us,
+                           0, 0, 0, 0, 0, 0, 0, self.add_extra(event))
+
+    def write(self, path):
+        key_table = bytearray()
+        for name in self.keys:
+            encoded = name.encode('utf-8')
+            key_table += struct.pack('<H', len(encoded)) + encoded
+        key_offset = HEADER.size
+        record_offset = key_offset + len(key_table)
+        move_offset = record_offset + len(self.records)
+        point_offset = move_offset + len(self.moves)
+        extra_offset = point_offset + len(self.points)
+        header = HEADER.pack(MAGIC, VERSION, HEADER.size, self.record_count, len(self.keys),
+                             self.move_count, self.point_count, key_offset, record_offset,
+                             move_offset, point_offset, extra_offset, len(self.extras))
+        with open(path, 'wb') as f:
+            for section in (header, key_table, self.records, self.moves, self.points, self.extras):
+                f.write(section)
+
+
+def decode_record(fields, start, keys, move, points, point_base, extras):
+    """Rebuild an event dict from an unpacked RECORD.
+
+    move is the unpacked MOVE entry for mouse_move records; points holds the
+    POINT bytes starting at point_base; extras the extras section (or None).
+    """
+    kind, flags, key_id, _, hold, duration, a, b, c, d, _, extra_offset = fields
+    if kind == KIND_RAW:
+        return read_extra(extras, extra_offset)
+    if kind == KIND_MOVE:
+        event = {
+            'key': keys[key_id],
+            'start_x': a,
+            'start_y': b,
+            'end_x': c,
+            'end_y': d,
+            'total_distance': move[0],
+            'avg_speed': move[1],
+            'direction': move[2],
+            'duration': from_us(duration),
+            'time': start,
+        }
+        if flags & FLAG_PATH:
+            first = (move[3] - point_base) * POINT.size
+            event['path'] = [[from_us(t), x, y] for t, x, y in
+                             POINT.iter_unpack(points[first:first + move[4] * POINT.size])]
+    else:
+        event = {'key': keys[key_id]}
+        if kind == KIND_SCROLL:
+            event['direction'] = 'up' if flags & FLAG_SCROLL_UP else 'down'
+            if flags & FLAG_SCROLL_DELTA:
+                event['dx'] = a
+                event['dy'] = b
+        event['press_time'] = start
+        if flags & FLAG_RELEASE:
+            event['release_time'] = from_us(to_us(start) + hold)
+        event['duration'] = from_us(duration)
+    if flags & FLAG_EXTRA and extras is not None:
+        event.update(read_extra(extras, extra_offset))
+    return event
+
+
+def read_extra(extras, offset):
+    length, = struct.unpack_from('<I', extras, offset)
+    return json.loads(bytes(extras[offset + 4:offset + 4 + length]).decode('utf-8'))
+
+
+class BinaryRecording:
+    """Memory-mapped .mrec file that decodes events on demand"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        self._view = view
+        (magic, version, _, self.record_count, key_count, self.move_count,
+         self.point_count, key_offset, record_offset, move_offset, point_offset,
+         extra_offset, extra_size) = HEADER.unpack_from(view, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a binary recording")
+        if version > VERSION:
+            raise ValueError(f"{path} uses format version {version}, newer than {VERSION}")
+        self.version = version
+        self.record = RECORD if version >= 3 else RECORD_V2
+        record = self.record
+
+        self.keys = []
+        offset = key_offset
+        for _ in range(key_count):
+            length, = struct.unpack_from('<H', view, offset)
+            self.keys.append(bytes(view[offset + 2:offset + 2 + length]).decode('utf-8'))
+            offset += 2 + length
+
+        self.records = view[record_offset:record_offset + self.record_count * record.size]
+        self.moves = view[move_offset:move_offset + self.move_count * MOVE.size]
+        self.points = view[point_offset:point_offset + self.point_count * POINT.size]
+        self.extras = view[extra_offset:extra_offset + extra_size]
+        self._starts = None
+
+    def __len__(self):
+        return self.record_count
+
+    def start_us(self):
+        """Absolute start of every record in microseconds, computed on first use"""
+        if self._starts is None:
+            self._starts = array('q', itertools.accumulate(
+                fields[3] for fields in self.record.iter_unpack(self.records)))
+        return self._starts
+
+    def __getitem__(self, index):
+        """Decode a single event; records are fixed-width so this is random access"""
+        if index < 0:
+            index += self.record_count
+        if not 0 <= index < self.record_count:
+            raise IndexError("record index out of range")
+        fields = self.record.unpack_from(self.records, index * self.record.size)
+        move = MOVE.unpack_from(self.moves, fields[10] * MOVE.size) if fields[0] == KIND_MOVE else None
+        return decode_record(fields, from_us(self.start_us()[index]), self.keys, move,
+                             self.points, 0, self.extras)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def iter_raw(self):
+        """Yield (absolute start in us, unpacked RECORD fields) without building dicts"""
+        start_us = 0
+        for fields in self.record.iter_unpack(self.records):
+            start_us += fields[3]
+            yield start_us, fields
+
+    def __iter__(self):
+        keys = self.keys
+        moves = self.moves
+        for start_us, fields in self.iter_raw():
+            move = MOVE.unpack_from(moves, fields[10] * MOVE.size) if fields[0] == KIND_MOVE else None
+            yield decode_record(fields, from_us(start_us), keys, move, self.points, 0, self.extras)
+
+    def close(self):
+        for view in (self.records, self.moves, self.points, self.extras, self._view):
+            view.release()
+        self._mmap.close()
+        self._file.close()
+
+
+def write_binary(events, path):
+    """Write events (any iterable of recording dicts) as a .mrec file"""
+    writer = BinaryRecordingWriter()
+    for event in events:
+        writer.add(event)
+    writer.write(path)
+    return writer.record_count
+
+
+def json_to_binary(json_path, binary_path):
+    with open(json_path, 'r') as f:
+        events = json.load(f)
+    return write_binary(events, binary_path)
+
+
+def binary_to_json(binary_path, json_path):
+    with BinaryRecording(binary_path) as recording:
+        events = list(recording)
+    with open(json_path, 'w') as f:
+        json.dump(events, f, indent=2)
+    return len(events)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert recordings between JSON and binary .mrec")
+    parser.add_argument('source')
+    parser.add_argument('destination')
+    args = parser.parse_args()
+    if args.source.endswith('.mrec'):
+        count = binary_to_json(args.source, args.destination)
+    else:
+        count = json_to_binary(args.source, args.destination)
+    print(f"Converted {count} events from {args.source} to {args.destination}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import itertools
+import time
+
+
+class CaptureRing:
+    """Bounded ring of raw capture tuples between listener threads and a drain thread.
+
+    Producers (the pynput listener callbacks) only claim a sequence number and
+    store (seq, item) in the matching slot; claiming via itertools.count is
+    atomic under the GIL, so pushing never takes a lock. A single consumer
+    reads slots in sequence order. When producers get a full lap ahead the
+    oldest items are overwritten; the consumer notices the sequence jump and
+    counts them in `dropped` instead of stalling the listeners.
+    """
+
+    def __init__(self, capacity=65536):
+        self.capacity = capacity
+        self._slots = [None] * capacity
+        self._write_seq = itertools.count()
+        self.read_seq = 0
+        self.dropped = 0
+        self.high_water = 0  # Deepest backlog seen by a producer
+
+    def push(self, item):
+        seq = next(self._write_seq)
+        self._slots[seq % self.capacity] = (seq, item)
+        depth = seq - self.read_seq + 1
+        if depth > self.high_water:
+            self.high_water = depth
+
+    def pop_batch(self, max_items=4096):
+        """Return up to max_items items in capture order"""
+        items = []
+        slots = self._slots
+        capacity = self.capacity
+        while len(items) < max_items:
+            slot = slots[self.read_seq % capacity]
+            if slot is None or slot[0] < self.read_seq:
+                break  # Not written yet
+            seq, item = slot
+            if seq > self.read_seq:
+                # Producers lapped us; everything up to seq - capacity is gone
+                lost = seq - capacity + 1 - self.read_seq
+                self.dropped += lost
+                self.read_seq += lost
+                continue
+            items.append(item)
+            self.read_seq += 1
+        return items
+
+
+class CaptureStats:
+    """Cost of the listener callbacks, for measuring capture overhead"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.callbacks = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.errors = 0  # Captured events the drain thread failed to process
+
+    def add(self, elapsed):
+        self.callbacks += 1
+        self.total_time += elapsed
+        if elapsed > self.max_time:
+            self.max_time = elapsed
+
+    def summary(self, ring=None):
+        """Human readable one-line summary"""
+        avg = self.total_time / self.callbacks if self.callbacks else 0.0
+        text = (f"{self.callbacks} callbacks, avg {avg * 1e6:.1f}us, "
+                f"max {self.max_time * 1e6:.1f}us")
+        if ring is not None:
+            text += f", buffer high-water {ring.high_water}/{ring.capacity}, dropped {ring.dropped}"
+        if self.errors:
+            text += f", {self.errors} failed"
+        return text
+
+
+class EventLogger:
+    """Optional, rate-limited printing of capture events"""
+
+    def __init__(self, enabled=True, max_per_second=20):
+        self.enabled = enabled
+        self.max_per_second = max_per_second  # None means unlimited
+        self.suppressed = 0
+        self._window_start = 0.0
+        self._window_count = 0
+
+    def log(self, message):
+        if not self.enabled:
+            return
+        if self.max_per_second is not None:
+            now = time.monotonic()
+            if now - self._window_start >= 1.0:
+                if self.suppressed:
+                    print(f"... {self.suppressed} capture messages suppressed")
+                    self.suppressed = 0
+                self._window_start = now
+                self._window_count = 0
+            if self._window_count >= self.max_per_second:
+                self.suppressed += 1
+                return
+            self._window_count += 1
+        print(message)
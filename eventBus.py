@@ -0,0 +1,347 @@
+"""Live event bus: captured events in a shared memory ring.
+
+The recorder publishes every finished event into a
+multiprocessing.shared_memory segment that other local processes
+(dashboards, anomaly detectors) attach to by name and follow.
+
+Layout (all little endian):
+
+    header    HEADER struct: magic, version, slot size, capacity, open flag,
+              write sequence, wall clock time the current recording started,
+              process id of the writer
+    slots     `capacity` fixed-width SLOT structs
+
+Event n goes into slot n % capacity. Each slot starts with a stamp, n + 1
+once the slot is complete and 0 while it is being rewritten, and the
+header's write sequence is bumped after the slot. Readers never take a
+lock: they unpack a slot straight from the shared buffer and check the
+stamp again afterwards, so a slot the writer reused mid-read is noticed.
+The writer never waits for anyone; a reader that falls more than a lap
+behind skips ahead and counts the lost events in `missed`.
+
+Fixed-width slots cannot hold mouse paths, so moves carry only their
+endpoints, and names longer than NAME_SIZE bytes are cut short.
+
+Usage: python eventBus.py [--name macro_recorder_bus] [--from-start]
+"""
+import argparse
+import json
+import math
+import os
+import struct
+import threading
+import time
+from multiprocessing import shared_memory
+
+from binaryFormat import FLAG_SCROLL_UP, KIND_CLICK, KIND_KEY, KIND_MOVE, KIND_RAW, KIND_SCROLL
+
+DEFAULT_NAME = 'macro_recorder_bus'
+MAGIC = b'MBUS'
+VERSION = 2  # 2: writer pid
+NAME_SIZE = 28
+
+# magic, version, slot size, capacity, open, write sequence, recording start, writer pid
+HEADER = struct.Struct('<4sHHIIQdI')
+WRITE_SEQ_OFFSET = 16
+START_OFFSET = 24
+OPEN_OFFSET = 12
+# stamp, kind, flags, reserved, key name or marker label,
+# start, end, move distance (seconds/pixels), a-d (move coordinates or scroll dx/dy)
+SLOT = struct.Struct('<QBBH28sdddiiii')
+STAMP = struct.Struct('<Q')
+FLAG = struct.Struct('<I')
+TIME = struct.Struct('<d')
+
+
+def encode_name(name):
+    data = name.encode('utf-8')[:NAME_SIZE]
+    # Do not leave half a character at the cut
+    return data.decode('utf-8', 'ignore').encode('utf-8')
+
+
+def encode_event(event):
+    """(kind, flags, name, start, end, distance, a, b, c, d) of an event"""
+    key = event['key']
+    if key == 'mouse_move':
+        start = event['time']
+        return (KIND_MOVE, 0, b'mouse_move', start, start + event['duration'],
+                event['total_distance'], event['start_x'], event['start_y'],
+                event['end_x'], event['end_y'])
+    if key == 'scroll':
+        flags = FLAG_SCROLL_UP if event['direction'] == 'up' else 0
+        if 'dy' in event:
+            dx, dy = event['dx'], event['dy']
+        else:
+            dx, dy = 0, 1 if flags else -1  # Older recordings hold one tick per event
+        return (KIND_SCROLL, flags, b'scroll', event['press_time'], event['release_time'],
+                0.0, int(dx), int(dy), 0, 0)
+    if key == 'marker':
+        return (KIND_RAW, 0, encode_name(event['label']), event['time'], event['time'],
+                0.0, 0, 0, 0, 0)
+    kind = KIND_CLICK if key.startswith('mouse_') else KIND_KEY
+    return (kind, 0, encode_name(key), event['press_time'], event['release_time'],
+            0.0, 0, 0, 0, 0)
+
+
+def decode_record(record):
+    """Event dict of an unpacked SLOT tuple"""
+    _, kind, flags, _, name, start, end, distance, a, b, c, d = record
+    name = name.rstrip(b'\0').decode('utf-8')
+    if kind == KIND_MOVE:
+        duration = round(end - start, 6)
+        return {
+            'key': 'mouse_move',
+            'start_x': a,
+            'start_y': b,
+            'end_x': c,
+            'end_y': d,
+            'total_distance': distance,
+            'avg_speed': distance / duration if duration > 0 else 0,
+            'direction': math.atan2(d - b, c - a),
+            'duration': duration,
+            'time': start,
+        }
+    if kind == KIND_SCROLL:
+        return {
+            'key': 'scroll',
+            'direction': 'up' if flags & FLAG_SCROLL_UP else 'down',
+            'dx': a,
+            'dy': b,
+            'press_time': start,
+            'release_time': end,
+            'duration': 0.0,
+        }
+    if kind == KIND_RAW:
+        return {'key': 'marker', 'label': name, 'time': start, 'duration': 0.0}
+    return {
+        'key': name,
+        'press_time': start,
+        'release_time': end,
+        'duration': round(end - start, 6),
+    }
+
+
+# Segments created by an EventBus in this process
+_owned = set()
+
+
+def attach(name):
+    """Open an existing segment without taking ownership of it"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        if os.name == 'posix' and name not in _owned:
+            # Older versions unlink every attached segment when the process exits
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Someone else's process
+    return True
+
+
+def live_writer(shm):
+    """Pid of the writer still publishing into an existing segment, or None if it is stale.
+
+    A segment is stale when it is not an event bus, was closed, or its writer
+    process is gone. Anything else counts as in use; for a bus of another
+    version, whose writer cannot be checked, the pid is 0.
+    """
+    if shm.size < HEADER.size:
+        return None
+    magic, version, _, _, is_open, _, _, pid = HEADER.unpack_from(shm.buf, 0)
+    if magic != MAGIC or not is_open:
+        return None
+    if version != VERSION:
+        return 0
+    if os.name == 'posix' and not pid_alive(pid):
+        # Windows frees a segment with its last handle, so only a live writer keeps one
+        return None
+    return pid
+
+
+class EventBus:
+    """Writer side: owns the segment and publishes events into it.
+
+    Only the recorder writes, so publishing is a few struct writes and never
+    waits on readers.
+    """
+
+    def __init__(self, name=DEFAULT_NAME, capacity=65536):
+        self.name = name
+        self.capacity = capacity
+        size = HEADER.size + capacity * SLOT.size
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            existing = attach(name)
+            try:
+                owner = live_writer(existing)
+            finally:
+                existing.close()
+            if owner is not None:
+                raise FileExistsError(f"Event bus {name} is already in use"
+                                      + (f" by process {owner}" if owner else ""))
+            # Left behind by a recorder that did not shut down cleanly
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        _owned.add(name)
+        self.write_seq = 0
+        self.lock = threading.Lock()  # Markers can be published from other threads
+        HEADER.pack_into(self.shm.buf, 0, MAGIC, VERSION, SLOT.size, capacity, 1, 0, 0.0, os.getpid())
+
+    def begin_recording(self, started=None):
+        """Tell readers a new recording started; event times are relative to it"""
+        TIME.pack_into(self.shm.buf, START_OFFSET, time.time() if started is None else started)
+
+    def publish(self, event):
+        fields = encode_event(event)
+        buf = self.shm.buf
+        with self.lock:
+            seq = self.write_seq
+            offset = HEADER.size + (seq % self.capacity) * SLOT.size
+            STAMP.pack_into(buf, offset, 0)
+            SLOT.pack_into(buf, offset, 0, *fields[:2], 0, *fields[2:])
+            STAMP.pack_into(buf, offset, seq + 1)
+            self.write_seq = seq + 1
+            STAMP.pack_into(buf, WRITE_SEQ_OFFSET, seq + 1)
+
+    def close(self):
+        """Mark the bus closed for followers and remove the segment"""
+        if self.shm is None:
+            return
+        FLAG.pack_into(self.shm.buf, OPEN_OFFSET, 0)
+        self.shm.close()
+        self.shm.unlink()
+        self.shm = None
+        _owned.discard(self.name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class EventBusReader:
+    """Follows an EventBus from any local process without locks.
+
+    Reading starts at the newest event, or at the oldest one still in the
+    ring with from_start=True. Events the writer overwrote before they were
+    read are counted in `missed`.
+    """
+
+    def __init__(self, name=DEFAULT_NAME, from_start=False):
+        self.shm = attach(name)
+        magic, version, slot_size, capacity, _, head, _, _ = HEADER.unpack_from(self.shm.buf, 0)
+        if magic != MAGIC:
+            self.shm.close()
+            raise ValueError(f"{name} is not an event bus")
+        if version != VERSION or slot_size != SLOT.size:
+            self.shm.close()
+            raise ValueError(f"Unsupported event bus version {version}")
+        self.name = name
+        self.capacity = capacity
+        self.next_seq = max(head - capacity, 0) if from_start else head
+        self.missed = 0
+
+    def head(self):
+        """Number of events published so far"""
+        return STAMP.unpack_from(self.shm.buf, WRITE_SEQ_OFFSET)[0]
+
+    @property
+    def is_open(self):
+        return FLAG.unpack_from(self.shm.buf, OPEN_OFFSET)[0] == 1
+
+    @property
+    def recording_start(self):
+        """Wall clock time the current recording started, or None"""
+        return TIME.unpack_from(self.shm.buf, START_OFFSET)[0] or None
+
+    def read_raw(self, max_records=None):
+        """SLOT tuples published since the last read, unpacked in place"""
+        buf = self.shm.buf
+        capacity = self.capacity
+        head = self.head()
+        records = []
+        while self.next_seq < head and (max_records is None or len(records) < max_records):
+            seq = self.next_seq
+            if head - seq > capacity:
+                # A full lap behind: those slots already hold newer events
+                self.missed += head - capacity - seq
+                self.next_seq = head - capacity
+                continue
+            offset = HEADER.size + (seq % capacity) * SLOT.size
+            record = SLOT.unpack_from(buf, offset)
+            if record[0] != seq + 1 or STAMP.unpack_from(buf, offset)[0] != seq + 1:
+                # Overwritten before or while we read it
+                head = self.head()
+                skip_to = max(head - capacity + 1, seq + 1)
+                self.missed += skip_to - seq
+                self.next_seq = skip_to
+                continue
+            records.append(record)
+            self.next_seq = seq + 1
+        return records
+
+    def read(self, max_events=None):
+        """Events published since the last read"""
+        return [decode_record(record) for record in self.read_raw(max_events)]
+
+    def follow(self, interval=0.01, should_stop=None):
+        """Yield events as they are published until the bus closes or should_stop() is true"""
+        while should_stop is None or not should_stop():
+            is_open = self.is_open
+            events = self.read()
+            yield from events
+            if not events:
+                if not is_open:
+                    return
+                time.sleep(interval)
+
+    def close(self):
+        if self.shm is not None:
+            self.shm.close()
+            self.shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Print events from a live recording as JSON lines")
+    parser.add_argument('--name', default=DEFAULT_NAME, help="shared memory name of the bus")
+    parser.add_argument('--from-start', action='store_true',
+                        help="start with the oldest event still in the ring")
+    args = parser.parse_args(argv)
+
+    try:
+        reader = EventBusReader(args.name, from_start=args.from_start)
+    except FileNotFoundError:
+        print(f"No event bus named {args.name}; start the recorder with --bus")
+        return 1
+    with reader:
+        try:
+            for event in reader.follow():
+                print(json.dumps(event), flush=True)
+        except KeyboardInterrupt:
+            pass
+    if reader.missed:
+        print(f"Missed {reader.missed} events")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,752 @@
+"""Typed events and a columnar in-memory event store.
+
+A recording kept as a list of dicts costs hundreds of bytes per event and
+every consumer has to probe for 'press_time' vs 'time'. EventStore keeps one
+typed array per field instead, with key names and marker labels interned in
+a key table:
+
+    rows      kind, flags, key id, start, end, duration, detail
+              (the row's index in the move or scroll table)
+    moves     start/end coordinates, total_distance, avg_speed, direction,
+              first point, point count
+    scrolls   dx, dy of scrolls that have them
+    points    offset, x, y of the simplified mouse paths
+
+Sorting and filtering work on numpy views of the rows. Events are stored
+from and handed out as the usual dicts, so the store drops in wherever a
+list of events was used; event(i) and events() return the __slots__
+classes below instead, which all have the same start/end attributes and
+can be read like the dicts (event['key'], event.get('path')), so replay
+runs on them directly. Capture appends typed events straight into the
+columns, from_events() copies parsed JSON into them in one pass and
+json_rows() writes JSON back out of them without building dicts.
+
+A dict is only stored in the columns when every field has a type the
+columns hold exactly. Fields outside the schema are kept per row and
+events that do not fit it at all are kept whole as KIND_RAW rows, so
+nothing is lost.
+"""
+from array import array
+import json
+
+import numpy as np
+
+from binaryFormat import (FLAG_EXTRA, FLAG_PATH, FLAG_RELEASE, FLAG_SCROLL_DELTA, FLAG_SCROLL_UP,
+                          KIND_CLICK, KIND_KEY, KIND_MOVE, KIND_RAW, KIND_SCROLL, MOVE_FIELDS,
+                          PRESS_FIELDS, SCROLL_FIELDS)
+from recordingWriter import event_end, event_time
+
+KIND_MARKER = 5
+
+MARKER_FIELDS = ('key', 'label', 'time', 'duration')
+
+# (name, array typecode, numpy dtype) of the per-event columns
+ROW_COLUMNS = (
+    ('kind', 'B', np.uint8), ('flags', 'B', np.uint8), ('key_id', 'I', np.uint32),
+    ('start', 'd', np.float64), ('end', 'd', np.float64), ('duration', 'd', np.float64),
+    ('detail', 'I', np.uint32),
+)
+MOVE_COLUMNS = (('start_x', 'i'), ('start_y', 'i'), ('end_x', 'i'), ('end_y', 'i'),
+                ('distance', 'd'), ('speed', 'd'), ('direction', 'd'),
+                ('first_point', 'I'), ('point_count', 'I'))
+SCROLL_COLUMNS = (('dx', 'i'), ('dy', 'i'))
+POINT_COLUMNS = (('offset', 'd'), ('x', 'i'), ('y', 'i'))
+SIDE_COLUMNS = MOVE_COLUMNS + SCROLL_COLUMNS + POINT_COLUMNS
+
+# Field sets from_events() copies straight into the columns
+PRESS_KEYS = frozenset(PRESS_FIELDS)
+PRESS_HELD_KEYS = PRESS_KEYS - {'release_time'}
+SCROLL_KEYS = frozenset(SCROLL_FIELDS)
+SCROLL_TICK_KEYS = SCROLL_KEYS - {'dx', 'dy'}
+MOVE_KEYS = frozenset(MOVE_FIELDS)
+MOVE_ENDPOINT_KEYS = MOVE_KEYS - {'path'}
+MARKER_KEYS = frozenset(MARKER_FIELDS)
+NOT_PRESSES = ('scroll', 'mouse_move', 'marker')
+NUMBERS = (float, int)
+
+_missing = object()
+
+
+class TypedEvent:
+    """Read access by field name, as if the event were its dict"""
+    __slots__ = ()
+    fields = ()
+
+    def get(self, name, default=None):
+        if name in self.fields:
+            value = getattr(self, name)
+            return default if value is None else value
+        if self.extra and name in self.extra:
+            return self.extra[name]
+        return default
+
+    def __getitem__(self, name):
+        value = self.get(name, _missing)
+        if value is _missing:
+            raise KeyError(name)
+        return value
+
+    def __contains__(self, name):
+        return self.get(name, _missing) is not _missing
+
+
+class KeyEvent(TypedEvent):
+    """A key held from press_time to release_time"""
+    __slots__ = ('key', 'press_time', 'release_time', 'duration', 'extra')
+    kind = KIND_KEY
+    fields = PRESS_FIELDS
+
+    def __init__(self, key, press_time, release_time, duration, extra=None):
+        self.key = key
+        self.press_time = press_time
+        self.release_time = release_time
+        self.duration = duration
+        self.extra = extra
+
+    @property
+    def start(self):
+        return self.press_time
+
+    @property
+    def end(self):
+        if self.release_time is None:
+            return self.press_time + self.duration
+        return self.release_time
+
+    def to_dict(self):
+        event = {'key': self.key, 'press_time': self.press_time}
+        if self.release_time is not None:
+            event['release_time'] = self.release_time
+        event['duration'] = self.duration
+        if self.extra:
+            event.update(self.extra)
+        return event
+
+
+class ClickEvent(KeyEvent):
+    """A mouse button held from press_time to release_time; key is 'mouse_<button>'"""
+    __slots__ = ()
+    kind = KIND_CLICK
+
+    @property
+    def button(self):
+        return self.key[len('mouse_'):]
+
+
+class ScrollEvent(TypedEvent):
+    """Wheel ticks; dx/dy are None in recordings from before they were kept"""
+    __slots__ = ('direction', 'dx', 'dy', 'press_time', 'release_time', 'duration', 'extra')
+    kind = KIND_SCROLL
+    fields = SCROLL_FIELDS
+    key = 'scroll'
+
+    def __init__(self, direction, dx, dy, press_time, release_time, duration, extra=None):
+        self.direction = direction
+        self.dx = dx
+        self.dy = dy
+        self.press_time = press_time
+        self.release_time = release_time
+        self.duration = duration
+        self.extra = extra
+
+    start = KeyEvent.start
+    end = KeyEvent.end
+
+    def to_dict(self):
+        event = {'key': 'scroll', 'direction': self.direction}
+        if self.dy is not None:
+            event['dx'] = self.dx
+            event['dy'] = self.dy
+        event['press_time'] = self.press_time
+        if self.release_time is not None:
+            event['release_time'] = self.release_time
+        event['duration'] = self.duration
+        if self.extra:
+            event.update(self.extra)
+        return event
+
+
+class MoveEvent(TypedEvent):
+    """A mouse movement starting at time; path holds [offset, x, y] vertices or None"""
+    __slots__ = ('start_x', 'start_y', 'end_x', 'end_y', 'total_distance', 'avg_speed',
+                 'direction', 'duration', 'time', 'path', 'extra')
+    kind = KIND_MOVE
+    fields = MOVE_FIELDS
+    key = 'mouse_move'
+
+    def __init__(self, start_x, start_y, end_x, end_y, total_distance, avg_speed, direction,
+                 duration, time, path=None, extra=None):
+        self.start_x = start_x
+        self.start_y = start_y
+        self.end_x = end_x
+        self.end_y = end_y
+        self.total_distance = total_distance
+        self.avg_speed = avg_speed
+        self.direction = direction
+        self.duration = duration
+        self.time = time
+        self.path = path
+        self.extra = extra
+
+    @property
+    def start(self):
+        return self.time
+
+    @property
+    def end(self):
+        return self.time + self.duration
+
+    def to_dict(self):
+        event = {
+            'key': 'mouse_move',
+            'start_x': self.start_x,
+            'start_y': self.start_y,
+            'end_x': self.end_x,
+            'end_y': self.end_y,
+            'total_distance': self.total_distance,
+            'avg_speed': self.avg_speed,
+            'direction': self.direction,
+            'duration': self.duration,
+            'time': self.time,
+        }
+        if self.path is not None:
+            event['path'] = self.path
+        if self.extra:
+            event.update(self.extra)
+        return event
+
+
+class MarkerEvent(TypedEvent):
+    """A labelled point in the recording"""
+    __slots__ = ('label', 'time', 'duration', 'extra')
+    kind = KIND_MARKER
+    fields = MARKER_FIELDS
+    key = 'marker'
+
+    def __init__(self, label, time, duration=0.0, extra=None):
+        self.label = label
+        self.time = time
+        self.duration = duration
+        self.extra = extra
+
+    start = MoveEvent.start
+    end = MoveEvent.end
+
+    def to_dict(self):
+        event = {'key': 'marker', 'label': self.label, 'time': self.time, 'duration': self.duration}
+        if self.extra:
+            event.update(self.extra)
+        return event
+
+
+class RawEvent(TypedEvent):
+    """An event outside the schema, kept as its dict"""
+    __slots__ = ('event',)
+    kind = KIND_RAW
+
+    def __init__(self, event):
+        self.event = event
+
+    @property
+    def key(self):
+        return self.event.get('key')
+
+    @property
+    def start(self):
+        return event_time(self.event)
+
+    @property
+    def end(self):
+        return event_end(self.event)
+
+    def get(self, name, default=None):
+        return self.event.get(name, default)
+
+    def to_dict(self):
+        return dict(self.event)
+
+
+def is_number(value):
+    return type(value) in (float, int)  # Not bool
+
+
+def is_coordinate(value):
+    return type(value) is int and -2**31 <= value < 2**31
+
+
+def from_dict(event):
+    """Typed event holding exactly what an event dict does, or None if it does not fit the schema"""
+    key = event.get('key')
+    if not isinstance(key, str):
+        return None
+    if key == 'mouse_move':
+        fields = MOVE_FIELDS
+        coordinates = (event['start_x'], event['start_y'], event['end_x'], event['end_y'])
+        numbers = (event['total_distance'], event['avg_speed'], event['direction'],
+                   event['duration'], event['time'])
+        path = event.get('path')
+        if 'path' in event:
+            if not isinstance(path, list) or not all(
+                    isinstance(vertex, list) and len(vertex) == 3 and is_number(vertex[0])
+                    and is_coordinate(vertex[1]) and is_coordinate(vertex[2]) for vertex in path):
+                return None
+            path = [[float(t), x, y] for t, x, y in path]
+    elif key == 'marker':
+        fields = MARKER_FIELDS
+        coordinates = ()
+        numbers = (event['time'], event['duration'])
+        if not isinstance(event['label'], str):
+            return None
+    else:
+        fields = SCROLL_FIELDS if key == 'scroll' else PRESS_FIELDS
+        coordinates = ()
+        numbers = (event['press_time'], event.get('release_time', 0.0), event['duration'])
+        if key == 'scroll':
+            if event['direction'] not in ('up', 'down') or ('dx' in event) != ('dy' in event):
+                return None
+            if 'dy' in event:
+                coordinates = (event['dx'], event['dy'])
+    if not (all(is_number(value) for value in numbers)
+            and all(is_coordinate(value) for value in coordinates)):
+        return None
+    extra = {field: value for field, value in event.items() if field not in fields} or None
+
+    if key == 'mouse_move':
+        return MoveEvent(*coordinates, *map(float, numbers), path, extra)
+    if key == 'marker':
+        return MarkerEvent(event['label'], float(event['time']), float(event['duration']), extra)
+    press_time = float(event['press_time'])
+    release_time = float(event['release_time']) if 'release_time' in event else None
+    duration = float(event['duration'])
+    if key == 'scroll':
+        dx, dy = coordinates or (None, None)
+        return ScrollEvent(event['direction'], dx, dy, press_time, release_time, duration, extra)
+    if key.startswith('mouse_'):
+        return ClickEvent(key, press_time, release_time, duration, extra)
+    return KeyEvent(key, press_time, release_time, duration, extra)
+
+
+class EventStore:
+    """Recording events in typed columns; a drop-in for a list of event dicts"""
+
+    def __init__(self):
+        for name, typecode, _ in ROW_COLUMNS:
+            setattr(self, name, array(typecode))
+        for name, typecode in SIDE_COLUMNS:
+            setattr(self, name, array(typecode))
+        self.keys = []
+        self.key_ids = {}
+        self.extras = {}  # row -> fields outside the schema, or the whole event for KIND_RAW
+
+    @classmethod
+    def from_events(cls, events):
+        """Store holding events, filled column by column in one pass.
+
+        Dicts with exactly the fields of their kind and values of the types
+        the columns hold are copied straight in; anything else (typed
+        events, extra fields, unusual values) goes through append().
+        """
+        store = cls()
+        kind = store.kind.append
+        flags = store.flags.append
+        key_id = store.key_id.append
+        start = store.start.append
+        end = store.end.append
+        duration = store.duration.append
+        detail = store.detail.append
+        key_ids = store.key_ids
+        intern = store.intern
+        for event in events:
+            if type(event) is dict:
+                fields = event.keys()
+                name = event.get('key')
+                if fields == PRESS_KEYS or fields == PRESS_HELD_KEYS:
+                    press_time = event['press_time']
+                    held = event['duration']
+                    release_time = event['release_time'] if fields == PRESS_KEYS else None
+                    if (type(name) is str and name not in NOT_PRESSES and type(press_time) in NUMBERS
+                            and type(held) in NUMBERS
+                            and (release_time is None or type(release_time) in NUMBERS)):
+                        kind(KIND_CLICK if name.startswith('mouse_') else KIND_KEY)
+                        if release_time is None:
+                            flags(0)
+                            end(press_time + held)
+                        else:
+                            flags(FLAG_RELEASE)
+                            end(release_time)
+                        key_id(key_ids[name] if name in key_ids else intern(name))
+                        start(press_time)
+                        duration(held)
+                        detail(0)
+                        continue
+                elif name == 'mouse_move':
+                    if (fields == MOVE_KEYS or fields == MOVE_ENDPOINT_KEYS) and store._copy_move(event):
+                        continue
+                elif name == 'scroll':
+                    if (fields == SCROLL_KEYS or fields == SCROLL_TICK_KEYS) and store._copy_scroll(event):
+                        continue
+                elif name == 'marker':
+                    label = event['label'] if fields == MARKER_KEYS else None
+                    time = event.get('time')
+                    held = event.get('duration')
+                    if type(label) is str and type(time) in NUMBERS and type(held) in NUMBERS:
+                        kind(KIND_MARKER)
+                        flags(0)
+                        key_id(key_ids[label] if label in key_ids else intern(label))
+                        start(time)
+                        end(time + held)
+                        duration(held)
+                        detail(0)
+                        continue
+            store.append(event)
+        return store
+
+    def _copy_move(self, event):
+        """Copy a move dict with only schema fields into the columns; False if it does not fit"""
+        start_x = event['start_x']
+        start_y = event['start_y']
+        end_x = event['end_x']
+        end_y = event['end_y']
+        time = event['time']
+        held = event['duration']
+        if not (is_coordinate(start_x) and is_coordinate(start_y) and is_coordinate(end_x)
+                and is_coordinate(end_y) and type(event['total_distance']) in NUMBERS
+                and type(event['avg_speed']) in NUMBERS and type(event['direction']) in NUMBERS
+                and type(time) in NUMBERS and type(held) in NUMBERS):
+            return False
+        flags = 0
+        first = len(self.offset)
+        if 'path' in event:
+            path = event['path']
+            if type(path) is not list:
+                return False
+            if path:
+                # Checked a column at a time rather than point by point
+                if set(map(type, path)) != {list} or set(map(len, path)) != {3}:
+                    return False
+                offsets, xs, ys = zip(*path)
+                coordinates = xs + ys
+                if not (set(map(type, offsets)) <= {float, int} and set(map(type, coordinates)) == {int}
+                        and min(coordinates) >= -2**31 and max(coordinates) < 2**31):
+                    return False
+                self.offset.extend(offsets)
+                self.x.extend(xs)
+                self.y.extend(ys)
+            flags = FLAG_PATH
+        detail = len(self.distance)
+        self.start_x.append(start_x)
+        self.start_y.append(start_y)
+        self.end_x.append(end_x)
+        self.end_y.append(end_y)
+        self.distance.append(event['total_distance'])
+        self.speed.append(event['avg_speed'])
+        self.direction.append(event['direction'])
+        self.first_point.append(first)
+        self.point_count.append(len(self.offset) - first)
+        self._append_row(KIND_MOVE, flags, self.intern('mouse_move'), time, time + held, held, detail)
+        return True
+
+    def _copy_scroll(self, event):
+        """Copy a scroll dict with only schema fields into the columns; False if it does not fit"""
+        direction = event['direction']
+        press_time = event['press_time']
+        release_time = event['release_time']
+        held = event['duration']
+        if not (direction in ('up', 'down') and type(press_time) in NUMBERS
+                and type(release_time) in NUMBERS and type(held) in NUMBERS):
+            return False
+        flags = FLAG_RELEASE | (FLAG_SCROLL_UP if direction == 'up' else 0)
+        detail = 0
+        if 'dy' in event:
+            dx = event['dx']
+            dy = event['dy']
+            if not (is_coordinate(dx) and is_coordinate(dy)):
+                return False
+            flags |= FLAG_SCROLL_DELTA
+            detail = len(self.dx)
+            self.dx.append(dx)
+            self.dy.append(dy)
+        self._append_row(KIND_SCROLL, flags, self.intern('scroll'), press_time, release_time, held,
+                         detail)
+        return True
+
+    def intern(self, name):
+        """Intern a key/button name or marker label"""
+        if name not in self.key_ids:
+            self.key_ids[name] = len(self.keys)
+            self.keys.append(name)
+        return self.key_ids[name]
+
+    def __len__(self):
+        return len(self.kind)
+
+    def append(self, event):
+        """Add an event dict or typed event as the last row"""
+        if isinstance(event, dict):
+            try:
+                typed = from_dict(event)
+            except (KeyError, TypeError, ValueError):
+                typed = None
+            if typed is None:
+                self._append_raw(event)
+                return
+            event = typed
+        kind = event.kind
+        if kind == KIND_SCROLL and event.dy is not None and not (
+                is_coordinate(event.dx) and is_coordinate(event.dy)):
+            # e.g. fractional wheel deltas
+            self._append_raw(event.to_dict())
+        elif kind == KIND_MOVE:
+            self.append_move(event.start_x, event.start_y, event.end_x, event.end_y,
+                             event.total_distance, event.avg_speed, event.direction,
+                             event.duration, event.time, event.path, event.extra)
+        elif kind == KIND_SCROLL:
+            self.append_scroll(event.direction, event.dx, event.dy, event.press_time,
+                               event.release_time, event.duration, event.extra)
+        elif kind == KIND_MARKER:
+            self.append_marker(event.label, event.time, event.duration, event.extra)
+        elif kind == KIND_RAW:
+            self._append_raw(event.event)
+        else:
+            self.append_press(event.key, event.press_time, event.release_time, event.duration,
+                              event.extra)
+
+    def append_press(self, key, press_time, release_time, duration, extra=None):
+        """Add a key or mouse button ('mouse_<button>') press"""
+        flags = FLAG_EXTRA if extra else 0
+        if release_time is None:
+            end = press_time + duration
+        else:
+            flags |= FLAG_RELEASE
+            end = release_time
+        if extra:
+            self.extras[len(self.kind)] = extra
+        self._append_row(KIND_CLICK if key.startswith('mouse_') else KIND_KEY, flags, self.intern(key),
+                         press_time, end, duration, 0)
+
+    def append_scroll(self, direction, dx, dy, press_time, release_time, duration, extra=None):
+        flags = FLAG_SCROLL_UP if direction == 'up' else 0
+        detail = 0
+        if dy is not None:
+            flags |= FLAG_SCROLL_DELTA
+            detail = len(self.dx)
+            self.dx.append(dx)
+            self.dy.append(dy)
+        if release_time is None:
+            end = press_time + duration
+        else:
+            flags |= FLAG_RELEASE
+            end = release_time
+        if extra:
+            flags |= FLAG_EXTRA
+            self.extras[len(self.kind)] = extra
+        self._append_row(KIND_SCROLL, flags, self.intern('scroll'), press_time, end, duration, detail)
+
+    def append_move(self, start_x, start_y, end_x, end_y, total_distance, avg_speed, direction,
+                    duration, time, path=None, extra=None):
+        flags = FLAG_EXTRA if extra else 0
+        detail = len(self.distance)
+        self.start_x.append(start_x)
+        self.start_y.append(start_y)
+        self.end_x.append(end_x)
+        self.end_y.append(end_y)
+        self.distance.append(total_distance)
+        self.speed.append(avg_speed)
+        self.direction.append(direction)
+        self.first_point.append(len(self.offset))
+        if path is None:
+            self.point_count.append(0)
+        else:
+            flags |= FLAG_PATH
+            self.point_count.append(len(path))
+            for t, x, y in path:
+                self.offset.append(t)
+                self.x.append(x)
+                self.y.append(y)
+        if extra:
+            self.extras[len(self.kind)] = extra
+        self._append_row(KIND_MOVE, flags, self.intern('mouse_move'), time, time + duration,
+                         duration, detail)
+
+    def append_marker(self, label, time, duration=0.0, extra=None):
+        if extra:
+            self.extras[len(self.kind)] = extra
+        self._append_row(KIND_MARKER, FLAG_EXTRA if extra else 0, self.intern(label), time,
+                         time + duration, duration, 0)
+
+    def _append_raw(self, event):
+        key = event.get('key')
+        start = event_time(event)
+        start = float(start) if is_number(start) else 0.0
+        try:
+            end = float(event_end(event))
+        except (TypeError, ValueError):
+            end = start
+        self.extras[len(self.kind)] = dict(event)
+        self._append_row(KIND_RAW, FLAG_EXTRA, self.intern(key if isinstance(key, str) else ''),
+                         start, end, 0.0, 0)
+
+    def _append_row(self, kind, flags, key_id, start, end, duration, detail):
+        self.kind.append(kind)
+        self.flags.append(flags)
+        self.key_id.append(key_id)
+        self.start.append(start)
+        self.end.append(end)
+        self.duration.append(duration)
+        self.detail.append(detail)
+
+    def extend(self, events):
+        for event in events:
+            self.append(event)
+
+    def event(self, index):
+        """Typed event of a row"""
+        if index < 0:
+            index += len(self.kind)
+        kind = self.kind[index]
+        if kind == KIND_RAW:
+            return RawEvent(dict(self.extras[index]))
+        flags = self.flags[index]
+        extra = self.extras.get(index)
+        extra = extra and dict(extra)
+        start = self.start[index]
+        duration = self.duration[index]
+        if kind == KIND_MOVE:
+            m = self.detail[index]
+            path = None
+            if flags & FLAG_PATH:
+                first = self.first_point[m]
+                path = [[self.offset[p], self.x[p], self.y[p]]
+                        for p in range(first, first + self.point_count[m])]
+            return MoveEvent(self.start_x[m], self.start_y[m], self.end_x[m], self.end_y[m],
+                             self.distance[m], self.speed[m], self.direction[m], duration, start,
+                             path, extra)
+        name = self.keys[self.key_id[index]]
+        if kind == KIND_MARKER:
+            return MarkerEvent(name, start, duration, extra)
+        release = self.end[index] if flags & FLAG_RELEASE else None
+        if kind == KIND_SCROLL:
+            dx = dy = None
+            if flags & FLAG_SCROLL_DELTA:
+                dx = self.dx[self.detail[index]]
+                dy = self.dy[self.detail[index]]
+            return ScrollEvent('up' if flags & FLAG_SCROLL_UP else 'down', dx, dy, start, release,
+                               duration, extra)
+        if kind == KIND_CLICK:
+            return ClickEvent(name, start, release, duration, extra)
+        return KeyEvent(name, start, release, duration, extra)
+
+    def events(self):
+        """Typed events in row order"""
+        for index in range(len(self.kind)):
+            yield self.event(index)
+
+    def __getitem__(self, index):
+        return self.event(index).to_dict()
+
+    def __iter__(self):
+        for index in range(len(self.kind)):
+            yield self.event(index).to_dict()
+
+    def json_rows(self):
+        """Every event as compact JSON, the text json.dumps gives its dict, written from the columns.
+
+        Rows with fields outside the schema, raw rows and stores holding NaN
+        or infinite times (which JSON spells differently) go through their dict.
+        """
+        floats = [getattr(self, name) for name in ('start', 'end', 'duration', 'distance', 'speed',
+                                                   'direction', 'offset')]
+        if not all(np.isfinite(np.frombuffer(column, dtype=np.float64)).all()
+                   for column in floats if len(column)):
+            for index in range(len(self.kind)):
+                yield json.dumps(self[index])
+            return
+        names = [json.dumps(name) for name in self.keys]
+        rows = zip(self.kind, self.flags, self.key_id, self.start, self.end, self.duration, self.detail)
+        for index, (kind, flags, key_id, start, end, duration, detail) in enumerate(rows):
+            if flags & FLAG_EXTRA:
+                yield json.dumps(self[index])
+            elif kind == KIND_MOVE:
+                text = ('{"key": "mouse_move", "start_x": %d, "start_y": %d, "end_x": %d, "end_y": %d, '
+                        '"total_distance": %r, "avg_speed": %r, "direction": %r, "duration": %r, '
+                        '"time": %r' % (self.start_x[detail], self.start_y[detail], self.end_x[detail],
+                                        self.end_y[detail], self.distance[detail], self.speed[detail],
+                                        self.direction[detail], duration, start))
+                if flags & FLAG_PATH:
+                    first = self.first_point[detail]
+                    last = first + self.point_count[detail]
+                    text += ', "path": [%s]' % ', '.join(
+                        ['[%r, %d, %d]' % point for point in
+                         zip(self.offset[first:last], self.x[first:last], self.y[first:last])])
+                yield text + '}'
+            elif kind == KIND_MARKER:
+                yield '{"key": "marker", "label": %s, "time": %r, "duration": %r}' % (
+                    names[key_id], start, duration)
+            elif kind == KIND_SCROLL:
+                text = '{"key": "scroll", "direction": "%s", ' % ('up' if flags & FLAG_SCROLL_UP else 'down')
+                if flags & FLAG_SCROLL_DELTA:
+                    text += '"dx": %d, "dy": %d, ' % (self.dx[detail], self.dy[detail])
+                if flags & FLAG_RELEASE:
+                    yield text + '"press_time": %r, "release_time": %r, "duration": %r}' % (start, end, duration)
+                else:
+                    yield text + '"press_time": %r, "duration": %r}' % (start, duration)
+            elif flags & FLAG_RELEASE:
+                yield '{"key": %s, "press_time": %r, "release_time": %r, "duration": %r}' % (
+                    names[key_id], start, end, duration)
+            else:
+                yield '{"key": %s, "press_time": %r, "duration": %r}' % (names[key_id], start, duration)
+
+    def columns(self):
+        """numpy views of the row columns (no copies); drop them before appending again"""
+        return {name: np.frombuffer(getattr(self, name), dtype=dtype) if len(self.kind) else
+                np.zeros(0, dtype=dtype) for name, _, dtype in ROW_COLUMNS}
+
+    @property
+    def nbytes(self):
+        """Memory held by the columns, side tables and path points"""
+        total = 0
+        for name, _, _ in ROW_COLUMNS:
+            total += len(getattr(self, name)) * getattr(self, name).itemsize
+        for name, _ in SIDE_COLUMNS:
+            total += len(getattr(self, name)) * getattr(self, name).itemsize
+        return total
+
+    def take(self, indices):
+        """New store holding the given rows, in the given order"""
+        indices = np.asarray(indices, dtype=np.intp)
+        store = EventStore()
+        views = self.columns()
+        for name, typecode, _ in ROW_COLUMNS:
+            getattr(store, name).frombytes(views[name][indices].tobytes())
+        del views
+        # The side tables are shared by index, so copy them whole
+        for name, _ in SIDE_COLUMNS:
+            setattr(store, name, array(getattr(self, name).typecode, getattr(self, name)))
+        store.keys = list(self.keys)
+        store.key_ids = dict(self.key_ids)
+        if self.extras:
+            position = np.full(len(self.kind), -1, dtype=np.intp)
+            position[indices] = np.arange(len(indices))
+            store.extras = {int(position[row]): extra for row, extra in self.extras.items()
+                            if position[row] >= 0}
+        return store
+
+    def filter(self, mask):
+        """New store with the rows where mask (a boolean array over the rows) is true"""
+        return self.take(np.flatnonzero(mask))
+
+    def is_sorted(self):
+        if len(self.kind) < 2:
+            return True
+        start = np.frombuffer(self.start, dtype=np.float64)
+        return bool((start[1:] >= start[:-1]).all())
+
+    def sorted(self):
+        """New store in start-time order; rows that start together keep their order"""
+        return self.take(np.argsort(np.frombuffer(self.start, dtype=np.float64), kind='stable'))
+
+    def sort(self):
+        """Sort the rows by start time in place (stable)"""
+        if self.is_sorted():
+            return
+        self.__dict__.update(self.sorted().__dict__)
@@ -0,0 +1,976 @@
+import time
+import json
+from datetime import datetime
+import signal
+import sys
+import math
+import threading
+from binaryFormat import BinaryRecording
+from captureBuffer import CaptureRing, CaptureStats, EventLogger
+from eventStore import ClickEvent, EventStore, KeyEvent, MarkerEvent, MoveEvent, ScrollEvent
+from keyNames import button_name, key_name, load_pynput, resolve_button, resolve_key
+from macroLibrary import MacroLibrary, file_hash, recording_summary
+from mouseTrajectory import TrajectoryBuffer
+from outputBackends import PynputBackend
+from recordingAnalysis import analyze, format_report
+from recordingOptimizer import format_pack_report, optimize, pack_timing
+from recordingOptimizer import format_report as format_optimize_report
+from recordingWriter import EventStream, StreamingRecordingWriter, write_recording
+from replayPipeline import iter_replay_events
+from replayPlan import PlanBuilder, PlanCache, compile_plan
+from replayScheduler import CancellationToken, DeadlineScheduler
+from replayTelemetry import MOVE, PRESS, RELEASE, SCROLL, ReplayTelemetry
+from replayTelemetry import format_report as format_timing_report
+from replayWorker import ReplayWorker
+from timeIndex import TimeIndex
+
+# Configurable hotkeys, named like keys in recordings: 'Key.<name>' for
+# special keys, the character itself for the others
+HOTKEYS = {
+    'start_recording': 'Key.f7',
+    'stop_recording': 'Key.f6',
+    'replay_recording': 'Key.f8',
+    'stop_replay': 'Key.esc',
+    'add_marker': 'Key.f9',
+    'slower': 'Key.f10',
+    'faster': 'Key.f11',
+    'toggle_fast_mode': 'Key.f12',
+    'quit_program': 'q'
+}
+
+# Hotkeys that replay a named macro from the library, e.g. {'Key.f2': 'login'}
+MACRO_HOTKEYS = {}
+
+# Replay speeds the slower/faster hotkeys step through
+SPEED_STEPS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0)
+
+def print_hotkeys():
+    print(f"{HOTKEYS['start_recording']} - Start Recording")
+    print(f"{HOTKEYS['stop_recording']} - Stop Recording")
+    print(f"{HOTKEYS['replay_recording']} - Replay Last Recording")
+    print(f"{HOTKEYS['stop_replay']} - Stop Replay")
+    print(f"{HOTKEYS['add_marker']} - Add Marker (while recording)")
+    print(f"{HOTKEYS['slower']}/{HOTKEYS['faster']} - Slower/Faster Replay")
+    print(f"{HOTKEYS['toggle_fast_mode']} - Toggle As-Fast-As-Possible Replay")
+    for key, name in MACRO_HOTKEYS.items():
+        print(f"{key} - Replay Macro '{name}'")
+    print(f"{HOTKEYS['quit_program']} - Quit Program")
+
+class InputRecorder:
+    def __init__(self, streaming=False, library_dir=None, backend=None, event_bus=None):
+        self.recorded_keys = EventStore()
+        self.start_time = None
+        self.is_recording = False
+        self.output_file = "keyboard_recording.json"
+        # Every finished recording is also kept in the macro library
+        self.library = MacroLibrary(library_dir) if library_dir else None
+        # Streaming mode appends events to a JSON Lines file while recording
+        # instead of keeping them all in memory until stop
+        self.streaming = streaming
+        self.stream_file = "keyboard_recording.jsonl"
+        self.stream_writer = None
+        # Optional eventBus.EventBus that other processes follow live
+        self.event_bus = event_bus
+        # Callables given every finished event, e.g. asyncRecorder's loop feed
+        self.event_listeners = []
+        self.pressed_keys = {}
+        self.pressed_mouse_buttons = {}
+        self.running = True
+        self.last_mouse_position = None
+        self.last_mouse_time = None
+        self.is_mouse_moving = False
+        self.mouse_move_start_time = None
+        self.mouse_move_start_pos = None
+        self.mouse_trajectory = TrajectoryBuffer()
+        self.path_epsilon = 1.0  # Max deviation in pixels of the saved mouse paths
+
+        # Listener callbacks only push raw tuples; a drain thread does the rest
+        self.capture_ring = CaptureRing()
+        self.capture_stats = CaptureStats()
+        self.logger = EventLogger()
+        self.drain_thread = None
+        self.drain_interval = 0.005
+        self.max_logged_errors = 10  # Further capture errors are only counted
+        
+        # Controllers and the default backend need an input backend (and on
+        # Linux a display), so they are only created once something uses them
+        self._keyboard_controller = None
+        self._mouse_controller = None
+        # Where replayed actions are injected (see outputBackends)
+        self._backend = backend
+        
+        # Initialize listeners
+        self.keyboard_listener = None
+        self.mouse_listener = None
+
+        # Timing of the most recent replay
+        self.last_replay_telemetry = None
+        self.last_abort_latency = None
+        # Hotkey-triggered replays run here so the listener stays responsive
+        self.replay_worker = ReplayWorker()
+        # Replay settings used by replay(), changed with hotkeys or on the command line
+        self.replay_speed = 1.0
+        self.fast_mode = False
+        self.fast_options = {'min_hold': 0.02, 'min_gap': 0.005, 'keep_waits': False}
+        self.last_replay_seconds = None
+        self.replay_start = None  # Seconds or marker label to start replays from
+        self.replay_end = None
+        self.marker_count = 0
+        self.current_index = None
+        self.current_index_source = None
+        self.replay_logger = EventLogger(max_per_second=None)
+
+        # Compiled replay plans, keyed by the content hash of their source
+        self.plan_cache = PlanCache()
+        self.recording_hash = None  # Hash of the file recorded_keys came from
+        self.current_plan = None
+        self.current_plan_source = None
+
+    @property
+    def keyboard_controller(self):
+        if self._keyboard_controller is None:
+            keyboard, _ = load_pynput()
+            self._keyboard_controller = keyboard.Controller()
+        return self._keyboard_controller
+
+    @property
+    def mouse_controller(self):
+        if self._mouse_controller is None:
+            _, mouse = load_pynput()
+            self._mouse_controller = mouse.Controller()
+        return self._mouse_controller
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = PynputBackend(self.keyboard_controller, self.mouse_controller)
+        return self._backend
+
+    @backend.setter
+    def backend(self, backend):
+        self._backend = backend
+
+    def get_current_time(self):
+        """Get current time in high precision"""
+        return time.perf_counter()
+
+    def on_key_press(self, key):
+        if not self.is_recording:
+            return
+        current_time = self.get_current_time()
+        self.capture_ring.push(('key_press', current_time, key))
+        self.capture_stats.add(self.get_current_time() - current_time)
+
+    def on_key_release(self, key):
+        if not self.is_recording:
+            return
+        current_time = self.get_current_time()
+        self.capture_ring.push(('key_release', current_time, key))
+        self.capture_stats.add(self.get_current_time() - current_time)
+
+    def on_mouse_click(self, x, y, button, pressed):
+        if not self.is_recording:
+            return
+        current_time = self.get_current_time()
+        self.capture_ring.push(('mouse_click', current_time, (x, y, button, pressed)))
+        self.capture_stats.add(self.get_current_time() - current_time)
+
+    def on_mouse_scroll(self, x, y, dx, dy):
+        if not self.is_recording:
+            return
+        current_time = self.get_current_time()
+        self.capture_ring.push(('mouse_scroll', current_time, (x, y, dx, dy)))
+        self.capture_stats.add(self.get_current_time() - current_time)
+
+    def on_mouse_move(self, x, y):
+        if not self.is_recording:
+            return
+        current_time = self.get_current_time()
+        self.capture_ring.push(('mouse_move', current_time, (x, y)))
+        self.capture_stats.add(self.get_current_time() - current_time)
+
+    def drain_capture(self):
+        """Process captured input off the listener threads until capture stops"""
+        handlers = {
+            'key_press': self.handle_key_press,
+            'key_release': self.handle_key_release,
+            'mouse_click': self.handle_mouse_click,
+            'mouse_scroll': self.handle_mouse_scroll,
+            'mouse_move': self.handle_mouse_move,
+        }
+        while True:
+            # Read the flag before draining so nothing pushed earlier is missed
+            capturing = self.is_recording
+            batch = self.capture_ring.pop_batch()
+            for kind, current_time, payload in batch:
+                try:
+                    if kind == 'key_press' or kind == 'key_release':
+                        handlers[kind](current_time, payload)
+                    else:
+                        handlers[kind](current_time, *payload)
+                except Exception as e:
+                    # One bad event must not stop capture for the rest of the recording
+                    self.capture_stats.errors += 1
+                    if self.capture_stats.errors <= self.max_logged_errors:
+                        print(f"Error processing {kind} at {current_time - self.start_time:.6f}s: {str(e)}")
+            if not batch:
+                if not capturing:
+                    break
+                time.sleep(self.drain_interval)
+
+    def emit_event(self, event):
+        """Hand a finished typed event to the stream writer or the in-memory store.
+
+        The store takes it straight into its columns; a dict is only built
+        for the event bus, listeners and the stream writer.
+        """
+        if self.event_bus is not None or self.event_listeners or self.stream_writer is not None:
+            fields = event.to_dict()
+            if self.event_bus is not None:
+                self.event_bus.publish(fields)
+            for listener in self.event_listeners:
+                listener(fields)
+            if self.stream_writer is not None:
+                self.stream_writer.write(fields)
+                return
+        self.recorded_keys.append(event)
+
+    def handle_key_press(self, current_time, key):
+        relative_time = current_time - self.start_time
+
+        try:
+            # Convert key to string representation
+            key_char = key_name(key)
+
+            # The marker hotkey is not part of the recording
+            if key_char == HOTKEYS['add_marker']:
+                self.add_marker(current_time=current_time)
+                return
+
+            if key_char not in self.pressed_keys:
+                self.pressed_keys[key_char] = relative_time
+                self.logger.log(f"Key pressed: {key_char} at {relative_time:.6f}s")
+        except AttributeError:
+            pass
+
+    def handle_key_release(self, current_time, key):
+        relative_time = current_time - self.start_time
+
+        try:
+            # Convert key to string representation
+            key_char = key_name(key)
+            
+            if key_char in self.pressed_keys:
+                press_time = self.pressed_keys.pop(key_char)
+                duration = relative_time - press_time
+                
+                self.emit_event(KeyEvent(key_char, round(press_time, 6), round(relative_time, 6),
+                                         round(duration, 6)))
+                self.logger.log(f"Key released: {key_char} - Duration: {duration:.6f}s")
+        except AttributeError:
+            pass
+
+    def handle_mouse_click(self, current_time, x, y, button, pressed):
+        relative_time = current_time - self.start_time
+
+        # Convert button to string name
+        name = button_name(button)
+        
+        if pressed and name not in self.pressed_mouse_buttons:
+            self.pressed_mouse_buttons[name] = relative_time
+            self.logger.log(f"Mouse {name} pressed at {relative_time:.6f}s")
+            
+        elif not pressed and name in self.pressed_mouse_buttons:
+            press_time = self.pressed_mouse_buttons.pop(name)
+            duration = relative_time - press_time
+            
+            self.emit_event(ClickEvent(f'mouse_{name}', round(press_time, 6), round(relative_time, 6),
+                                       round(duration, 6)))
+            self.logger.log(f"Mouse {name} released - Duration: {duration:.6f}s")
+
+    def handle_mouse_scroll(self, current_time, x, y, dx, dy):
+        relative_time = current_time - self.start_time
+
+        direction = 'up' if dy > 0 else 'down'
+        self.emit_event(ScrollEvent(direction, dx, dy, round(relative_time, 6), round(relative_time, 6), 0.0))
+        self.logger.log(f"Mouse scrolled {direction} at {relative_time:.6f}s")
+
+    def handle_mouse_move(self, current_time, x, y):
+        relative_time = current_time - self.start_time
+        # Whole pixels, like the saved paths (macOS reports floats)
+        x, y = int(round(x)), int(round(y))
+
+        # If mouse wasn't moving before, this is the start of movement
+        if not self.is_mouse_moving:
+            self.is_mouse_moving = True
+            self.mouse_move_start_time = current_time
+            self.mouse_move_start_pos = (x, y)
+            self.mouse_trajectory.reset()
+            self.mouse_trajectory.append(current_time, x, y)
+            self.logger.log(f"Mouse movement started at ({x}, {y})")
+            return
+
+        # Keep every raw sample of the movement for path simplification
+        self.mouse_trajectory.append(current_time, x, y)
+
+        # Check if mouse has stopped moving (no movement for 0.1 seconds)
+        if self.last_mouse_position is not None:
+            dx = x - self.last_mouse_position[0]
+            dy = y - self.last_mouse_position[1]
+            time_diff = current_time - self.last_mouse_time
+            
+            # If mouse has stopped moving (very small movement)
+            if abs(dx) < 2 and abs(dy) < 2 and time_diff > 0.1:
+                if self.is_mouse_moving:
+                    self.finish_mouse_move(x, y, current_time)
+
+        self.last_mouse_position = (x, y)
+        self.last_mouse_time = current_time
+
+    def add_marker(self, label=None, current_time=None):
+        """Mark the current point of the recording, e.g. before a wait that has to be kept"""
+        if not self.is_recording:
+            return
+        if current_time is None:
+            current_time = self.get_current_time()
+        self.marker_count += 1
+        marker = MarkerEvent(label or f"marker {self.marker_count}",
+                             round(current_time - self.start_time, 6))
+        self.emit_event(marker)
+        print(f"Added {marker.label} at {marker.time:.3f}s")
+
+    def finish_mouse_move(self, x, y, current_time):
+        """Record the movement that ends at (x, y) at current_time"""
+        self.is_mouse_moving = False
+        relative_time = current_time - self.start_time
+        total_time = current_time - self.mouse_move_start_time
+        total_distance = ((x - self.mouse_move_start_pos[0])**2 + 
+                       (y - self.mouse_move_start_pos[1])**2)**0.5
+        avg_speed = total_distance / total_time if total_time > 0 else 0
+        direction = math.atan2(y - self.mouse_move_start_pos[1],
+                            x - self.mouse_move_start_pos[0])
+        
+        path = self.mouse_trajectory.simplify(self.path_epsilon)
+        self.mouse_trajectory.reset()
+        self.emit_event(MoveEvent(self.mouse_move_start_pos[0], self.mouse_move_start_pos[1], x, y,
+                                  total_distance, avg_speed, direction, round(total_time, 6),
+                                  round(relative_time - total_time, 6), path))
+        self.logger.log(f"Mouse movement ended: Distance: {total_distance:.1f}px, "
+                        f"Avg Speed: {avg_speed:.1f}px/s, "
+                        f"Direction: {math.degrees(direction):.1f}°, "
+                        f"Path points: {len(path)}")
+
+    def start_recording(self):
+        keyboard, mouse = load_pynput()
+        self.set_recording(EventStore())
+        self.recording_hash = None
+        self.marker_count = 0
+        self.pressed_keys = {}
+        self.pressed_mouse_buttons = {}
+        self.last_mouse_position = None
+        self.last_mouse_time = None
+        self.is_mouse_moving = False
+        self.mouse_move_start_time = None
+        self.mouse_move_start_pos = None
+        self.mouse_trajectory.reset()
+        self.capture_ring = CaptureRing(self.capture_ring.capacity)
+        self.capture_stats.reset()
+        if self.streaming:
+            self.stream_writer = StreamingRecordingWriter(self.stream_file)
+            self.stream_writer.start()
+        self.start_time = self.get_current_time()
+        if self.event_bus is not None:
+            self.event_bus.begin_recording()
+        self.is_recording = True
+
+        self.drain_thread = threading.Thread(target=self.drain_capture, daemon=True)
+        self.drain_thread.start()
+        
+        # Start listeners
+        self.keyboard_listener = keyboard.Listener(
+            on_press=self.on_key_press,
+            on_release=self.on_key_release)
+        self.mouse_listener = mouse.Listener(
+            on_click=self.on_mouse_click,
+            on_scroll=self.on_mouse_scroll,
+            on_move=self.on_mouse_move)
+            
+        self.keyboard_listener.start()
+        self.mouse_listener.start()
+        
+        print("Recording started... Press 'F6' to stop recording.")
+
+    def stop_recording(self):
+        self.is_recording = False
+        
+        # Stop listeners
+        if self.keyboard_listener:
+            self.keyboard_listener.stop()
+        if self.mouse_listener:
+            self.mouse_listener.stop()
+
+        # Let the drain thread process everything captured so far
+        if self.drain_thread:
+            self.drain_thread.join()
+            self.drain_thread = None
+        print(f"Capture overhead: {self.capture_stats.summary(self.capture_ring)}")
+        
+        # Handle any remaining pressed keys/buttons
+        current_time = self.get_current_time()
+        relative_time = current_time - self.start_time
+
+        # Keep a movement that was still in progress
+        if self.is_mouse_moving and self.last_mouse_position is not None:
+            self.finish_mouse_move(*self.last_mouse_position, self.last_mouse_time)
+        
+        for key, press_time in self.pressed_keys.items():
+            self.emit_event(KeyEvent(key, round(press_time, 6), round(relative_time, 6),
+                                     round(relative_time - press_time, 6)))
+            
+        for button, press_time in self.pressed_mouse_buttons.items():
+            self.emit_event(ClickEvent(f'mouse_{button}', round(press_time, 6), round(relative_time, 6),
+                                       round(relative_time - press_time, 6)))
+            
+        self.pressed_keys = {}
+        self.pressed_mouse_buttons = {}
+
+        if self.stream_writer is not None:
+            # Everything is already on disk apart from the reorder window
+            self.stream_writer.close()
+            written = self.stream_writer.events_written
+            self.stream_writer = None
+            if written:
+                print(f"\nRecording streamed to {self.stream_file} ({written} events)")
+            else:
+                print("\nNo keys were recorded.")
+            return
+        
+        if self.recorded_keys:
+            self.recorded_keys.sort()
+            
+            # Save to file, written straight from the columns
+            write_recording(self.recorded_keys, self.output_file)
+            print(f"\nRecording saved to {self.output_file}")
+            if self.library is not None:
+                name = datetime.now().strftime('recording_%Y%m%d_%H%M%S')
+                self.library.add(name, self.recorded_keys)
+                print(f"Added to macro library as '{name}'")
+            self.analyze_recording()
+        else:
+            print("\nNo keys were recorded.")
+
+    def analyze_recording(self):
+        """Print duration, timing and mouse statistics for the current recording"""
+        if not self.recorded_keys:
+            return
+        print("\n" + format_report(analyze(self.recorded_keys)))
+
+    def optimize_recording(self, **options):
+        """Replace the current recording with its optimized version (see recordingOptimizer.optimize)"""
+        if not self.recorded_keys:
+            return None
+        events, report = optimize(self.recorded_keys, **options)
+        self.set_recording(EventStore.from_events(events))
+        self.recording_hash = None
+        print("\n" + format_optimize_report(report))
+        return report
+
+    def set_recording(self, events):
+        """Make events the current recording, closing a memory-mapped one it replaces"""
+        previous = self.recorded_keys
+        self.recorded_keys = events
+        if isinstance(previous, BinaryRecording) and previous is not events:
+            previous.close()
+
+    def load_recording(self, path=None):
+        """Load the recording from a JSON, streamed .jsonl or binary .mrec file"""
+        path = path or self.output_file
+        try:
+            if path.endswith('.mrec'):
+                # Memory-mapped; records are decoded as replay reads them
+                self.set_recording(BinaryRecording(path))
+            elif path.endswith('.jsonl'):
+                # Read line by line as replay goes, so nothing is parsed up front
+                self.recording_hash = file_hash(path)
+                self.set_recording(EventStream(path))
+                print(f"Streaming recording from {path}")
+                return True
+            else:
+                with open(path, 'r') as f:
+                    self.set_recording(EventStore.from_events(json.load(f)))
+            self.recording_hash = file_hash(path)
+            print(f"Loaded recording from {path}")
+            print(f"Total events: {len(self.recorded_keys)}")
+            return True
+        except FileNotFoundError:
+            print(f"No recording file found at {path}")
+            return False
+        except ValueError:  # Also covers json.JSONDecodeError
+            print(f"Error reading recording file {path}")
+            return False
+
+    def cached_replay_plan(self):
+        """Plan compiled earlier for the current recording, or None"""
+        if self.recording_hash is not None:
+            return self.plan_cache.get(self.recording_hash)
+        if self.current_plan is not None and self.current_plan_source is self.recorded_keys:
+            return self.current_plan
+        return None
+
+    def keep_replay_plan(self, plan):
+        """Reuse plan for the current recording until it changes"""
+        self.plan_cache.put(plan)
+        self.current_plan = plan
+        self.current_plan_source = self.recorded_keys
+
+    def compile_replay_plan(self):
+        """Replay plan for the current recording, reused while its source is unchanged"""
+        plan = self.cached_replay_plan()
+        if plan is not None:
+            return plan
+
+        start = time.perf_counter()
+        plan = compile_plan(iter_replay_events(self.recorded_keys), self.resolve_key,
+                            self.resolve_button, self.recording_hash)
+        print(f"Compiled replay plan: {plan.event_count} events, {len(plan)} steps "
+              f"in {time.perf_counter() - start:.3f}s")
+        self.keep_replay_plan(plan)
+        return plan
+
+    def time_index(self):
+        """TimeIndex of the current recording, rebuilt when the recording changes"""
+        if self.current_index is None or self.current_index_source is not self.recorded_keys:
+            start = time.perf_counter()
+            self.current_index = TimeIndex(self.recorded_keys)
+            self.current_index_source = self.recorded_keys
+            print(f"Indexed {len(self.current_index)} events in {time.perf_counter() - start:.3f}s")
+        return self.current_index
+
+    def replay_window(self, start=None, end=None):
+        """Events from start to end (seconds or marker labels) with the state at start rebuilt"""
+        index = self.time_index()
+        seek_start = time.perf_counter()
+        events = index.window(start, end)
+        print(f"Seeked to {start if start is not None else 0}"
+              + (f" until {end}" if end is not None else "")
+              + f": {len(events)} events in {(time.perf_counter() - seek_start) * 1000:.3f}ms")
+        return events
+
+    def resolve_key(self, key_str):
+        """Convert a recorded key string to what the keyboard controller expects"""
+        return resolve_key(key_str)
+
+    def resolve_button(self, button_name):
+        """Convert a recorded button name to a mouse Button"""
+        return resolve_button(button_name)
+
+    def has_recording(self):
+        """Load the last saved recording if none is in memory; True if there is one"""
+        if not self.recorded_keys:
+            if not self.load_recording(self.stream_file if self.streaming else None):
+                print("No recording to replay!")
+                return False
+        return True
+
+    def replay_recording(self, speed_multiplier=1.0, telemetry_file=None, countdown=3, repeat=1,
+                         backend=None, cancel_token=None, plan=None, start=None, end=None):
+        """Replay the recording.
+
+        repeat replays it that many times back to back (None loops until ESC)
+        with a single countdown. Timing is kept per iteration: each one is
+        summarized as it ends, and last_replay_telemetry and telemetry_file
+        (.json or .csv) get the last iteration's report. backend overrides self.backend for this replay.
+        cancel_token (a CancellationToken) lets another thread stop it.
+        plan replays a precompiled ReplayPlan instead of the recording.
+        start and end (seconds or marker labels) replay only part of it,
+        starting with the keys, buttons and mouse position it had at start.
+        """
+        backend = backend or self.backend
+        cancel_token = cancel_token or CancellationToken()
+        self.last_replay_seconds = None
+        if plan is None and (start is not None or end is not None):
+            if not self.has_recording():
+                return
+            try:
+                window = self.replay_window(start, end)
+            except (KeyError, ValueError) as e:
+                print(e.args[0])
+                return
+            plan = compile_plan(window, self.resolve_key, self.resolve_button)
+        if plan is None:
+            if not self.has_recording():
+                return
+            # Without a plan from an earlier replay the first pass streams
+            # through the pipeline and compiles the plan as it goes
+            plan = self.cached_replay_plan()
+
+        repeat_text = "" if repeat == 1 else (" in a loop" if repeat is None else f" {repeat} times")
+        print(f"Replaying recording at {speed_multiplier}x speed{repeat_text}...")
+        print(f"Press {HOTKEYS['stop_replay']} to stop replay")
+        
+        # Wait for 3 seconds before starting replay
+        for i in range(countdown, 0, -1):
+            print(f"Starting in {i}...")
+            if cancel_token.wait(1):
+                print("Replay cancelled before it started")
+                return
+
+        scheduler = DeadlineScheduler(realtime=backend.realtime)
+        backend.start(scheduler)
+        telemetry = ReplayTelemetry()
+        self.last_replay_telemetry = telemetry
+        clock = scheduler.clock
+        active_keys = set()
+        active_mouse_buttons = set()
+        log = self.replay_logger.log
+
+        replay_origin = clock()
+        replayed_actions = 0  # Over the iterations before the current one
+
+        def timed(kind, held=None, item=None):
+            # Callback for backend.send: once the action has been injected, time it
+            # relative to the start of the iteration against the deadline it was
+            # scheduled for, then add item to or discard it from the held set
+            deadline = scheduler.current_deadline
+
+            def sent(call_start, latency):
+                telemetry.record(kind, deadline, call_start - scheduler.start_time, latency)
+                if held is not None:
+                    held(item)
+            return sent
+
+        def replay_mouse_move(event):
+            log(f"Replaying: Moving mouse from ({event['start_x']}, {event['start_y']}) to ({event['end_x']}, {event['end_y']}) at {scheduler.elapsed():.6f}s")
+
+        def move_mouse(x, y):
+            backend.send('move_to', (x, y), timed(MOVE))
+
+        def replay_scroll(event):
+            call_start = clock()
+            if 'dy' in event:
+                backend.send('scroll', (event['dx'], event['dy']), timed(SCROLL))
+            else:
+                # Older recordings only store one tick's direction
+                backend.send('scroll', (0, 1 if event['direction'] == 'up' else -1), timed(SCROLL))
+            log(f"Replaying: Scrolling {event['direction']} at {call_start - scheduler.start_time:.6f}s")
+
+        def press_mouse(button, button_name):
+            call_start = clock()
+            backend.send('press_button', (button,), timed(PRESS, active_mouse_buttons.add, button))
+            log(f"Replaying: Clicking mouse {button_name} at {call_start - scheduler.start_time:.6f}s")
+
+        def release_mouse(button):
+            call_start = clock()
+            try:
+                backend.send('release_button', (button,), timed(RELEASE, active_mouse_buttons.discard, button))
+            except:
+                pass
+            log(f"Replaying: Releasing mouse {button} at {call_start - scheduler.start_time:.6f}s")
+
+        def press_key(key_obj, key_str):
+            call_start = clock()
+            try:
+                backend.send('press_key', (key_obj,), timed(PRESS, active_keys.add, key_obj))
+            except Exception as e:
+                print(f"Error handling key {key_str}: {str(e)}")
+            log(f"Replaying: Pressing {key_str} at {call_start - scheduler.start_time:.6f}s")
+
+        def release_key(key_obj):
+            call_start = clock()
+            try:
+                backend.send('release_key', (key_obj,), timed(RELEASE, active_keys.discard, key_obj))
+            except:
+                pass
+            log(f"Replaying: Releasing {key_obj} at {call_start - scheduler.start_time:.6f}s")
+
+        try:
+            handlers = {
+                'press_key': press_key,
+                'release_key': release_key,
+                'press_mouse': press_mouse,
+                'release_mouse': release_mouse,
+                'scroll': replay_scroll,
+                'move_start': replay_mouse_move,
+                'move_mouse': move_mouse,
+            }
+            stopped_at = None
+            iteration = 0
+            while repeat is None or iteration < repeat:
+                iteration += 1
+                if repeat != 1:
+                    print(f"Iteration {iteration}" + (f"/{repeat}" if repeat else ""))
+                if iteration > 1:
+                    # A fresh one per iteration, so a looping replay does not keep growing it
+                    replayed_actions += len(telemetry)
+                    telemetry = ReplayTelemetry()
+                    self.last_replay_telemetry = telemetry
+                builder = None
+                if plan is not None:
+                    timeline = plan.timeline(handlers, speed_multiplier)
+                else:
+                    # Events flow through parse -> reorder -> resolve -> schedule
+                    # and are only pulled by the dispatcher shortly before they are due.
+                    # A memory-mapped or streamed recording played once keeps no steps.
+                    single_pass = isinstance(self.recorded_keys, (BinaryRecording, EventStream)) and repeat == 1
+                    builder = PlanBuilder(iter_replay_events(self.recorded_keys), self.resolve_key,
+                                          self.resolve_button, self.recording_hash,
+                                          keep_steps=not single_pass)
+                    timeline = builder.timeline(handlers, speed_multiplier)
+
+                if not scheduler.run(timeline, should_stop=cancel_token, on_tick=backend.flush):
+                    stopped_at = clock()
+                    print("Replay stopped by user")
+                    break
+                if repeat != 1 and backend.realtime and len(telemetry):
+                    report = telemetry.report()
+                    print(f"Iteration {iteration} timing: {report['actions']} actions, lateness p99 "
+                          f"{report['lateness_p99'] * 1000:.3f}ms, max {report['lateness_max'] * 1000:.3f}ms")
+                if builder is not None:
+                    # Later repeats and replays reuse what the first pass compiled
+                    plan = builder.plan()
+                    if plan is not None:
+                        self.keep_replay_plan(plan)
+
+        finally:
+            self.last_replay_seconds = clock() - replay_origin
+            # Inject whatever is still queued first, so the keys it presses get released below
+            backend.flush()
+            # Clean up: release any keys that might still be pressed
+            print("Cleaning up: releasing any remaining pressed keys")
+            for key in active_keys.copy():
+                try:
+                    backend.release_key(key)
+                    print(f"Released remaining key: {key}")
+                except:
+                    pass
+            
+            # Clean up: release any mouse buttons that might still be pressed
+            print("Cleaning up: releasing any remaining pressed mouse buttons")
+            for button in active_mouse_buttons.copy():
+                try:
+                    backend.release_button(button)
+                    print(f"Released remaining mouse button: {button}")
+                except:
+                    pass
+            backend.close()
+
+            # Abort latency: from the stop request to the dispatcher stopping
+            # and to everything held being released
+            if cancel_token.cancelled and stopped_at is not None:
+                released_at = clock()
+                self.last_abort_latency = {
+                    'reason': cancel_token.reason,
+                    'stop': stopped_at - cancel_token.cancelled_at,
+                    'release': released_at - cancel_token.cancelled_at,
+                }
+                print(f"Replay cancelled ({cancel_token.reason}): stopped after "
+                      f"{self.last_abort_latency['stop'] * 1000:.2f}ms, everything released after "
+                      f"{self.last_abort_latency['release'] * 1000:.2f}ms")
+
+            print("\nReplay completed!")
+            if backend.realtime:
+                print(format_timing_report(telemetry.report()))
+            else:
+                elapsed = clock() - replay_origin
+                actions = replayed_actions + len(telemetry)
+                rate = actions / elapsed if elapsed > 0 else 0.0
+                print(f"Replayed {actions} actions in {elapsed:.3f}s ({rate:.0f} actions/s)")
+            if telemetry_file:
+                telemetry.export(telemetry_file)
+                print(f"Replay timing written to {telemetry_file}")
+            print("\nAvailable commands:")
+            print_hotkeys()
+
+    def replay_fast(self, min_hold=0.02, min_gap=0.005, keep_waits=False, start=None, end=None,
+                    **replay_options):
+        """Replay the recording packed as tightly as min_hold and min_gap allow.
+
+        See recordingOptimizer.pack_timing; keep_waits keeps the recorded
+        pause after each marker. start and end limit it to part of the
+        recording as in replay_recording. Prints the events per second
+        achieved against the recording's own pace.
+        """
+        if not self.has_recording():
+            return
+        plan_key = None
+        plan = None
+        if self.recording_hash is not None:
+            plan_key = f"{self.recording_hash}:packed:{min_hold}:{min_gap}:{keep_waits}:{start}:{end}"
+            plan = self.plan_cache.get(plan_key)
+        if start is not None or end is not None:
+            try:
+                source = self.replay_window(start, end)
+            except (KeyError, ValueError) as e:
+                print(e.args[0])
+                return
+        else:
+            source = self.recorded_keys
+        if plan is None:
+            events, report = pack_timing(source, min_hold, min_gap, keep_waits)
+            print(format_pack_report(report))
+            plan = compile_plan(events, self.resolve_key, self.resolve_button, plan_key)
+            self.plan_cache.put(plan)
+
+        self.replay_recording(plan=plan, **replay_options)
+
+        count, recorded_seconds = recording_summary(source)
+        if self.last_replay_seconds:
+            print(f"Throughput: {count / self.last_replay_seconds:.1f} events/s over "
+                  f"{self.last_replay_seconds:.3f}s, recorded at "
+                  f"{count / recorded_seconds if recorded_seconds else 0:.1f} events/s over "
+                  f"{recorded_seconds:.3f}s ({recorded_seconds / self.last_replay_seconds:.1f}x faster)")
+
+    def replay(self, **replay_options):
+        """Replay with the current speed and mode settings"""
+        replay_options.setdefault('speed_multiplier', self.replay_speed)
+        replay_options.setdefault('start', self.replay_start)
+        replay_options.setdefault('end', self.replay_end)
+        if self.fast_mode:
+            self.replay_fast(**self.fast_options, **replay_options)
+        else:
+            self.replay_recording(**replay_options)
+
+    def change_speed(self, steps):
+        """Move the replay speed up or down SPEED_STEPS"""
+        slower = [speed for speed in SPEED_STEPS if speed < self.replay_speed]
+        faster = [speed for speed in SPEED_STEPS if speed > self.replay_speed]
+        if steps < 0 and slower:
+            self.replay_speed = slower[-1]
+        elif steps > 0 and faster:
+            self.replay_speed = faster[0]
+        print(f"Replay speed: {self.replay_speed}x")
+
+    def toggle_fast_mode(self):
+        self.fast_mode = not self.fast_mode
+        print(f"As-fast-as-possible replay: {'on' if self.fast_mode else 'off'}")
+
+    def replay_macro(self, name, **replay_options):
+        """Replay a named recording from the macro library"""
+        if self.library is None:
+            print("No macro library configured")
+            return
+        try:
+            self.set_recording(self.library.load(name))
+        except KeyError as e:
+            print(e.args[0])
+            return
+        self.recording_hash = self.library.index[name]['hash']
+        print(f"Loaded macro '{name}' ({len(self.recorded_keys)} events)")
+        self.replay(**replay_options)
+
+    def cleanup(self):
+        """Clean up any pressed keys or mouse buttons"""
+        print("\nCleaning up...")
+        # Stop a running replay; it releases whatever it still holds
+        if self.replay_worker.cancel("quit"):
+            self.replay_worker.join(1.0)
+        # Release any pressed keys
+        for key in self.pressed_keys.copy():
+            try:
+                self.keyboard_controller.release(key)
+            except:
+                pass
+        
+        # Release any pressed mouse buttons
+        for button in self.pressed_mouse_buttons.copy():
+            try:
+                self.mouse_controller.release(button)
+            except:
+                pass
+        
+        # Stop listeners if they're running
+        if self.keyboard_listener:
+            self.keyboard_listener.stop()
+        if self.mouse_listener:
+            self.mouse_listener.stop()
+        
+        self.running = False
+
+def run_hotkeys(recorder):
+    """Interactive session: record, replay and manage macros with the global hotkeys"""
+    def signal_handler(signum, frame):
+        print("\nReceived exit signal. Cleaning up...")
+        recorder.cleanup()
+        sys.exit(0)
+    
+    # Register signal handlers
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
+    
+    print("Improved Input Recorder")
+    print("----------------------")
+    print_hotkeys()
+    print("Ctrl+C - Emergency Exit")
+
+    # Try to load any existing recording
+    recorder.load_recording()
+
+    on_press, on_release = hotkey_callbacks(recorder)
+
+    # Set up keyboard listener
+    keyboard, _ = load_pynput()
+    keyboard_listener = keyboard.Listener(
+        on_press=on_press,
+        on_release=on_release)
+    
+    keyboard_listener.start()
+    
+    try:
+        # Keep the program running until 'q' is pressed or Ctrl+C is received
+        while recorder.running:
+            time.sleep(0.1)
+    except KeyboardInterrupt:
+        print("\nReceived Ctrl+C. Cleaning up...")
+        recorder.cleanup()
+    finally:
+        print("Program terminated.")
+
+def hotkey_callbacks(recorder):
+    """(on_press, on_release) listener callbacks that dispatch HOTKEYS to the recorder.
+
+    Keys a replay injects never count as hotkeys: pynput 1.8 flags them as
+    injected, and while a replay runs only the stop key is handled anyway,
+    for backends that cannot tell injected keys apart.
+    """
+    def is_hotkey(name, injected):
+        if injected:
+            return False
+        return not recorder.replay_worker.running or name == HOTKEYS['stop_replay']
+
+    def on_press(key, injected=False):
+        try:
+            name = key_name(key)
+            if not is_hotkey(name, injected):
+                return
+            if name == HOTKEYS['start_recording']:
+                recorder.start_recording()
+            elif name == HOTKEYS['replay_recording']:
+                recorder.replay_worker.start(recorder.replay)
+            elif name in MACRO_HOTKEYS:
+                recorder.replay_worker.start(recorder.replay_macro, MACRO_HOTKEYS[name])
+            elif name == HOTKEYS['stop_replay']:
+                recorder.replay_worker.cancel(name)
+            elif name == HOTKEYS['slower']:
+                recorder.change_speed(-1)
+            elif name == HOTKEYS['faster']:
+                recorder.change_speed(1)
+            elif name == HOTKEYS['toggle_fast_mode']:
+                recorder.toggle_fast_mode()
+        except AttributeError:
+            pass
+
+    def on_release(key, injected=False):
+        try:
+            name = key_name(key)
+            if not is_hotkey(name, injected):
+                return
+            if name == HOTKEYS['stop_recording'] and recorder.is_recording:
+                recorder.stop_recording()
+            elif name == HOTKEYS['quit_program']:
+                print("\nQuitting program...")
+                recorder.cleanup()
+                return False  # Stop listener
+        except AttributeError:
+            pass
+
+    return on_press, on_release
@@ -0,0 +1,69 @@
+"""Recorded key and button names and the pynput objects they stand for.
+
+Recordings and HOTKEYS name keys the way they are saved: the character of
+printable keys and 'Key.<name>' for special keys, mouse buttons as 'left',
+'right' or 'Button.<name>'. pynput is only imported once a name has to
+become a controller object, so everything else runs without a display.
+"""
+
+_pynput = None
+_missing = None  # Why pynput could not be imported, once that was tried
+
+
+def load_pynput(required=True):
+    """(keyboard, mouse) modules of pynput, imported on first use.
+
+    pynput needs an input backend (on Linux a display). Without one this
+    raises ImportError, or returns None with required=False.
+    """
+    global _pynput, _missing
+    if _pynput is None and _missing is None:
+        try:
+            from pynput import keyboard, mouse
+            _pynput = (keyboard, mouse)
+        except ImportError as e:
+            _missing = str(e) or "pynput is not available"
+    if _pynput is None and required:
+        raise ImportError(_missing)
+    return _pynput
+
+
+def key_name(key):
+    """Recorded name of a pynput key"""
+    return key.char if hasattr(key, 'char') else str(key)
+
+
+def button_name(button):
+    """Recorded name of a pynput mouse button"""
+    name = str(button)
+    if name in ('Button.left', 'Button.right'):
+        return name[len('Button.'):]
+    return name
+
+
+def resolve_key(key_str):
+    """Convert a recorded key string to what the keyboard controller expects.
+
+    Without pynput (e.g. replaying into a MemorySink headless) special keys
+    stay as their recorded names.
+    """
+    # Handle special keys
+    if key_str.startswith('Key.'):
+        modules = load_pynput(required=False)
+        if modules is None:
+            return key_str
+        return getattr(modules[0].Key, key_str[4:])  # Remove 'Key.' prefix
+    return key_str
+
+
+def resolve_button(button_name):
+    """Convert a recorded button name to a mouse Button (the name itself without pynput)"""
+    modules = load_pynput(required=False)
+    if modules is None:
+        return button_name
+    Button = modules[1].Button
+    if button_name == 'left':
+        return Button.left
+    elif button_name == 'right':
+        return Button.right
+    return getattr(Button, button_name)
@@ -0,0 +1,189 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+from binaryFormat import BinaryRecording
+from eventStore import EventStore
+from recordingWriter import write_recording
+from replayPipeline import iter_recording
+
+RECORDING_EXTENSIONS = ('.json', '.jsonl', '.mrec')
+INDEX_FILE = 'index.json'
+
+
+def file_hash(path):
+    """SHA-256 of a file's content"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def recording_summary(path):
+    """Event count and duration of a recording, read in one streaming pass"""
+    if isinstance(path, EventStore):
+        return len(path), max(path.end, default=0.0)
+    count = 0
+    duration = 0.0
+    for event in iter_recording(path):
+        count += 1
+        start = event.get('press_time', event.get('time', 0))
+        end = event.get('release_time', start + event.get('duration', 0.0))
+        if end > duration:
+            duration = end
+    return count, duration
+
+
+class MacroLibrary:
+    """A directory of named recordings with a metadata index and an LRU cache.
+
+    index.json keeps name, file, event count, duration, content hash, size
+    and mtime for every recording, so the library can be listed and searched
+    without opening them. Parsed recordings are kept in an LRU cache bounded
+    by total event count; an entry is reused as long as the file's mtime is
+    unchanged, or its content hash still matches after the mtime moved.
+    .mrec recordings are memory-mapped instead of cached: every load opens
+    the file again and the caller closes it when done.
+    """
+
+    def __init__(self, directory='macros', max_cached_events=2000000):
+        self.directory = directory
+        self.max_cached_events = max_cached_events
+        self.index = {}
+        self._cache = OrderedDict()  # name -> (mtime_ns, hash, events, count)
+        self._cached_events = 0
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+        self.refresh()
+
+    @property
+    def index_path(self):
+        return os.path.join(self.directory, INDEX_FILE)
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, 'r') as f:
+                self.index = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.index = {}
+
+    def _save_index(self):
+        temp_path = self.index_path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(self.index, f, indent=2)
+        os.replace(temp_path, self.index_path)
+
+    def _index_file(self, name, filename, stat):
+        path = os.path.join(self.directory, filename)
+        count, duration = recording_summary(path)
+        self.index[name] = {
+            'name': name,
+            'file': filename,
+            'events': count,
+            'duration': round(duration, 6),
+            'hash': file_hash(path),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+        }
+
+    def refresh(self):
+        """Re-index recordings added, changed or removed on disk.
+
+        Unchanged files (same size and mtime) are only stat'ed.
+        """
+        seen = set()
+        changed = False
+        for filename in sorted(os.listdir(self.directory)):
+            name, extension = os.path.splitext(filename)
+            if extension not in RECORDING_EXTENSIONS or filename == INDEX_FILE:
+                continue
+            seen.add(name)
+            stat = os.stat(os.path.join(self.directory, filename))
+            entry = self.index.get(name)
+            if (entry is None or entry['file'] != filename or entry['size'] != stat.st_size
+                    or entry['mtime_ns'] != stat.st_mtime_ns):
+                self._index_file(name, filename, stat)
+                changed = True
+        for name in list(self.index):
+            if name not in seen:
+                del self.index[name]
+                self._evict(name)
+                changed = True
+        if changed:
+            self._save_index()
+
+    def list(self):
+        """Index entries sorted by name"""
+        return [self.index[name] for name in sorted(self.index)]
+
+    def search(self, text):
+        """Entries whose name contains text (case-insensitive)"""
+        text = text.lower()
+        return [entry for entry in self.list() if text in entry['name'].lower()]
+
+    def path(self, name):
+        if name not in self.index:
+            raise KeyError(f"No macro named {name!r} in {self.directory}")
+        return os.path.join(self.directory, self.index[name]['file'])
+
+    def add(self, name, events, extension='.json'):
+        """Save events as a new library recording and index it"""
+        filename = name + extension
+        path = os.path.join(self.directory, filename)
+        write_recording(events, path)
+        self._evict(name)
+        self._index_file(name, filename, os.stat(path))
+        self._save_index()
+        return path
+
+    def load(self, name):
+        """Parsed events of a macro, served from the cache while still current"""
+        path = self.path(name)
+        stat = os.stat(path)
+        cached = self._cache.get(name)
+        if cached is not None:
+            mtime_ns, content_hash, events, count = cached
+            if mtime_ns != stat.st_mtime_ns:
+                # Touched on disk; only reload if the content really changed
+                if file_hash(path) == content_hash:
+                    self._cache[name] = (stat.st_mtime_ns, content_hash, events, count)
+                    cached = self._cache[name]
+                else:
+                    self._evict(name)
+                    cached = None
+        if cached is not None:
+            self._cache.move_to_end(name)
+            self.hits += 1
+            return cached[2]
+
+        self.misses += 1
+        entry = self.index[name]
+        if entry['mtime_ns'] != stat.st_mtime_ns or entry['size'] != stat.st_size:
+            self._index_file(name, entry['file'], stat)
+            self._save_index()
+        if path.endswith('.mrec'):
+            # Memory-mapped; the OS page cache does the rest, and nothing
+            # here has to track when the caller is done with the mapping
+            return BinaryRecording(path)
+        events = EventStore.from_events(iter_recording(path))
+        self._store(name, stat.st_mtime_ns, self.index[name]['hash'], events)
+        return events
+
+    def _store(self, name, mtime_ns, content_hash, events):
+        count = len(events)
+        if count > self.max_cached_events:
+            return
+        self._cache[name] = (mtime_ns, content_hash, events, count)
+        self._cached_events += count
+        while self._cached_events > self.max_cached_events:
+            evicted, _ = next(iter(self._cache.items()))
+            self._evict(evicted)
+
+    def _evict(self, name):
+        cached = self._cache.pop(name, None)
+        if cached is not None:
+            self._cached_events -= cached[3]
@@ -0,0 +1,156 @@
+from array import array
+import math
+
+# Sampling limits for replayed mouse movements
+MAX_SAMPLE_RATE = 120  # Never emit more samples per second than this
+MIN_SAMPLE_SPACING = 2.0  # Never emit samples closer than this many pixels
+
+
+def smoothstep(t):
+    """Ease in/out curve used for natural looking movement"""
+    return t * t * (3 - 2 * t)
+
+
+def sample_count(distance, duration, max_rate=MAX_SAMPLE_RATE, min_spacing=MIN_SAMPLE_SPACING):
+    """Number of interpolation steps for a movement of this size and length"""
+    by_distance = math.ceil(distance / min_spacing)
+    by_duration = math.ceil(duration * max_rate)
+    return max(1, min(by_distance, by_duration))
+
+
+def interpolate_move(start_x, start_y, end_x, end_y, start_time, duration,
+                     max_rate=MAX_SAMPLE_RATE, min_spacing=MIN_SAMPLE_SPACING):
+    """Yield timestamped (t, x, y) samples along a smoothstep straight line.
+
+    Sample density adapts to the movement: long fast moves get up to
+    max_rate samples per second, short ones only as many as are needed to
+    advance min_spacing pixels per step. Consecutive samples that round to
+    the same pixel are skipped.
+    """
+    distance = math.hypot(end_x - start_x, end_y - start_y)
+    steps = sample_count(distance, duration, max_rate, min_spacing)
+    last = None
+    for i in range(steps + 1):
+        t = smoothstep(i / steps)
+        point = (int(start_x + (end_x - start_x) * t),
+                 int(start_y + (end_y - start_y) * t))
+        if point != last:
+            yield start_time + duration * i / steps, point[0], point[1]
+            last = point
+
+
+def interpolate_path(path, start_time, time_scale=1.0,
+                     max_rate=MAX_SAMPLE_RATE, min_spacing=MIN_SAMPLE_SPACING):
+    """Yield timestamped (t, x, y) samples along a recorded polyline.
+
+    path is a list of [offset, x, y] vertices with offsets relative to the
+    start of the movement. Each leg is interpolated linearly with the same
+    adaptive density as interpolate_move; the recorded vertices already
+    carry the acceleration of the original gesture.
+    """
+    last = None
+    prev_t, prev_x, prev_y = path[0]
+    for vertex_t, vertex_x, vertex_y in path[1:] if len(path) > 1 else path:
+        leg_duration = (vertex_t - prev_t) * time_scale
+        distance = math.hypot(vertex_x - prev_x, vertex_y - prev_y)
+        steps = sample_count(distance, leg_duration, max_rate, min_spacing)
+        for i in range(1 if last is not None else 0, steps + 1):
+            f = i / steps
+            point = (int(prev_x + (vertex_x - prev_x) * f),
+                     int(prev_y + (vertex_y - prev_y) * f))
+            if point != last:
+                yield start_time + prev_t * time_scale + leg_duration * f, point[0], point[1]
+                last = point
+        prev_t, prev_x, prev_y = vertex_t, vertex_x, vertex_y
+
+
+class TrajectoryBuffer:
+    """Raw (t, x, y) mouse samples stored in preallocated typed columns.
+
+    Samples live in array-backed columns (8 bytes for the timestamp, 4 for
+    each coordinate) instead of one dict per sample. The buffer is reset and
+    reused for every movement, so capacity only grows to the longest
+    single gesture seen. Coordinates are rounded to whole pixels, since
+    some platforms (macOS) report them as floats.
+    """
+
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self.t = array('d', bytes(8 * capacity))
+        self.x = array('i', bytes(4 * capacity))
+        self.y = array('i', bytes(4 * capacity))
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def _grow(self):
+        """Double the capacity of every column"""
+        self.t.extend(array('d', bytes(8 * self.capacity)))
+        self.x.extend(array('i', bytes(4 * self.capacity)))
+        self.y.extend(array('i', bytes(4 * self.capacity)))
+        self.capacity *= 2
+
+    def append(self, t, x, y):
+        if self.count == self.capacity:
+            self._grow()
+        i = self.count
+        self.t[i] = t
+        self.x[i] = int(round(x))
+        self.y[i] = int(round(y))
+        self.count = i + 1
+
+    def reset(self):
+        """Forget all samples but keep the allocated storage"""
+        self.count = 0
+
+    def simplify(self, epsilon=1.0):
+        """Return the buffered path as a compact [[offset, x, y], ...] polyline.
+
+        Offsets are relative to the first sample and rounded like the rest of
+        the recording. See simplify_indices for the error bound.
+        """
+        if self.count == 0:
+            return []
+        t0 = self.t[0]
+        return [[round(self.t[i] - t0, 6), self.x[i], self.y[i]]
+                for i in simplify_indices(self.t, self.x, self.y, self.count, epsilon)]
+
+
+def simplify_indices(ts, xs, ys, count, epsilon=1.0):
+    """Ramer-Douglas-Peucker simplification of a timed path.
+
+    Uses the synchronized Euclidean distance: each dropped sample is compared
+    with the point the simplified path reaches at that sample's timestamp,
+    not just the nearest point on the line. The replayed position therefore
+    never strays more than epsilon pixels from the recorded one at any
+    moment, which also preserves pauses and speed changes along the path.
+    Returns the sorted indices of the samples to keep.
+    """
+    if count <= 2:
+        return list(range(count))
+
+    keep = bytearray(count)
+    keep[0] = keep[count - 1] = 1
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        t0, x0, y0 = ts[first], xs[first], ys[first]
+        span = ts[last] - t0
+        dx = xs[last] - x0
+        dy = ys[last] - y0
+        max_error = -1.0
+        split = first
+        for i in range(first + 1, last):
+            f = (ts[i] - t0) / span if span > 0 else 0.0
+            error = math.hypot(xs[i] - (x0 + dx * f), ys[i] - (y0 + dy * f))
+            if error > max_error:
+                max_error = error
+                split = i
+        if max_error > epsilon:
+            keep[split] = 1
+            stack.append((first, split))
+            stack.append((split, last))
+    return [i for i in range(count) if keep[i]]
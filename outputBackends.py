@@ -0,0 +1,218 @@
+"""Output backends that replayed actions are injected through.
+
+replay_recording hands every action to a backend instead of calling the
+pynput controllers directly:
+
+- PynputBackend injects each action into the OS as it fires
+- DeferringBackend holds back the actions due in one scheduler tick and
+  passes them on when the tick is flushed; pynput has no call that injects
+  several events at once, so each one is still its own OS call
+- MemorySink only records what would have been injected; it needs no
+  display and lets replays run at unlimited speed
+
+Replay hands actions over with send(), whose callback only runs once the
+action has really been injected, so timing and the keys counted as held
+are right whichever backend defers what.
+"""
+import time
+
+
+class OutputBackend:
+    """Interface every backend implements"""
+
+    realtime = True  # False lets replay skip waiting for deadlines
+    clock = staticmethod(time.perf_counter)
+
+    def start(self, scheduler):
+        """Called when a replay starts with the scheduler that will drive it"""
+        self.clock = scheduler.clock
+
+    def send(self, action, args, sent=None):
+        """Inject an action by method name ('press_key', 'move_to', ...).
+
+        sent(call_start, latency) is called once the action has been
+        injected. Here that is right away and a failure raises; a backend
+        that defers injection calls it later and reports failures itself,
+        so a failed action is never timed or counted as held.
+        """
+        call_start = self.clock()
+        getattr(self, action)(*args)
+        if sent is not None:
+            sent(call_start, self.clock() - call_start)
+
+    def press_key(self, key):
+        raise NotImplementedError
+
+    def release_key(self, key):
+        raise NotImplementedError
+
+    def press_button(self, button):
+        raise NotImplementedError
+
+    def release_button(self, button):
+        raise NotImplementedError
+
+    def scroll(self, dx, dy):
+        raise NotImplementedError
+
+    def move_to(self, x, y):
+        raise NotImplementedError
+
+    def flush(self):
+        """Called after every scheduler tick"""
+
+    def close(self):
+        """Called when the replay is over"""
+
+
+class PynputBackend(OutputBackend):
+    """Injects actions with the pynput keyboard and mouse controllers"""
+
+    def __init__(self, keyboard_controller=None, mouse_controller=None):
+        if keyboard_controller is None or mouse_controller is None:
+            from pynput.keyboard import Controller as KeyboardController
+            from pynput.mouse import Controller as MouseController
+            keyboard_controller = keyboard_controller or KeyboardController()
+            mouse_controller = mouse_controller or MouseController()
+        self.keyboard_controller = keyboard_controller
+        self.mouse_controller = mouse_controller
+
+    def press_key(self, key):
+        self.keyboard_controller.press(key)
+
+    def release_key(self, key):
+        self.keyboard_controller.release(key)
+
+    def press_button(self, button):
+        self.mouse_controller.press(button)
+
+    def release_button(self, button):
+        self.mouse_controller.release(button)
+
+    def scroll(self, dx, dy):
+        self.mouse_controller.scroll(dx, dy)
+
+    def move_to(self, x, y):
+        self.mouse_controller.position = (x, y)
+
+
+class DeferringBackend(OutputBackend):
+    """Queues actions and hands them to another backend once per scheduler tick.
+
+    Dense macros often have several actions due in the same tick, e.g. a
+    chord plus the mouse samples that fell behind. They are sent back to
+    back after the tick instead of between scheduling work, still one call
+    each. The only calls saved are mouse positions queued in a row, which
+    collapse into the last one since only that one would be visible.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend if backend is not None else PynputBackend()
+        self.realtime = self.backend.realtime
+        self.pending = []
+        self.flushes = 0
+        self.sent = 0
+        self.coalesced = 0
+
+    def start(self, scheduler):
+        super().start(scheduler)
+        self.backend.start(scheduler)
+
+    def send(self, action, args, sent=None):
+        """Queue an action; sent is called from flush() once the backend injected it"""
+        if action == 'move_to' and self.pending and self.pending[-1][0] == 'move_to':
+            # The queued position is never injected, so its callback is dropped with it
+            self.pending[-1] = (action, args, sent)
+            self.coalesced += 1
+        else:
+            self.pending.append((action, args, sent))
+
+    def press_key(self, key):
+        self.send('press_key', (key,))
+
+    def release_key(self, key):
+        self.send('release_key', (key,))
+
+    def press_button(self, button):
+        self.send('press_button', (button,))
+
+    def release_button(self, button):
+        self.send('release_button', (button,))
+
+    def scroll(self, dx, dy):
+        self.send('scroll', (dx, dy))
+
+    def move_to(self, x, y):
+        self.send('move_to', (x, y))
+
+    def flush(self):
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, []
+        for action, args, sent in pending:
+            try:
+                self.backend.send(action, args, sent)
+            except Exception as e:
+                print(f"Error replaying {action}{args}: {str(e)}")
+        self.flushes += 1
+        self.sent += len(pending)
+        self.backend.flush()
+
+    def close(self):
+        self.flush()
+        self.backend.close()
+
+
+class MemorySink(OutputBackend):
+    """Records every action instead of injecting it.
+
+    actions holds (deadline, action, args) tuples in dispatch order, where
+    deadline is the scheduled replay time. The sink also tracks the pointer
+    position and which keys and buttons are held. With realtime=False (the
+    default) replay runs as fast as the scheduler can go.
+    """
+
+    def __init__(self, realtime=False):
+        self.realtime = realtime
+        self.scheduler = None
+        self.actions = []
+        self.position = None
+        self.pressed_keys = set()
+        self.pressed_buttons = set()
+
+    def start(self, scheduler):
+        super().start(scheduler)
+        self.scheduler = scheduler
+
+    def _record(self, action, args):
+        deadline = self.scheduler.current_deadline if self.scheduler is not None else None
+        self.actions.append((deadline, action, args))
+
+    def press_key(self, key):
+        self._record('press_key', (key,))
+        self.pressed_keys.add(key)
+
+    def release_key(self, key):
+        self._record('release_key', (key,))
+        self.pressed_keys.discard(key)
+
+    def press_button(self, button):
+        self._record('press_button', (button,))
+        self.pressed_buttons.add(button)
+
+    def release_button(self, button):
+        self._record('release_button', (button,))
+        self.pressed_buttons.discard(button)
+
+    def scroll(self, dx, dy):
+        self._record('scroll', (dx, dy))
+
+    def move_to(self, x, y):
+        self._record('move_to', (x, y))
+        self.position = (x, y)
+
+    def clear(self):
+        self.actions.clear()
+        self.position = None
+        self.pressed_keys.clear()
+        self.pressed_buttons.clear()
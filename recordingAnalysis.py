@@ -0,0 +1,430 @@
+"""Columnar analysis of recordings with NumPy.
+
+Works on any recording source (event list, .json, .jsonl or .mrec path)
+without touching pynput, so it can run headless from scripts:
+
+    from recordingAnalysis import analyze
+    report = analyze('keyboard_recording.mrec')
+
+Binary recordings are loaded straight from the memory-mapped record
+section, so even multi-million event files are analyzed in well under a
+second.
+"""
+import argparse
+import json
+import math
+
+import numpy as np
+
+import binaryFormat
+from binaryFormat import BinaryRecording
+from eventStore import KIND_MARKER, EventStore
+
+KIND_NAMES = {
+    binaryFormat.KIND_KEY: 'key',
+    binaryFormat.KIND_CLICK: 'click',
+    binaryFormat.KIND_SCROLL: 'scroll',
+    binaryFormat.KIND_MOVE: 'move',
+}
+
+
+def record_dtype(delta):
+    return np.dtype([
+        ('kind', 'u1'), ('flags', 'u1'), ('key_id', '<u2'), ('delta', delta),
+        ('hold', '<u4'), ('duration', '<u4'), ('a', '<i4'), ('b', '<i4'),
+        ('c', '<i4'), ('d', '<i4'), ('move', '<u4'), ('extra', '<u4'),
+    ])
+
+
+# numpy views of binaryFormat.RECORD and of the older RECORD_V2
+RECORD_DTYPE = record_dtype('<i8')
+RECORD_V2_DTYPE = record_dtype('<i4')
+assert RECORD_DTYPE.itemsize == binaryFormat.RECORD.size
+assert RECORD_V2_DTYPE.itemsize == binaryFormat.RECORD_V2.size
+MOVE_DTYPE = np.dtype([('distance', '<f8'), ('speed', '<f8'), ('direction', '<f8'),
+                       ('first_point', '<u4'), ('point_count', '<u4')])
+POINT_DTYPE = np.dtype([('offset', '<i4'), ('x', '<i4'), ('y', '<i4')])
+assert MOVE_DTYPE.itemsize == binaryFormat.MOVE.size
+assert POINT_DTYPE.itemsize == binaryFormat.POINT.size
+
+PERCENTILES = (50, 90, 99)
+
+
+class RecordingColumns:
+    """One array per field, one row per event, plus the interned key table"""
+
+    def __init__(self, keys, kind, key_id, start, end, duration, x0, y0, x1, y1, distance=None):
+        self.keys = keys
+        self.kind = kind
+        self.key_id = key_id
+        self.start = start
+        self.end = end
+        self.duration = duration
+        self.x0 = x0
+        self.y0 = y0
+        self.x1 = x1
+        self.y1 = y1
+        if distance is None:
+            distance = np.where(kind == binaryFormat.KIND_MOVE, endpoint_distance(x0, y0, x1, y1), 0.0)
+        self.distance = distance  # Mouse path length, the straight line for moves without a path
+
+    def __len__(self):
+        return len(self.kind)
+
+    @classmethod
+    def from_events(cls, events):
+        """Build columns from event dicts in a single pass"""
+        keys = []
+        key_ids = {}
+        kind, key_id, start, end, duration = [], [], [], [], []
+        x0, y0, x1, y1, distance = [], [], [], [], []
+        for event in events:
+            name = event['key']
+            if name not in key_ids:
+                key_ids[name] = len(keys)
+                keys.append(name)
+            key_id.append(key_ids[name])
+            event_duration = event.get('duration', 0.0)
+            if name == 'mouse_move':
+                kind.append(binaryFormat.KIND_MOVE)
+                begin = event['time']
+                end.append(begin + event_duration)
+                x0.append(event['start_x'])
+                y0.append(event['start_y'])
+                x1.append(event['end_x'])
+                y1.append(event['end_y'])
+                distance.append(event_path_length(event))
+            else:
+                if name == 'scroll':
+                    kind.append(binaryFormat.KIND_SCROLL)
+                elif name == 'marker':
+                    kind.append(binaryFormat.KIND_RAW)
+                elif name.startswith('mouse_'):
+                    kind.append(binaryFormat.KIND_CLICK)
+                else:
+                    kind.append(binaryFormat.KIND_KEY)
+                begin = event.get('press_time', event.get('time', 0))
+                end.append(event.get('release_time', begin + event_duration))
+                x0.append(0)
+                y0.append(0)
+                x1.append(0)
+                y1.append(0)
+                distance.append(0.0)
+            start.append(begin)
+            duration.append(event_duration)
+        return cls(keys, np.array(kind, dtype=np.uint8), np.array(key_id, dtype=np.int32),
+                   np.array(start, dtype=np.float64), np.array(end, dtype=np.float64),
+                   np.array(duration, dtype=np.float64),
+                   np.array(x0, dtype=np.int32), np.array(y0, dtype=np.int32),
+                   np.array(x1, dtype=np.int32), np.array(y1, dtype=np.int32),
+                   np.array(distance, dtype=np.float64))
+
+    @classmethod
+    def from_binary(cls, recording):
+        """Build columns directly from a memory-mapped BinaryRecording"""
+        dtype = RECORD_DTYPE if recording.record is binaryFormat.RECORD else RECORD_V2_DTYPE
+        records = np.frombuffer(recording.records, dtype=dtype)
+        start = np.cumsum(records['delta'], dtype=np.int64) / 1e6
+        duration = records['duration'] / 1e6
+        has_release = (records['flags'] & binaryFormat.FLAG_RELEASE) != 0
+        end = np.where(has_release, start + records['hold'] / 1e6, start + duration)
+        kind = records['kind'].copy()
+        key_id = records['key_id'].astype(np.int32)
+        is_move = kind == binaryFormat.KIND_MOVE
+        x0 = np.where(is_move, records['a'], 0)
+        y0 = np.where(is_move, records['b'], 0)
+        x1 = np.where(is_move, records['c'], 0)
+        y1 = np.where(is_move, records['d'], 0)
+
+        distance = np.where(is_move, endpoint_distance(x0, y0, x1, y1), 0.0)
+        with_path = np.flatnonzero(is_move & ((records['flags'] & binaryFormat.FLAG_PATH) != 0))
+        if len(with_path):
+            moves = np.frombuffer(recording.moves, dtype=MOVE_DTYPE)[records['move'][with_path]]
+            points = np.frombuffer(recording.points, dtype=POINT_DTYPE)
+            distance[with_path] = path_lengths(x0[with_path], y0[with_path], x1[with_path], y1[with_path],
+                                               moves['first_point'], moves['point_count'],
+                                               points['x'], points['y'])
+            del moves, points
+
+        # Records outside the fixed schema are rare; classify them one by one
+        raw = np.flatnonzero(kind == binaryFormat.KIND_RAW)
+        keys = list(recording.keys)
+        patch_rows(raw, [binaryFormat.read_extra(recording.extras, int(records['extra'][i])) for i in raw],
+                   keys, kind, key_id, end, duration, x0, y0, x1, y1, distance)
+        return cls(keys, kind, key_id, start, end, duration, x0, y0, x1, y1, distance)
+
+    @classmethod
+    def from_store(cls, store):
+        """Build columns from an EventStore's arrays without decoding events"""
+        views = store.columns()
+        kind = views['kind'].copy()
+        key_id = views['key_id'].astype(np.int32)
+        start = views['start'].copy()
+        end = views['end'].copy()
+        duration = views['duration'].copy()
+        is_move = kind == binaryFormat.KIND_MOVE
+        move_rows = np.flatnonzero(is_move)
+        moves = views['detail'][move_rows]
+        x0, y0, x1, y1 = (np.zeros(len(kind), dtype=np.int32) for _ in range(4))
+        for column, name in ((x0, 'start_x'), (y0, 'start_y'), (x1, 'end_x'), (y1, 'end_y')):
+            column[move_rows] = np.asarray(getattr(store, name), dtype=np.int32)[moves]
+        distance = np.where(is_move, endpoint_distance(x0, y0, x1, y1), 0.0)
+        has_path = (views['flags'][move_rows] & binaryFormat.FLAG_PATH) != 0
+        if has_path.any():
+            with_path = move_rows[has_path]
+            moves = moves[has_path]
+            distance[with_path] = path_lengths(
+                x0[with_path], y0[with_path], x1[with_path], y1[with_path],
+                np.asarray(store.first_point)[moves], np.asarray(store.point_count)[moves],
+                np.asarray(store.x), np.asarray(store.y))
+        del views
+
+        # Markers and events outside the schema are classified like from_events does
+        rows = np.flatnonzero((kind == KIND_MARKER) | (kind == binaryFormat.KIND_RAW))
+        keys = list(store.keys)
+        patch_rows(rows, [store[int(i)] for i in rows], keys, kind, key_id, end, duration,
+                   x0, y0, x1, y1, distance)
+        return cls(keys, kind, key_id, start, end, duration, x0, y0, x1, y1, distance)
+
+
+def patch_rows(rows, events, keys, kind, key_id, end, duration, x0, y0, x1, y1, distance):
+    """Overwrite the given rows with the columns of their event dicts"""
+    if not len(rows):
+        return
+    singles = RecordingColumns.from_events(events)
+    for name in singles.keys:
+        if name not in keys:
+            keys.append(name)
+    kind[rows] = singles.kind
+    key_id[rows] = [keys.index(singles.keys[i]) for i in singles.key_id]
+    duration[rows] = singles.duration
+    end[rows] = singles.end
+    for column, values in ((x0, singles.x0), (y0, singles.y0), (x1, singles.x1), (y1, singles.y1),
+                           (distance, singles.distance)):
+        column[rows] = values
+
+
+def endpoint_distance(x0, y0, x1, y1):
+    return np.hypot((x1 - x0).astype(np.float64), (y1 - y0).astype(np.float64))
+
+
+def path_lengths(x0, y0, x1, y1, first, count, x, y):
+    """Length of each move from its start through its path points to its end.
+
+    first/count select every move's slice of the x/y point columns; moves
+    without points get the straight line.
+    """
+    length = endpoint_distance(x0, y0, x1, y1)
+    has_points = count > 0
+    if not has_points.any():
+        return length
+    x = x.astype(np.float64)
+    y = y.astype(np.float64)
+    walked = np.concatenate([[0.0], np.cumsum(np.hypot(np.diff(x), np.diff(y)))])
+    head = first[has_points].astype(np.intp)
+    tail = head + count[has_points].astype(np.intp) - 1
+    length[has_points] = (np.hypot(x[head] - x0[has_points], y[head] - y0[has_points]) +
+                          walked[tail] - walked[head] +
+                          np.hypot(x1[has_points] - x[tail], y1[has_points] - y[tail]))
+    return length
+
+
+def event_path_length(event):
+    """Path length of a mouse_move event dict"""
+    x, y = event['start_x'], event['start_y']
+    length = 0.0
+    for _, px, py in event.get('path', ()):
+        length += math.hypot(px - x, py - y)
+        x, y = px, py
+    return length + math.hypot(event['end_x'] - x, event['end_y'] - y)
+
+
+def load_columns(source):
+    """Columns for a recording path, a BinaryRecording, an EventStore or an iterable of events"""
+    if isinstance(source, RecordingColumns):
+        return source
+    if isinstance(source, EventStore):
+        return RecordingColumns.from_store(source)
+    if isinstance(source, BinaryRecording):
+        return RecordingColumns.from_binary(source)
+    if isinstance(source, str) and source.endswith('.mrec'):
+        with BinaryRecording(source) as recording:
+            return RecordingColumns.from_binary(recording)
+    if isinstance(source, str):
+        # Local import keeps this module free of the replay machinery
+        from replayPipeline import iter_recording
+        return RecordingColumns.from_events(iter_recording(source))
+    return RecordingColumns.from_events(source)
+
+
+def summarize(values):
+    """count/mean/min/max/percentiles of a 1-D array"""
+    if len(values) == 0:
+        return {'count': 0}
+    summary = {
+        'count': int(len(values)),
+        'mean': float(values.mean()),
+        'min': float(values.min()),
+        'max': float(values.max()),
+    }
+    for p, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+        summary[f'p{p}'] = float(value)
+    return summary
+
+
+def key_statistics(columns):
+    """Duration summary per key/button, grouped with one stable argsort"""
+    pressable = (columns.kind == binaryFormat.KIND_KEY) | (columns.kind == binaryFormat.KIND_CLICK)
+    key_id = columns.key_id[pressable]
+    duration = columns.duration[pressable]
+    order = np.argsort(key_id, kind='stable')
+    key_id = key_id[order]
+    duration = duration[order]
+    boundaries = np.flatnonzero(np.diff(key_id)) + 1
+    stats = {}
+    for group in np.split(np.arange(len(key_id)), boundaries):
+        if len(group):
+            stats[columns.keys[key_id[group[0]]]] = summarize(duration[group])
+    return stats
+
+
+def interval_histogram(columns, bins=None):
+    """Histogram of the time between consecutive key presses"""
+    starts = np.sort(columns.start[columns.kind == binaryFormat.KIND_KEY])
+    intervals = np.diff(starts)
+    if bins is None:
+        # Log-spaced buckets from 1ms to 10s, plus everything longer
+        bins = np.concatenate([np.logspace(-3, 1, 13), [np.inf]])
+    counts, edges = np.histogram(intervals, bins=bins)
+    return {
+        'summary': summarize(intervals),
+        'bins': [float(edge) if np.isfinite(edge) else None for edge in edges],
+        'counts': [int(count) for count in counts],
+    }
+
+
+def typing_rate(columns, window=10.0, step=1.0):
+    """Key presses per minute over a sliding window"""
+    starts = np.sort(columns.start[columns.kind == binaryFormat.KIND_KEY])
+    if len(starts) == 0:
+        return {'window': window, 'mean_per_minute': 0.0, 'max_per_minute': 0.0}
+    window_starts = np.arange(starts[0], max(starts[-1] - window, starts[0]) + step, step)
+    counts = (np.searchsorted(starts, window_starts + window, side='left') -
+              np.searchsorted(starts, window_starts, side='left'))
+    per_minute = counts * (60.0 / window)
+    return {
+        'window': window,
+        'mean_per_minute': float(per_minute.mean()),
+        'max_per_minute': float(per_minute.max()),
+        'peak_window_start': float(window_starts[per_minute.argmax()]),
+    }
+
+
+def mouse_statistics(columns):
+    """Distance and speed distributions of mouse movements"""
+    moves = columns.kind == binaryFormat.KIND_MOVE
+    distance = columns.distance[moves]
+    duration = columns.duration[moves]
+    speed = np.divide(distance, duration, out=np.zeros_like(distance), where=duration > 0)
+    return {
+        'moves': int(moves.sum()),
+        'total_distance': float(distance.sum()),
+        'distance': summarize(distance),
+        'speed': summarize(speed),
+    }
+
+
+def idle_gaps(columns, threshold=2.0, top=5):
+    """Stretches longer than threshold seconds with no input at all"""
+    if len(columns) < 2:
+        return {'threshold': threshold, 'count': 0, 'total': 0.0, 'longest': []}
+    order = np.argsort(columns.start, kind='stable')
+    start = columns.start[order]
+    busy_until = np.maximum.accumulate(columns.end[order])
+    gaps = start[1:] - busy_until[:-1]
+    idle = np.flatnonzero(gaps > threshold)
+    longest = idle[np.argsort(gaps[idle])[::-1][:top]]
+    return {
+        'threshold': threshold,
+        'count': int(len(idle)),
+        'total': float(gaps[idle].sum()),
+        'longest': [{'start': float(busy_until[i]), 'length': float(gaps[i])} for i in longest],
+    }
+
+
+def analyze(source, idle_threshold=2.0, rate_window=10.0):
+    """Full analysis report for any recording source, as a JSON-ready dict"""
+    columns = load_columns(source)
+    if len(columns) == 0:
+        return {'events': 0}
+    counts = np.bincount(columns.kind, minlength=len(KIND_NAMES))
+    return {
+        'events': len(columns),
+        'total_duration': float(columns.end.max()),
+        'events_by_type': {name: int(counts[kind]) for kind, name in KIND_NAMES.items()},
+        'keys': key_statistics(columns),
+        'inter_key_intervals': interval_histogram(columns),
+        'typing_rate': typing_rate(columns, window=rate_window),
+        'mouse': mouse_statistics(columns),
+        'idle_gaps': idle_gaps(columns, threshold=idle_threshold),
+    }
+
+
+def format_report(report):
+    """Printable text version of an analyze() report"""
+    if not report.get('events'):
+        return "Recording Analysis:\nNo events recorded."
+    lines = [
+        "Recording Analysis:",
+        f"Total duration: {report['total_duration']:.2f} seconds",
+        f"Total events: {report['events']} " +
+        "(" + ", ".join(f"{name}: {count}" for name, count in report['events_by_type'].items()) + ")",
+    ]
+
+    intervals = report['inter_key_intervals']['summary']
+    if intervals['count']:
+        lines.append(f"Inter-key interval: median {intervals['p50'] * 1000:.1f}ms, "
+                     f"p90 {intervals['p90'] * 1000:.1f}ms")
+    rate = report['typing_rate']
+    lines.append(f"Typing rate ({rate['window']:.0f}s window): mean {rate['mean_per_minute']:.1f}/min, "
+                 f"peak {rate['max_per_minute']:.1f}/min")
+
+    mouse = report['mouse']
+    if mouse['moves']:
+        lines.append(f"Mouse: {mouse['moves']} moves, {mouse['total_distance']:.0f}px total, "
+                     f"median speed {mouse['speed']['p50']:.1f}px/s, "
+                     f"p90 speed {mouse['speed']['p90']:.1f}px/s")
+
+    gaps = report['idle_gaps']
+    lines.append(f"Idle gaps over {gaps['threshold']:.1f}s: {gaps['count']} "
+                 f"({gaps['total']:.2f}s total)")
+    for gap in gaps['longest']:
+        lines.append(f"  {gap['length']:.2f}s idle after {gap['start']:.2f}s")
+
+    lines.append("\nKey Statistics:")
+    for key, stats in report['keys'].items():
+        lines.append(f"\nKey: {key}")
+        lines.append(f"  Press count: {stats['count']}")
+        lines.append(f"  Average duration: {stats['mean']:.6f}s")
+        lines.append(f"  Min duration: {stats['min']:.6f}s")
+        lines.append(f"  Max duration: {stats['max']:.6f}s")
+        lines.append(f"  p50/p90/p99 duration: {stats['p50']:.6f}s / {stats['p90']:.6f}s / {stats['p99']:.6f}s")
+    return "\n".join(lines)
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Analyze a recording without starting any listeners")
+    parser.add_argument('recording', help=".json, .jsonl or .mrec recording")
+    parser.add_argument('--json', action='store_true', help="print the report as JSON")
+    parser.add_argument('--idle-threshold', type=float, default=2.0)
+    parser.add_argument('--rate-window', type=float, default=10.0)
+    args = parser.parse_args(argv)
+    report = analyze(args.recording, idle_threshold=args.idle_threshold, rate_window=args.rate_window)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_report(report))
+
+
+if __name__ == "__main__":
+    main()
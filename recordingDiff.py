@@ -0,0 +1,413 @@
+"""Compare two recordings with NumPy.
+
+Aligns a candidate recording (a re-recording, or a replay captured back
+through the recorder) against a reference and reports what differs:
+
+- events that are missing from the candidate or were inserted into it
+- matched events that happen in a different order
+- per-event start and hold time deltas
+- mouse endpoint and path deviation for matched moves
+
+Events are paired by key and time: the candidate's drift is followed a
+window of events at a time, so a slower or faster replay stays aligned
+however far it drifts over the recording, and each event is paired with
+the nearest same-key event within `tolerance` seconds of where that drift
+puts it. Sequence order is only used afterwards, to count the pairs that
+happen out of order as reordered. Start and hold time deltas are reported
+on the paired events.
+
+    python recordingDiff.py approved.mrec candidate.json --max-missing 0 --max-time-error 0.05
+
+exits with status 1 when a limit is exceeded, so it can gate a pipeline.
+"""
+import argparse
+import bisect
+import json
+import sys
+
+import numpy as np
+
+import binaryFormat
+from binaryFormat import BinaryRecording
+from recordingAnalysis import RecordingColumns, summarize
+
+PATH_SAMPLES = 32  # Points compared along each matched movement
+MATCH_ROUNDS = 4  # Mutual-nearest passes over the still unmatched events
+WINDOW = 32  # Reference events per step when following drift
+FIT_PASSES = 2  # Matches per window, the second around the offset the first found
+RATE_WINDOWS = 4  # Windows the drift rate is measured over
+RATE_CHANGE = 0.2  # Largest change of replay speed (20%) followed from one window to the next
+LISTED = 20  # Events listed per category in the report
+
+
+def load(source):
+    """(columns, indexable events) for a recording path, BinaryRecording or event list"""
+    if isinstance(source, str) and source.endswith('.mrec'):
+        source = BinaryRecording(source)
+    if isinstance(source, BinaryRecording):
+        return RecordingColumns.from_binary(source), source
+    if isinstance(source, str):
+        from replayPipeline import iter_recording
+        source = iter_recording(source)
+    events = list(source)
+    return RecordingColumns.from_events(events), events
+
+
+def nearest(values, targets):
+    """Index of the closest entry of sorted targets for every value"""
+    pos = np.searchsorted(targets, values)
+    left = np.clip(pos - 1, 0, len(targets) - 1)
+    right = np.clip(pos, 0, len(targets) - 1)
+    return np.where(np.abs(values - targets[left]) <= np.abs(values - targets[right]), left, right)
+
+
+def match_times(a, b, tolerance):
+    """Pair up entries of two sorted arrays that are each other's nearest within tolerance.
+
+    Returns (a indices, b indices). Unpaired entries get more passes so a
+    cluster of close events does not leave matchable ones behind.
+    """
+    a_left = np.arange(len(a))
+    b_left = np.arange(len(b))
+    a_matched = []
+    b_matched = []
+    for _ in range(MATCH_ROUNDS):
+        if not len(a_left) or not len(b_left):
+            break
+        a_times = a[a_left]
+        b_times = b[b_left]
+        to_b = nearest(a_times, b_times)
+        to_a = nearest(b_times, a_times)
+        mutual = (to_a[to_b] == np.arange(len(a_times))) & (np.abs(a_times - b_times[to_b]) <= tolerance)
+        if not mutual.any():
+            break
+        a_matched.append(a_left[mutual])
+        b_matched.append(b_left[to_b[mutual]])
+        a_keep = np.ones(len(a_left), dtype=bool)
+        a_keep[mutual] = False
+        b_keep = np.ones(len(b_left), dtype=bool)
+        b_keep[to_b[mutual]] = False
+        a_left = a_left[a_keep]
+        b_left = b_left[b_keep]
+    if not a_matched:
+        return np.array([], dtype=np.intp), np.array([], dtype=np.intp)
+    return np.concatenate(a_matched), np.concatenate(b_matched)
+
+
+def match_nearest(ref_key, cand_key, ref_start, cand_start, tolerance):
+    """Pair same-key events by nearest start time within tolerance; returns index arrays"""
+    # Give every key a band of its own on the time axis
+    span = max(ref_start.max(initial=0.0), cand_start.max(initial=0.0)) + 10 * tolerance + 1.0
+    ref_axis = ref_start + ref_key * span
+    cand_axis = cand_start + cand_key * span
+    ref_order = np.argsort(ref_axis, kind='stable')
+    cand_order = np.argsort(cand_axis, kind='stable')
+    a, b = match_times(ref_axis[ref_order], cand_axis[cand_order], tolerance)
+    return ref_order[a], cand_order[b]
+
+
+def follow_drift(ref_key, cand_key, ref_start, cand_start, tolerance):
+    """(reference times, candidate offsets) tracing how far the candidate has drifted.
+
+    Walks the reference WINDOW events at a time. Candidate events near the
+    window are moved onto the reference time axis by the drift expected
+    there, the rate seen over the last few windows carried forward, and
+    paired by key within tolerance. The median offset of those pairs is
+    the next point of the trace, so a faster or slower replay is followed
+    however far it drifts over the whole recording.
+    """
+    ref_order = np.argsort(ref_start, kind='stable')
+    ref_sorted = ref_start[ref_order]
+    cand_order = np.argsort(cand_start, kind='stable')
+    cand_sorted = cand_start[cand_order]
+    # Until the rate is known, or after losing most pairs, windows stay short
+    # enough that a change of rate keeps within tolerance across them
+    span = tolerance / RATE_CHANGE
+    times = []
+    offsets = []
+    careful = True
+    last = 0
+    while last < len(ref_order):
+        first = last
+        last = min(first + WINDOW, len(ref_order))
+        if careful:
+            last = min(last, int(np.searchsorted(ref_sorted, ref_sorted[first] + span, 'right')))
+        window = ref_order[first:last]
+        window_start = ref_start[window]
+        if len(times) > 1:
+            back = max(len(times) - RATE_WINDOWS, 0)
+            rate = (offsets[-1] - offsets[back]) / (times[-1] - times[back])
+        else:
+            rate = 0.0
+        anchor, offset = (times[-1], offsets[-1]) if times else (0.0, 0.0)
+        expected = offset + rate * (window_start - anchor)
+        found = 0
+        for _ in range(FIT_PASSES):
+            low = window_start[0] + expected[0] - tolerance
+            high = window_start[-1] + expected[-1] + tolerance
+            near = cand_order[np.searchsorted(cand_sorted, low):np.searchsorted(cand_sorted, high, 'right')]
+            if not len(near):
+                break
+            mapped = anchor + (cand_start[near] - anchor - offset) / (1.0 + rate)
+            a, b = match_nearest(ref_key[window], cand_key[near], window_start, mapped, tolerance)
+            if len(a) <= found:
+                break
+            found = len(a)
+            # Take out the rate so the median is the offset at the anchor
+            anchor = float(np.median(window_start[a]))
+            offset = float(np.median(cand_start[near[b]] - window_start[a] - rate * (window_start[a] - anchor)))
+            expected = offset + rate * (window_start - anchor)
+            if found == len(window):
+                break
+        if found:
+            times.append(anchor)
+            offsets.append(offset)
+        careful = len(times) < RATE_WINDOWS or 2 * found < len(window)
+    return np.array(times), np.array(offsets)
+
+
+def match_events(ref, cand, ref_start, cand_start, tolerance):
+    """Pair events of two recordings; returns index arrays.
+
+    Candidate times are moved back by the drift follow_drift() measured
+    around them, then same-key events are paired by nearest start within
+    tolerance.
+    """
+    names = sorted(set(ref.keys) | set(cand.keys))
+    ids = {name: i for i, name in enumerate(names)}
+    ref_key = np.array([ids[name] for name in ref.keys], dtype=np.int64)[ref.key_id]
+    cand_key = np.array([ids[name] for name in cand.keys], dtype=np.int64)[cand.key_id]
+    if not len(ref_start) or not len(cand_start):
+        return np.array([], dtype=np.intp), np.array([], dtype=np.intp)
+    times, offsets = follow_drift(ref_key, cand_key, ref_start, cand_start, tolerance)
+    drift = 0.0
+    if len(times):
+        # np.interp needs increasing positions on the candidate's time axis
+        drift = np.interp(cand_start, np.maximum.accumulate(times + offsets), offsets)
+    return match_nearest(ref_key, cand_key, ref_start, cand_start - drift, tolerance)
+
+
+def simultaneous(times, order_tolerance):
+    """Group number of every time; times chained by gaps under order_tolerance share one"""
+    order = np.argsort(times, kind='stable')
+    group = np.empty(len(times), dtype=np.intp)
+    group[order] = np.concatenate([[0], np.cumsum(np.diff(times[order]) >= order_tolerance)])
+    return group
+
+
+def out_of_order(values):
+    """Mask of entries outside one longest non-decreasing subsequence"""
+    tails = []  # Smallest tail value of an increasing run of each length
+    tail_index = []
+    previous = np.full(len(values), -1, dtype=np.intp)
+    for i, value in enumerate(values.tolist()):
+        length = bisect.bisect_right(tails, value)
+        if length:
+            previous[i] = tail_index[length - 1]
+        if length == len(tails):
+            tails.append(value)
+            tail_index.append(i)
+        else:
+            tails[length] = value
+            tail_index[length] = i
+    mask = np.ones(len(values), dtype=bool)
+    i = tail_index[-1] if tail_index else -1
+    while i >= 0:
+        mask[i] = False
+        i = previous[i]
+    return mask
+
+
+def move_path(event):
+    if event.get('path'):
+        return np.asarray(event['path'], dtype=np.float64)
+    return np.array([[0.0, event['start_x'], event['start_y']],
+                     [event['duration'], event['end_x'], event['end_y']]], dtype=np.float64)
+
+
+def resample(path, fractions):
+    """x and y at the given fractions of a path's duration"""
+    offsets = path[:, 0]
+    span = offsets[-1] - offsets[0]
+    t = (offsets - offsets[0]) / span if span > 0 else np.linspace(0.0, 1.0, len(offsets))
+    return np.interp(fractions, t, path[:, 1]), np.interp(fractions, t, path[:, 2])
+
+
+def path_deviation(ref_events, cand_events, ref_moves, cand_moves):
+    """Largest distance between two matched movements at the same point of their duration"""
+    fractions = np.linspace(0.0, 1.0, PATH_SAMPLES)
+    deviation = np.empty(len(ref_moves))
+    for n, (i, j) in enumerate(zip(ref_moves.tolist(), cand_moves.tolist())):
+        ref_x, ref_y = resample(move_path(ref_events[i]), fractions)
+        cand_x, cand_y = resample(move_path(cand_events[j]), fractions)
+        deviation[n] = np.hypot(cand_x - ref_x, cand_y - ref_y).max()
+    return deviation
+
+
+def listed(columns, start, indices, **extra):
+    """First few events of a category as JSON-ready dicts"""
+    entries = []
+    for n, i in enumerate(indices[:LISTED].tolist()):
+        entry = {'index': i, 'key': columns.keys[columns.key_id[i]], 'time': round(float(start[i]), 6)}
+        for name, values in extra.items():
+            entry[name] = round(float(values[n]), 6)
+        entries.append(entry)
+    return entries
+
+
+def compare(reference, candidate, tolerance=0.5, order_tolerance=0.005, align_start=True):
+    """Diff a candidate recording against a reference, as a JSON-ready dict.
+
+    Events are paired with a same-key event within tolerance seconds once
+    the candidate's drift is taken out. Times are relative to each
+    recording's first event with align_start. Paired events whose order
+    differs by more than order_tolerance count as reordered.
+    """
+    ref, ref_events = load(reference)
+    cand, cand_events = load(candidate)
+    try:
+        ref_start = ref.start - (ref.start.min() if align_start and len(ref) else 0.0)
+        cand_start = cand.start - (cand.start.min() if align_start and len(cand) else 0.0)
+        a, b = match_events(ref, cand, ref_start, cand_start, tolerance)
+
+        missing = np.setdiff1d(np.arange(len(ref)), a)
+        inserted = np.setdiff1d(np.arange(len(cand)), b)
+        missing = missing[np.argsort(ref_start[missing], kind='stable')]
+        inserted = inserted[np.argsort(cand_start[inserted], kind='stable')]
+
+        # Walk matches in reference order; the candidate times should not go
+        # back. Times chained by gaps under order_tolerance are simultaneous
+        # on both sides, so jitter inside a chord is not reordering.
+        ref_group = simultaneous(ref_start[a], order_tolerance)
+        cand_group = simultaneous(cand_start[b], order_tolerance)
+        by_reference = np.lexsort((cand_start[b], ref_group))
+        a = a[by_reference]
+        b = b[by_reference]
+        reordered = out_of_order(cand_group[by_reference])
+
+        start_delta = cand_start[b] - ref_start[a]
+        hold_delta = (cand.end[b] - cand.start[b]) - (ref.end[a] - ref.start[a])
+        worst = np.argsort(np.abs(start_delta))[::-1]
+
+        moves = ref.kind[a] == binaryFormat.KIND_MOVE
+        ref_moves = a[moves]
+        cand_moves = b[moves]
+        endpoint_error = np.hypot((cand.x1[cand_moves] - ref.x1[ref_moves]).astype(np.float64),
+                                  (cand.y1[cand_moves] - ref.y1[ref_moves]).astype(np.float64))
+        deviation = path_deviation(ref_events, cand_events, ref_moves, cand_moves)
+        worst_paths = np.argsort(deviation)[::-1]
+
+        return {
+            'reference_events': len(ref),
+            'candidate_events': len(cand),
+            'tolerance': tolerance,
+            'matched': int(len(a)),
+            'missing': int(len(missing)),
+            'inserted': int(len(inserted)),
+            'reordered': int(reordered.sum()),
+            'missing_events': listed(ref, ref_start, missing),
+            'inserted_events': listed(cand, cand_start, inserted),
+            'reordered_events': listed(ref, ref_start, a[reordered],
+                                       candidate_time=cand_start[b[reordered]]),
+            'timing': {
+                'start_bias': float(start_delta.mean()) if len(a) else 0.0,
+                'start_error': summarize(np.abs(start_delta)),
+                'hold_error': summarize(np.abs(hold_delta)),
+                'worst': listed(ref, ref_start, a[worst], delta=start_delta[worst]),
+            },
+            'mouse': {
+                'moves': int(len(ref_moves)),
+                'endpoint_error': summarize(endpoint_error),
+                'path_deviation': summarize(deviation),
+                'worst': listed(ref, ref_start, ref_moves[worst_paths], deviation=deviation[worst_paths]),
+            },
+        }
+    finally:
+        for events in (ref_events, cand_events):
+            if isinstance(events, BinaryRecording):
+                events.close()
+
+
+def check(report, max_missing=None, max_inserted=None, max_reordered=None,
+          max_time_error=None, max_path_deviation=None):
+    """Limits a report exceeds, as printable strings (empty if it passes)"""
+    failures = []
+    for name, limit in (('missing', max_missing), ('inserted', max_inserted),
+                        ('reordered', max_reordered)):
+        if limit is not None and report[name] > limit:
+            failures.append(f"{report[name]} {name} events (limit {limit})")
+    start_error = report['timing']['start_error']
+    if max_time_error is not None and start_error['count'] and start_error['p99'] > max_time_error:
+        failures.append(f"p99 timing error {start_error['p99'] * 1000:.1f}ms "
+                        f"(limit {max_time_error * 1000:.1f}ms)")
+    deviation = report['mouse']['path_deviation']
+    if max_path_deviation is not None and deviation['count'] and deviation['max'] > max_path_deviation:
+        failures.append(f"path deviation {deviation['max']:.1f}px (limit {max_path_deviation:.1f}px)")
+    return failures
+
+
+def format_report(report):
+    """Printable text version of a compare() report"""
+    lines = [
+        "Recording Diff:",
+        f"Events: {report['reference_events']} reference, {report['candidate_events']} candidate, "
+        f"{report['matched']} matched",
+        f"Missing: {report['missing']}, inserted: {report['inserted']}, reordered: {report['reordered']}",
+    ]
+    for title, name in (("Missing", 'missing_events'), ("Inserted", 'inserted_events'),
+                        ("Reordered", 'reordered_events')):
+        for event in report[name]:
+            lines.append(f"  {title}: {event['key']} at {event['time']:.3f}s")
+
+    timing = report['timing']
+    if timing['start_error']['count']:
+        lines.append(f"Start time error: median {timing['start_error']['p50'] * 1000:.1f}ms, "
+                     f"p99 {timing['start_error']['p99'] * 1000:.1f}ms, "
+                     f"max {timing['start_error']['max'] * 1000:.1f}ms, "
+                     f"bias {timing['start_bias'] * 1000:+.1f}ms")
+        lines.append(f"Hold time error: median {timing['hold_error']['p50'] * 1000:.1f}ms, "
+                     f"p99 {timing['hold_error']['p99'] * 1000:.1f}ms")
+
+    mouse = report['mouse']
+    if mouse['moves']:
+        lines.append(f"Mouse: {mouse['moves']} matched moves, endpoint error median "
+                     f"{mouse['endpoint_error']['p50']:.1f}px / max {mouse['endpoint_error']['max']:.1f}px, "
+                     f"path deviation median {mouse['path_deviation']['p50']:.1f}px / "
+                     f"max {mouse['path_deviation']['max']:.1f}px")
+    return "\n".join(lines)
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Compare a recording against a reference")
+    parser.add_argument('reference', help="approved recording (.json, .jsonl or .mrec)")
+    parser.add_argument('candidate', help="recording to check against it")
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help="seconds an event may be from its counterpart, after drift, and still match")
+    parser.add_argument('--order-tolerance', type=float, default=0.005,
+                        help="start differences below this many seconds never count as reordering")
+    parser.add_argument('--no-align', action='store_true',
+                        help="compare absolute times instead of times since the first event")
+    parser.add_argument('--json', action='store_true', help="print the report as JSON")
+    parser.add_argument('--max-missing', type=int)
+    parser.add_argument('--max-inserted', type=int)
+    parser.add_argument('--max-reordered', type=int)
+    parser.add_argument('--max-time-error', type=float, help="limit for the p99 start time error in seconds")
+    parser.add_argument('--max-path-deviation', type=float, help="limit for the worst path deviation in pixels")
+    args = parser.parse_args(argv)
+
+    report = compare(args.reference, args.candidate, args.tolerance, args.order_tolerance,
+                     align_start=not args.no_align)
+    failures = check(report, args.max_missing, args.max_inserted, args.max_reordered,
+                     args.max_time_error, args.max_path_deviation)
+    if args.json:
+        report['failures'] = failures
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_report(report))
+        for failure in failures:
+            print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+"""Recording optimizer.
+
+Rewrites a recording so it replays with fewer controller calls and less
+waiting, without changing what it does:
+
+- mouse moves that go nowhere (zero-length or sub-pixel) are dropped
+- moves that follow each other within a few milliseconds become one
+- bursts of wheel ticks in the same direction become one scroll event
+  whose dx/dy carry the summed ticks
+- idle gaps longer than a threshold are capped or scaled down
+
+pack_timing() goes further for throughput replays and drops the recorded
+timing altogether.
+
+Usage: python recordingOptimizer.py input.json output.mrec [--idle-threshold 1.0] [--pack]
+"""
+import argparse
+import bisect
+import math
+
+from mouseTrajectory import interpolate_move, interpolate_path
+from recordingWriter import event_end, event_time, write_recording
+from replayPipeline import iter_recording
+from timeIndex import slice_path
+
+
+def is_move(event):
+    return event['key'] == 'mouse_move'
+
+
+def is_marker(event):
+    return event['key'] == 'marker'
+
+
+def move_path(event):
+    """The [offset, x, y] vertices of a move, built from its endpoints if it has no path"""
+    if event.get('path'):
+        return [list(vertex) for vertex in event['path']]
+    return [[0.0, event['start_x'], event['start_y']],
+            [event['duration'], event['end_x'], event['end_y']]]
+
+
+def move_extent(event):
+    """Farthest any point of a move gets from where it started"""
+    start_x, start_y = event['start_x'], event['start_y']
+    return max(math.hypot(x - start_x, y - start_y) for _, x, y in move_path(event))
+
+
+def scroll_delta(event):
+    """(dx, dy) of a scroll event; older recordings hold one tick per event"""
+    if 'dy' in event:
+        return event['dx'], event['dy']
+    return 0, 1 if event['direction'] == 'up' else -1
+
+
+def sign(value):
+    return (value > 0) - (value < 0)
+
+
+def controller_calls(event):
+    """Number of controller calls replaying this event costs at 1x speed"""
+    if event['key'] == 'scroll':
+        return 1
+    if is_marker(event):
+        return 0
+    if is_move(event):
+        start = event['time']
+        if event.get('path'):
+            samples = interpolate_path(event['path'], start)
+        else:
+            samples = interpolate_move(event['start_x'], event['start_y'],
+                                       event['end_x'], event['end_y'], start, event['duration'])
+        return sum(1 for _ in samples)
+    return 2  # Press and release
+
+
+def recording_cost(events):
+    """(events, controller calls, duration) of a recording"""
+    calls = 0
+    duration = 0.0
+    for event in events:
+        calls += controller_calls(event)
+        duration = max(duration, event_end(event))
+    return len(events), calls, duration
+
+
+def drop_idle_moves(events, min_distance=1.0):
+    """Remove moves that never leave a min_distance circle around their start"""
+    return [event for event in events
+            if not is_move(event) or move_extent(event) >= min_distance]
+
+
+def merge_moves(events, max_gap=0.05):
+    """Join moves that start within max_gap seconds of the previous move ending.
+
+    Only moves that are neighbours in the recording are joined, so the mouse
+    is still where it was recorded whenever a click or key happens.
+    """
+    merged = []
+    for event in events:
+        previous = merged[-1] if merged else None
+        if (previous is not None and is_move(previous) and is_move(event)
+                and event['time'] - event_end(previous) <= max_gap):
+            offset = event['time'] - previous['time']
+            path = move_path(previous)
+            path.extend([round(t + offset, 6), x, y] for t, x, y in move_path(event))
+            merged[-1] = finish_move(previous, path)
+        else:
+            merged.append(event)
+    return merged
+
+
+def finish_move(event, path):
+    """Copy of a move with the given path and metrics recomputed from it"""
+    start_x, start_y = path[0][1], path[0][2]
+    end_x, end_y = path[-1][1], path[-1][2]
+    duration = path[-1][0]
+    total_distance = math.hypot(end_x - start_x, end_y - start_y)
+    move = dict(event)
+    move.update({
+        'start_x': start_x,
+        'start_y': start_y,
+        'end_x': end_x,
+        'end_y': end_y,
+        'total_distance': total_distance,
+        'avg_speed': total_distance / duration if duration > 0 else 0,
+        'direction': math.atan2(end_y - start_y, end_x - start_x),
+        'duration': round(duration, 6),
+        'path': path,
+    })
+    return move
+
+
+def split_moves(events):
+    """Cut moves at every press, release, scroll or marker that happens during them.
+
+    events must be sorted by start time. Each piece is a move of its own, so
+    anything that re-times events one by one still finds the mouse where it
+    was recorded when a click or key happens in the middle of a move.
+    """
+    cuts = sorted(time for event in events if not is_move(event)
+                  for time in {event_time(event), event_end(event)})
+    split = []
+    for event in events:
+        if not is_move(event):
+            split.append(event)
+            continue
+        start = event['time']
+        end = start + event['duration']
+        inside = cuts[bisect.bisect_right(cuts, start):bisect.bisect_left(cuts, end)]
+        if not inside:
+            split.append(event)
+            continue
+        path = move_path(event)
+        offsets = [0.0] + sorted({round(time - start, 6) for time in inside}) + [event['duration']]
+        for begin, finish in zip(offsets, offsets[1:]):
+            if finish > begin:
+                piece = finish_move(event, slice_path(path, begin, finish))
+                piece['time'] = round(start + begin, 6)
+                split.append(piece)
+    return split
+
+
+def coalesce_scrolls(events, window=0.1):
+    """Collapse runs of same-direction scroll ticks less than window seconds apart.
+
+    A run ends at any other event so scrolls stay on the same side of
+    modifier presses and mouse moves.
+    """
+    coalesced = []
+    for event in events:
+        previous = coalesced[-1] if coalesced else None
+        if (previous is not None and event['key'] == 'scroll' and previous['key'] == 'scroll'
+                and event['press_time'] - previous['release_time'] <= window):
+            dx, dy = scroll_delta(event)
+            total_dx, total_dy = scroll_delta(previous)
+            if (sign(dx), sign(dy)) == (sign(total_dx), sign(total_dy)):
+                scroll = dict(previous)
+                scroll['dx'] = total_dx + dx
+                scroll['dy'] = total_dy + dy
+                # release_time marks the last tick so the window slides along the burst
+                scroll['release_time'] = event['release_time']
+                coalesced[-1] = scroll
+                continue
+        coalesced.append(event)
+    # The merged ticks are sent in one call at the first tick's time
+    for i, event in enumerate(coalesced):
+        if event['key'] == 'scroll' and event['release_time'] != event['press_time']:
+            coalesced[i] = dict(event, release_time=event['press_time'])
+    return coalesced
+
+
+def compress_idle(events, threshold=1.0, scale=0.0):
+    """Shorten gaps where nothing happens for longer than threshold seconds.
+
+    The part of a gap beyond threshold is multiplied by scale (0 caps every
+    gap at threshold). A key or button that is held down keeps the recording
+    busy, so holds are never shortened.
+    """
+    compressed = []
+    busy_until = 0.0
+    shift = 0.0
+    for event in events:
+        start = event_time(event)
+        gap = start - busy_until
+        if gap > threshold:
+            shift += (gap - threshold) * (1 - scale)
+        busy_until = max(busy_until, event_end(event))
+        if shift:
+            event = dict(event)
+            for field in ('press_time', 'release_time', 'time'):
+                if field in event:
+                    event[field] = round(event[field] - shift, 6)
+        compressed.append(event)
+    return compressed
+
+
+def pack_timing(events, min_hold=0.02, min_gap=0.005, keep_waits=False):
+    """Re-time a recording to replay as fast as the limits allow; returns (events, report).
+
+    Every press, release, scroll, move start/end and marker keeps its place
+    in the original order, so each release follows its press and chords
+    stay held together, but consecutive ones are only min_gap seconds apart.
+    Keys and buttons stay down for at least min_hold and moves are sped up
+    to fit; a move is first split wherever something happens during it, so
+    the mouse is still where it was recorded at every press and release.
+    With keep_waits the recorded pause after each marker is kept.
+    """
+    events = sorted(iter_recording(events), key=event_time)
+    recorded_count = len(events)
+    events = split_moves(events)
+    # (recorded time, order, event index, edge) for every point that has to happen
+    edges = []
+    for i, event in enumerate(events):
+        start = event_time(event)
+        # A move piece starts after whatever it was cut at, so the mouse stays put until then
+        edges.append((start, 2 if is_move(event) else 1, i, 'start'))
+        if not (is_marker(event) or event['key'] == 'scroll'):
+            end = event_end(event)
+            # At equal times an end goes before other starts, but never before its own
+            edges.append((end, 0 if end > start else 3, i, 'end'))
+    edges.sort()
+
+    starts = {}
+    ends = {}
+    now = None
+    wait = None  # (recorded, packed) time of the last marker when keeping waits
+    for recorded, _, i, edge in edges:
+        packed = 0.0 if now is None else now + min_gap
+        if wait is not None:
+            packed = max(packed, wait[1] + recorded - wait[0])
+            wait = None
+        if edge == 'start':
+            starts[i] = packed
+            if keep_waits and is_marker(events[i]):
+                wait = (recorded, packed)
+        else:
+            if not is_move(events[i]):
+                packed = max(packed, starts[i] + min_hold)
+            ends[i] = packed
+        now = packed
+
+    packed_events = []
+    for i, event in enumerate(events):
+        event = dict(event)
+        start = round(starts[i], 6)
+        if is_move(event):
+            duration = round(ends[i] - starts[i], 6)
+            if event.get('path') and event['duration'] > 0:
+                scale = duration / event['duration']
+                event['path'] = [[round(t * scale, 6), x, y] for t, x, y in event['path']]
+            event['time'] = start
+            event['duration'] = duration
+            event['avg_speed'] = event['total_distance'] / duration if duration > 0 else 0
+        elif 'press_time' in event:
+            end = round(ends.get(i, starts[i]), 6)
+            event['press_time'] = start
+            event['release_time'] = end
+            event['duration'] = round(end - start, 6)
+        else:
+            event['time'] = start
+        packed_events.append(event)
+    packed_events.sort(key=event_time)
+
+    before = recording_cost(events)[2]
+    after = recording_cost(packed_events)[2]
+    report = {
+        'events': recorded_count,
+        'duration': {'before': before, 'after': after},
+        'seconds_saved': round(before - after, 6),
+    }
+    return packed_events, report
+
+
+def optimize(events, idle_threshold=1.0, idle_scale=0.0, scroll_window=0.1,
+             min_move_distance=1.0, move_merge_gap=0.05):
+    """Optimize a recording; returns (events, report).
+
+    Pass idle_threshold=None to keep every gap as recorded.
+    """
+    events = sorted(iter_recording(events), key=event_time)
+    before = recording_cost(events)
+    events = drop_idle_moves(events, min_move_distance)
+    events = merge_moves(events, move_merge_gap)
+    events = coalesce_scrolls(events, scroll_window)
+    if idle_threshold is not None:
+        events = compress_idle(events, idle_threshold, idle_scale)
+    after = recording_cost(events)
+
+    report = {}
+    for name, old, new in zip(('events', 'controller_calls', 'duration'), before, after):
+        report[name] = {'before': old, 'after': new}
+    report['controller_calls_saved'] = before[1] - after[1]
+    report['seconds_saved'] = round(before[2] - after[2], 6)
+    return events, report
+
+
+def format_report(report):
+    """Printable text version of an optimize() report"""
+    events = report['events']
+    calls = report['controller_calls']
+    duration = report['duration']
+    return "\n".join([
+        "Recording optimized:",
+        f"  events: {events['before']} -> {events['after']}",
+        f"  controller calls: {calls['before']} -> {calls['after']} "
+        f"({report['controller_calls_saved']} saved)",
+        f"  duration: {duration['before']:.3f}s -> {duration['after']:.3f}s "
+        f"({report['seconds_saved']:.3f}s saved)",
+    ])
+
+
+def format_pack_report(report):
+    """Printable text version of a pack_timing() report"""
+    duration = report['duration']
+    return (f"Recording packed: {report['events']} events, "
+            f"{duration['before']:.3f}s -> {duration['after']:.3f}s ({report['seconds_saved']:.3f}s saved)")
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Optimize a recording for faster, lighter replay")
+    parser.add_argument('source', help="recording (.json, .jsonl or .mrec)")
+    parser.add_argument('destination', help="where to write the optimized recording")
+    parser.add_argument('--idle-threshold', type=float, default=1.0,
+                        help="gaps longer than this many seconds are compressed")
+    parser.add_argument('--idle-scale', type=float, default=0.0,
+                        help="factor applied to the part of a gap beyond the threshold (0 caps it)")
+    parser.add_argument('--keep-idle', action='store_true', help="do not compress idle gaps")
+    parser.add_argument('--scroll-window', type=float, default=0.1,
+                        help="scroll ticks closer than this many seconds are merged")
+    parser.add_argument('--min-move-distance', type=float, default=1.0,
+                        help="moves that stay within this many pixels are dropped")
+    parser.add_argument('--move-merge-gap', type=float, default=0.05,
+                        help="moves closer than this many seconds are merged")
+    parser.add_argument('--pack', action='store_true',
+                        help="also re-time everything as tightly as --min-hold/--min-gap allow")
+    parser.add_argument('--min-hold', type=float, default=0.02, help="shortest key/button hold when packing")
+    parser.add_argument('--min-gap', type=float, default=0.005, help="shortest gap between actions when packing")
+    parser.add_argument('--keep-waits', action='store_true', help="keep the pause after each marker when packing")
+    args = parser.parse_args(argv)
+
+    events, report = optimize(
+        args.source,
+        idle_threshold=None if args.keep_idle else args.idle_threshold,
+        idle_scale=args.idle_scale,
+        scroll_window=args.scroll_window,
+        min_move_distance=args.min_move_distance,
+        move_merge_gap=args.move_merge_gap)
+    print(format_report(report))
+    if args.pack:
+        events, pack_report = pack_timing(events, args.min_hold, args.min_gap, args.keep_waits)
+        print(format_pack_report(pack_report))
+    write_recording(events, args.destination)
+    print(f"Saved to {args.destination}")
+
+
+if __name__ == '__main__':
+    main()
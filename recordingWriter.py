@@ -0,0 +1,175 @@
+import heapq
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+
+from binaryFormat import write_binary
+
+
+def event_time(event):
+    """Start time of a recorded event, handling both press_time and time fields"""
+    return event.get('press_time', event.get('time', 0))
+
+
+def event_end(event):
+    """When an event is over, in recording time"""
+    if 'release_time' in event:
+        return event['release_time']
+    return event_time(event) + event.get('duration', 0.0)
+
+
+class StreamingRecordingWriter:
+    """Append recorded events to a JSON Lines file from a background thread.
+
+    Events are handed over through a queue, so the capture path never touches
+    the disk. The writer keeps a small reorder window: key and click events
+    only arrive at release time, after events that started later, so each
+    event is held until nothing older than reorder_window seconds can still
+    show up. Complete lines are written in chunks and flushed + fsynced every
+    flush_interval seconds, so a crash loses at most the last chunk.
+    """
+
+    def __init__(self, path, reorder_window=5.0, flush_interval=1.0, fsync=True):
+        self.path = path
+        self.reorder_window = reorder_window
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.events_written = 0
+        self.out_of_order = 0  # Events that arrived after the window had passed them
+        self._queue = queue.SimpleQueue()
+        self._pending = []
+        self._counter = itertools.count()
+        self._latest_time = 0.0
+        self._last_written_time = float('-inf')
+        self._thread = None
+        self._file = None
+
+    def start(self):
+        self._file = open(self.path, 'w')
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, event):
+        """Queue an event for writing; safe to call from any thread"""
+        self._queue.put(event)
+
+    def close(self):
+        """Write everything still pending and close the file"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        self._file.close()
+        self._file = None
+
+    def _run(self):
+        chunk = []
+        next_flush = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                event = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                event = False
+            if event is None:
+                break
+            if event:
+                start = event_time(event)
+                heapq.heappush(self._pending, (start, next(self._counter), event))
+                if start > self._latest_time:
+                    self._latest_time = start
+                self._release(chunk, self._latest_time - self.reorder_window)
+            if time.monotonic() >= next_flush:
+                self._flush(chunk)
+                next_flush = time.monotonic() + self.flush_interval
+        self._release(chunk, float('inf'))
+        self._flush(chunk)
+
+    def _release(self, chunk, horizon):
+        """Move events that started before horizon from the window to the chunk"""
+        pending = self._pending
+        while pending and pending[0][0] <= horizon:
+            start, _, event = heapq.heappop(pending)
+            if start < self._last_written_time:
+                self.out_of_order += 1
+            else:
+                self._last_written_time = start
+            chunk.append(json.dumps(event))
+
+    def _flush(self, chunk):
+        if not chunk:
+            return
+        self._file.write('\n'.join(chunk) + '\n')
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self.events_written += len(chunk)
+        chunk.clear()
+
+
+def iter_event_stream(path):
+    """Yield the events of a JSON Lines recording, stopping at a torn tail.
+
+    A crash can leave the last chunk partially written; reading stops at the
+    first line that is not a complete JSON object.
+    """
+    with open(path, 'r') as f:
+        for line in f:
+            if not line.endswith('\n'):
+                return  # Torn final line
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                return
+            yield event
+
+
+class EventStream:
+    """A JSON Lines recording read lazily: every iteration streams the file again.
+
+    The writer only orders events within its reorder window, so replay puts
+    them in start order as it reads (see replayPipeline.reorder_events).
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def __iter__(self):
+        return iter_event_stream(self.path)
+
+
+def read_event_stream(path):
+    """Load a JSON Lines recording, recovering everything before a torn tail"""
+    return list(iter_event_stream(path))
+
+
+def json_lines(events):
+    """Compact JSON text of each event; an EventStore writes it straight from its columns"""
+    from eventStore import EventStore  # eventStore imports this module
+    if isinstance(events, EventStore):
+        return events.json_rows()
+    return map(json.dumps, events)
+
+
+def json_array(lines):
+    """Lines of a JSON array holding one event per line"""
+    separator = '[\n'
+    for line in lines:
+        yield separator + line
+        separator = ',\n'
+    yield '[]\n' if separator == '[\n' else '\n]\n'
+
+
+def write_recording(events, path):
+    """Save events as .mrec, JSON Lines or a JSON array depending on the extension"""
+    if path.endswith('.mrec'):
+        write_binary(events, path)
+    elif path.endswith('.jsonl'):
+        with open(path, 'w') as f:
+            f.writelines(line + '\n' for line in json_lines(events))
+    else:
+        with open(path, 'w') as f:
+            f.writelines(json_array(json_lines(events)))
@@ -0,0 +1,134 @@
+"""Generator pipeline feeding the replay scheduler.
+
+    parse -> reorder -> resolve -> schedule -> DeadlineScheduler.run
+
+Every stage pulls one event at a time from the previous one, and the
+scheduler only pulls the next event once it is about to become due. The
+work before the first event fires and the memory held during replay
+therefore stay roughly constant however long the recording is.
+"""
+import heapq
+import itertools
+import json
+
+from binaryFormat import BinaryRecording
+from eventStore import EventStore
+from mouseTrajectory import interpolate_move, interpolate_path
+from recordingWriter import event_time, iter_event_stream
+
+
+def iter_recording(source):
+    """Parse stage: yield event dicts from a recording path or any iterable"""
+    if not isinstance(source, str):
+        yield from source
+    elif source.endswith('.mrec'):
+        with BinaryRecording(source) as recording:
+            yield from recording
+    elif source.endswith('.jsonl'):
+        yield from iter_event_stream(source)
+    else:
+        # A JSON array has to be parsed whole
+        with open(source, 'r') as f:
+            yield from json.load(f)
+
+
+def iter_replay_events(source):
+    """Parse stage for replay: an EventStore hands out typed events without building dicts"""
+    if isinstance(source, EventStore):
+        return source.events()
+    return iter_recording(source)
+
+
+def reorder_events(events, window=2.0):
+    """Yield events in start-time order, fixing disorder up to `window` seconds.
+
+    Only events inside the window are buffered. An event that arrives more
+    than `window` seconds late is passed through as soon as it is seen,
+    which the scheduler still handles because it orders by deadline.
+    """
+    pending = []
+    counter = itertools.count()
+    latest = float('-inf')
+    for event in events:
+        start = event_time(event)
+        heapq.heappush(pending, (start, next(counter), event))
+        if start > latest:
+            latest = start
+        while pending and pending[0][0] <= latest - window:
+            yield heapq.heappop(pending)[2]
+    while pending:
+        yield heapq.heappop(pending)[2]
+
+
+def resolve_events(events, resolve_key, resolve_button):
+    """Resolve stage: yield (kind, event, target) with key/button objects looked up.
+
+    kind is one of 'scroll', 'move', 'marker', 'click' or 'key'. Events whose
+    key cannot be resolved are reported and skipped.
+    """
+    for event in events:
+        key_str = event['key']
+        if key_str == 'scroll':
+            yield 'scroll', event, None
+        elif key_str == 'mouse_move':
+            yield 'move', event, None
+        elif key_str == 'marker':
+            yield 'marker', event, None
+        else:
+            try:
+                if key_str.startswith('mouse_'):
+                    yield 'click', event, resolve_button(key_str.split('_')[1])
+                else:
+                    yield 'key', event, resolve_key(key_str)
+            except Exception as e:
+                print(f"Error handling key {key_str}: {str(e)}")
+
+
+def schedule_events(resolved, handlers, speed_multiplier=1.0):
+    """Schedule stage: yield (deadline, actions) for the scheduler.
+
+    actions is a list of (deadline, callback, args) covering everything one
+    event does: press and release, a scroll, or every sample of a mouse
+    movement. handlers maps 'press_key', 'release_key', 'press_mouse',
+    'release_mouse', 'scroll', 'move_start' and 'move_mouse' to callbacks.
+    """
+    press_key = handlers['press_key']
+    release_key = handlers['release_key']
+    press_mouse = handlers['press_mouse']
+    release_mouse = handlers['release_mouse']
+    scroll = handlers['scroll']
+    move_start = handlers['move_start']
+    move_mouse = handlers['move_mouse']
+
+    for kind, event, target in resolved:
+        if kind == 'marker':
+            continue  # Markers only label a point in the recording
+        press_time = event['press_time'] if 'press_time' in event else event['time']
+        deadline = press_time / speed_multiplier
+        if kind == 'scroll':
+            yield deadline, [(deadline, scroll, (event,))]
+        elif kind == 'move':
+            # Expand the movement into timestamped samples on the shared
+            # timeline so overlapping keys and clicks stay on time
+            actions = [(deadline, move_start, (event,))]
+            if event.get('path'):
+                # Follow the recorded trajectory
+                samples = interpolate_path(event['path'], deadline, 1 / speed_multiplier)
+            else:
+                # Older recordings only have the endpoints
+                samples = interpolate_move(
+                    event['start_x'], event['start_y'],
+                    event['end_x'], event['end_y'],
+                    deadline, event['duration'] / speed_multiplier)
+            for sample_time, x, y in samples:
+                actions.append((sample_time, move_mouse, (x, y)))
+            yield deadline, actions
+        else:
+            release_time = event.get('release_time', press_time + event['duration'])
+            release_deadline = release_time / speed_multiplier
+            if kind == 'click':
+                yield deadline, [(deadline, press_mouse, (target, event['key'][6:])),
+                                 (release_deadline, release_mouse, (target,))]
+            else:
+                yield deadline, [(deadline, press_key, (target, event['key'])),
+                                 (release_deadline, release_key, (target,))]
@@ -0,0 +1,127 @@
+"""Precompiled replay plans.
+
+A plan is a recording turned into an immutable, deadline-sorted tuple of
+steps with every key and button already resolved to the object the
+controllers expect, so replaying it again costs no parsing, string work or
+closure creation. Plans are cached by the content hash of their source.
+A first replay does not wait for a compile: PlanBuilder streams it through
+the lazy pipeline and keeps the plan it scheduled.
+"""
+from collections import OrderedDict
+import functools
+
+from replayPipeline import reorder_events, resolve_events, schedule_events
+
+# Step operations; callbacks are bound per replay
+PRESS_KEY = 'press_key'
+RELEASE_KEY = 'release_key'
+PRESS_MOUSE = 'press_mouse'
+RELEASE_MOUSE = 'release_mouse'
+SCROLL = 'scroll'
+MOVE_START = 'move_start'
+MOVE_MOUSE = 'move_mouse'
+OPERATIONS = (PRESS_KEY, RELEASE_KEY, PRESS_MOUSE, RELEASE_MOUSE, SCROLL, MOVE_START, MOVE_MOUSE)
+
+
+class ReplayPlan:
+    """Resolved (deadline, operation, args) steps at 1x speed, sorted by deadline"""
+
+    def __init__(self, steps, event_count, source_hash=None):
+        self.steps = steps
+        self.event_count = event_count
+        self.source_hash = source_hash
+        self.duration = steps[-1][0] if steps else 0.0
+
+    def __len__(self):
+        return len(self.steps)
+
+    def timeline(self, callbacks, speed_multiplier=1.0):
+        """Feed for DeadlineScheduler.run with operations bound to callbacks"""
+        bound = {op: callbacks[op] for op in OPERATIONS}
+        if speed_multiplier == 1.0:
+            for deadline, op, args in self.steps:
+                yield deadline, ((deadline, bound[op], args),)
+        else:
+            for deadline, op, args in self.steps:
+                deadline /= speed_multiplier
+                yield deadline, ((deadline, bound[op], args),)
+
+
+def compile_plan(events, resolve_key, resolve_button, source_hash=None):
+    """Turn a recording into a ReplayPlan"""
+    builder = PlanBuilder(events, resolve_key, resolve_button, source_hash)
+    for _ in builder.scheduled():
+        pass
+    return builder.plan()
+
+
+class PlanBuilder:
+    """Compiles a plan while the recording is replayed through the lazy pipeline.
+
+    timeline() feeds the scheduler straight from the recording, so the first
+    replay starts without waiting for a compile, and keeps the steps it
+    schedules; once it has been run to the end plan() returns them as a
+    ReplayPlan for the next replay. With keep_steps=False nothing is kept.
+    """
+
+    def __init__(self, events, resolve_key, resolve_button, source_hash=None, keep_steps=True):
+        self.events = events
+        # Each distinct key/button name is resolved once
+        self.resolve_key = functools.lru_cache(maxsize=None)(resolve_key)
+        self.resolve_button = functools.lru_cache(maxsize=None)(resolve_button)
+        self.source_hash = source_hash
+        self.steps = [] if keep_steps else None
+        self.event_count = 0
+        self.complete = False
+
+    def counted(self, events):
+        for event in events:
+            self.event_count += 1
+            yield event
+
+    def scheduled(self):
+        """(deadline, actions) at 1x speed with operation names standing in for callbacks"""
+        resolved = resolve_events(reorder_events(self.counted(self.events)),
+                                  self.resolve_key, self.resolve_button)
+        steps = self.steps
+        for deadline, actions in schedule_events(resolved, {op: op for op in OPERATIONS}):
+            if steps is not None:
+                steps.extend(actions)
+            yield deadline, actions
+        self.complete = True
+
+    def timeline(self, callbacks, speed_multiplier=1.0):
+        """Feed for DeadlineScheduler.run with operations bound to callbacks"""
+        bound = {op: callbacks[op] for op in OPERATIONS}
+        for deadline, actions in self.scheduled():
+            yield deadline / speed_multiplier, [(step_deadline / speed_multiplier, bound[op], args)
+                                                for step_deadline, op, args in actions]
+
+    def plan(self):
+        """The compiled ReplayPlan, or None before the recording was read to the end"""
+        if not self.complete or self.steps is None:
+            return None
+        self.steps.sort(key=lambda step: step[0])
+        return ReplayPlan(tuple(self.steps), self.event_count, self.source_hash)
+
+
+class PlanCache:
+    """Small LRU of compiled plans keyed by source content hash"""
+
+    def __init__(self, max_plans=16):
+        self.max_plans = max_plans
+        self._plans = OrderedDict()
+
+    def get(self, source_hash):
+        plan = self._plans.get(source_hash)
+        if plan is not None:
+            self._plans.move_to_end(source_hash)
+        return plan
+
+    def put(self, plan):
+        if plan.source_hash is None:
+            return
+        self._plans[plan.source_hash] = plan
+        self._plans.move_to_end(plan.source_hash)
+        while len(self._plans) > self.max_plans:
+            self._plans.popitem(last=False)
@@ -0,0 +1,174 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+
+
+class CancellationToken:
+    """Thread-safe stop request shared by whoever controls a replay and the dispatcher.
+
+    Calling the token returns whether it was cancelled, so it can be passed
+    as should_stop. The dispatcher sleeps on wait(), which returns as soon
+    as cancel() is called instead of at the end of the sleep.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason = None
+        self.cancelled_at = None  # time.perf_counter() of the cancel() call
+
+    def __call__(self):
+        return self._event.is_set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self, reason=None):
+        if not self._event.is_set():
+            self.reason = reason
+            self.cancelled_at = time.perf_counter()
+            self._event.set()
+
+    def wait(self, timeout):
+        """Sleep up to timeout seconds; True if cancelled"""
+        return self._event.wait(timeout)
+
+
+class DeadlineScheduler:
+    """Single dispatcher that fires replay actions at absolute deadlines.
+
+    Actions are kept in a priority queue ordered by deadline (seconds since
+    the replay started). The dispatcher sleeps coarsely until shortly before
+    the next deadline and then spins for the last stretch, so timing does not
+    depend on how the OS or the GIL hands out turns to helper threads.
+    With realtime=False it never waits and fires actions as fast as it can,
+    still in deadline order.
+    """
+
+    def __init__(self, spin_threshold=0.002, max_sleep=0.05, lookahead=0.1, clock=time.perf_counter,
+                 realtime=True):
+        self.spin_threshold = spin_threshold  # Busy-wait for the final stretch
+        self.lookahead = lookahead  # How far ahead to pull actions from a source
+        self.max_sleep = max_sleep  # Longest single sleep, keeps stop checks responsive
+        self.clock = clock
+        self.realtime = realtime
+        self.ticks = 0
+        self.start_time = None
+        self.current_deadline = None  # Deadline of the action being dispatched
+        self._queue = []
+        self._counter = itertools.count()  # Tie-breaker keeps insertion order stable
+
+    def __len__(self):
+        return len(self._queue)
+
+    def schedule(self, deadline, callback, *args):
+        """Queue callback(*args) to run `deadline` seconds after the replay starts"""
+        heapq.heappush(self._queue, (deadline, next(self._counter), callback, args))
+
+    def elapsed(self):
+        """Seconds since the dispatcher started"""
+        if self.start_time is None:
+            return 0.0
+        return self.clock() - self.start_time
+
+    def wait_until(self, target, should_stop=None):
+        """Sleep until shortly before target, then spin. Returns False if stopped.
+
+        If should_stop has a wait(timeout) method (a CancellationToken), the
+        coarse sleep happens there so a stop request cuts it short.
+        """
+        sleep = getattr(should_stop, 'wait', time.sleep)
+        while True:
+            remaining = target - self.clock()
+            if remaining <= 0 or not self.realtime:
+                return True
+            if should_stop is not None and should_stop():
+                return False
+            if remaining > self.spin_threshold:
+                sleep(min(remaining - self.spin_threshold, self.max_sleep))
+
+    def run(self, source=(), should_stop=None, on_tick=None):
+        """Dispatch every queued action in deadline order.
+
+        source is an optional iterable of (deadline, actions) pairs in
+        (roughly) increasing deadline order, where actions is a list of
+        (deadline, callback, args). It is pulled lazily: a pair is only
+        queued once its deadline falls within `lookahead` seconds of now or
+        before the next queued action, so the queue only ever holds the
+        actions that are about to fire. Callbacks may also schedule further
+        actions. Every action that is due when the dispatcher wakes up runs
+        in the same tick, after which on_tick() is called. Returns True if
+        everything ran, False if stopped early.
+        """
+        self.start_time = self.clock()
+        queue = self._queue
+        source = iter(source)
+        pending = next(source, None)
+        while queue or pending is not None:
+            if should_stop is not None and should_stop():
+                return False
+            pending = self._pull(source, pending)
+            deadline = queue[0][0]
+            if not self.wait_until(self.start_time + deadline, should_stop):
+                return False
+            self._fire_due(deadline)
+            if on_tick is not None:
+                on_tick()
+        return True
+
+    def _pull(self, source, pending):
+        """Queue upcoming (deadline, actions) pairs from source; returns the next unqueued pair"""
+        queue = self._queue
+        horizon = self.clock() - self.start_time + self.lookahead
+        while pending is not None and (
+                not queue or pending[0] <= horizon or pending[0] <= queue[0][0]):
+            for deadline, callback, args in pending[1]:
+                heapq.heappush(queue, (deadline, next(self._counter), callback, args))
+            pending = next(source, None)
+        return pending
+
+    def _fire_due(self, deadline):
+        """Run every queued action that is due, as one tick"""
+        queue = self._queue
+        now = self.clock() - self.start_time if self.realtime else deadline
+        while queue and queue[0][0] <= now:
+            deadline, _, callback, args = heapq.heappop(queue)
+            self.current_deadline = deadline
+            callback(*args)
+        self.ticks += 1
+
+    def clear(self):
+        """Drop every pending action"""
+        self._queue.clear()
+
+
+class AsyncDeadlineScheduler(DeadlineScheduler):
+    """DeadlineScheduler for asyncio: run() is a coroutine that waits on the event loop.
+
+    Every wait is an asyncio.sleep, so any number of replays can run as
+    tasks on one loop without a thread or busy-wait each. Timing is as good
+    as the loop's timers (about a millisecond). Cancelling the task stops
+    the replay at its next wait with asyncio.CancelledError.
+    """
+
+    async def wait_until(self, target):
+        remaining = target - self.clock()
+        # Even when nothing has to wait, yield so other tasks get a turn
+        await asyncio.sleep(remaining if remaining > 0 and self.realtime else 0)
+
+    async def run(self, source=(), on_tick=None):
+        """Dispatch like DeadlineScheduler.run; returns True once everything ran"""
+        self.start_time = self.clock()
+        queue = self._queue
+        source = iter(source)
+        pending = next(source, None)
+        while queue or pending is not None:
+            pending = self._pull(source, pending)
+            deadline = queue[0][0]
+            await self.wait_until(self.start_time + deadline)
+            self._fire_due(deadline)
+            if on_tick is not None:
+                on_tick()
+        return True
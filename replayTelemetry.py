@@ -0,0 +1,141 @@
+from array import array
+import csv
+import json
+
+import numpy as np
+
+# Event type codes stored per dispatched action
+PRESS = 0
+RELEASE = 1
+SCROLL = 2
+MOVE = 3
+EVENT_TYPES = ('press', 'release', 'scroll', 'move')
+
+PERCENTILES = (50, 95, 99)
+
+
+class ReplayTelemetry:
+    """Scheduled vs. actual dispatch times of every replayed action.
+
+    Samples go into preallocated typed columns so recording one costs a few
+    array stores on the dispatcher thread. All times are seconds since the
+    replay started: `target` is the deadline from the recording, `actual` the
+    moment the controller call began and `latency` how long that call took.
+    """
+
+    def __init__(self, capacity=65536):
+        self.capacity = capacity
+        self.kind = array('B', bytes(capacity))
+        self.target = array('d', bytes(8 * capacity))
+        self.actual = array('d', bytes(8 * capacity))
+        self.latency = array('d', bytes(8 * capacity))
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def _grow(self):
+        self.kind.extend(array('B', bytes(self.capacity)))
+        for column in (self.target, self.actual, self.latency):
+            column.extend(array('d', bytes(8 * self.capacity)))
+        self.capacity *= 2
+
+    def record(self, kind, target, actual, latency):
+        if self.count == self.capacity:
+            self._grow()
+        i = self.count
+        self.kind[i] = kind
+        self.target[i] = target
+        self.actual[i] = actual
+        self.latency[i] = latency
+        self.count = i + 1
+
+    def columns(self):
+        """numpy views of the filled part of each column (no copies)"""
+        n = self.count
+        return (np.frombuffer(self.kind, dtype=np.uint8, count=n),
+                np.frombuffer(self.target, dtype=np.float64, count=n),
+                np.frombuffer(self.actual, dtype=np.float64, count=n),
+                np.frombuffer(self.latency, dtype=np.float64, count=n))
+
+    def report(self):
+        """Jitter/drift summary, overall and per event type"""
+        kind, target, actual, latency = self.columns()
+        report = {'actions': int(self.count)}
+        report.update(timing_summary(target, actual, latency))
+        report['by_type'] = {}
+        for code, name in enumerate(EVENT_TYPES):
+            selected = kind == code
+            if selected.any():
+                report['by_type'][name] = timing_summary(
+                    target[selected], actual[selected], latency[selected])
+        return report
+
+    def export_json(self, path):
+        """Write the report plus every sample"""
+        kind, target, actual, latency = self.columns()
+        data = self.report()
+        data['samples'] = {
+            'type': [EVENT_TYPES[code] for code in kind],
+            'target': target.tolist(),
+            'actual': actual.tolist(),
+            'latency': latency.tolist(),
+        }
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
+
+    def export_csv(self, path):
+        """Write one row per dispatched action"""
+        kind, target, actual, latency = self.columns()
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['type', 'target', 'actual', 'lateness', 'latency'])
+            for row in zip(kind, target, actual, latency):
+                writer.writerow([EVENT_TYPES[row[0]], f"{row[1]:.6f}", f"{row[2]:.6f}",
+                                 f"{row[2] - row[1]:.6f}", f"{row[3]:.6f}"])
+
+    def export(self, path):
+        """Export as CSV or JSON depending on the file extension"""
+        if path.endswith('.csv'):
+            self.export_csv(path)
+        else:
+            self.export_json(path)
+
+
+def timing_summary(target, actual, latency):
+    """Lateness and call latency percentiles plus drift over the replay"""
+    if len(target) == 0:
+        return {'count': 0}
+    lateness = actual - target
+    summary = {'count': int(len(target))}
+    for p, value in zip(PERCENTILES, np.percentile(lateness, PERCENTILES)):
+        summary[f'lateness_p{p}'] = float(value)
+    summary['lateness_max'] = float(lateness.max())
+    summary['lateness_mean'] = float(lateness.mean())
+    for p, value in zip(PERCENTILES, np.percentile(latency, PERCENTILES)):
+        summary[f'latency_p{p}'] = float(value)
+    summary['latency_max'] = float(latency.max())
+    # Drift: how much lateness grows per second of replay
+    if len(target) > 1 and target[-1] > target[0]:
+        summary['drift_per_second'] = float(np.polyfit(target, lateness, 1)[0])
+    else:
+        summary['drift_per_second'] = 0.0
+    return summary
+
+
+def format_report(report):
+    """Printable text version of ReplayTelemetry.report()"""
+    if not report.get('count'):
+        return "Replay timing: no actions dispatched"
+    lines = [
+        f"Replay timing over {report['actions']} actions:",
+        f"  lateness p50/p95/p99: {report['lateness_p50'] * 1000:.3f} / "
+        f"{report['lateness_p95'] * 1000:.3f} / {report['lateness_p99'] * 1000:.3f}ms, "
+        f"max {report['lateness_max'] * 1000:.3f}ms",
+        f"  controller latency p50/p99: {report['latency_p50'] * 1000:.3f} / "
+        f"{report['latency_p99'] * 1000:.3f}ms, drift {report['drift_per_second'] * 1000:.3f}ms/s",
+    ]
+    for name, summary in report['by_type'].items():
+        lines.append(f"  {name}: {summary['count']} actions, lateness p95 "
+                     f"{summary['lateness_p95'] * 1000:.3f}ms, max {summary['lateness_max'] * 1000:.3f}ms")
+    return "\n".join(lines)
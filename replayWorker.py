@@ -0,0 +1,45 @@
+import threading
+
+from replayScheduler import CancellationToken
+
+
+class ReplayWorker:
+    """Runs one replay at a time on a background thread.
+
+    The thread that starts a replay (normally the hotkey listener) returns
+    immediately and stays free to handle hotkeys, including the one that
+    cancels the replay through its CancellationToken.
+    """
+
+    def __init__(self):
+        self.thread = None
+        self.token = None
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, replay, *args, **kwargs):
+        """Run replay(*args, cancel_token=token, **kwargs) on the worker thread.
+
+        Returns False without starting anything if a replay is already running.
+        """
+        if self.running:
+            print("A replay is already running")
+            return False
+        self.token = CancellationToken()
+        kwargs['cancel_token'] = self.token
+        self.thread = threading.Thread(target=replay, args=args, kwargs=kwargs, daemon=True)
+        self.thread.start()
+        return True
+
+    def cancel(self, reason=None):
+        """Ask the running replay to stop; True if there was one"""
+        if not self.running:
+            return False
+        self.token.cancel(reason)
+        return True
+
+    def join(self, timeout=None):
+        if self.thread is not None:
+            self.thread.join(timeout)
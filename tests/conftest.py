@@ -0,0 +1,49 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import benchmark
+
+# inputRecorder and the output backends import pynput, which needs a display
+benchmark.install_fake_pynput()
+
+
+@pytest.fixture
+def events():
+    """Small synthetic recording with keys, clicks, scrolls and moves"""
+    return benchmark.generate_recording(300, seed=1)
+
+
+@pytest.fixture
+def recorder(tmp_path):
+    """InputRecorder replaying into a MemorySink, writing into a temporary directory"""
+    from inputRecorder import InputRecorder
+    from outputBackends import MemorySink
+
+    recorder = InputRecorder(backend=MemorySink())
+    recorder.output_file = str(tmp_path / 'keyboard_recording.json')
+    recorder.stream_file = str(tmp_path / 'keyboard_recording.jsonl')
+    recorder.logger.enabled = False
+    recorder.replay_logger.enabled = False
+    return recorder
+
+
+def key(name, press_time, release_time):
+    return {'key': name, 'press_time': press_time, 'release_time': release_time,
+            'duration': round(release_time - press_time, 6)}
+
+
+def move(time, duration, start, end, path=None):
+    import math
+    distance = math.hypot(end[0] - start[0], end[1] - start[1])
+    event = {'key': 'mouse_move', 'start_x': start[0], 'start_y': start[1], 'end_x': end[0],
+             'end_y': end[1], 'total_distance': distance,
+             'avg_speed': distance / duration if duration else 0, 'direction': 0.0,
+             'duration': duration, 'time': time}
+    if path is not None:
+        event['path'] = path
+    return event
@@ -0,0 +1,102 @@
+import asyncio
+
+from asyncRecorder import load_plan, replay
+from conftest import key
+from outputBackends import MemorySink
+
+
+def test_replay_into_memory_sink(events):
+    sink = MemorySink()
+    telemetry = asyncio.run(replay(events, speed=1000.0, backend=sink))
+    assert len(telemetry) == len(sink.actions)
+    assert not sink.pressed_keys and not sink.pressed_buttons
+    steps = load_plan(events).steps
+    assert len(sink.actions) == sum(1 for _, op, _ in steps if op != 'move_start')
+
+
+def test_concurrent_replays_share_the_loop():
+    async def main():
+        sinks = [MemorySink(realtime=True) for _ in range(10)]
+        recording = [key('a', 0.0, 0.01), key('b', 0.02, 0.03)]
+        await asyncio.gather(*(replay(recording, backend=sink) for sink in sinks))
+        return sinks
+
+    for sink in asyncio.run(main()):
+        assert [action for _, action, _ in sink.actions] == ['press_key', 'release_key'] * 2
+
+
+def test_cancel_releases_held_keys():
+    sink = MemorySink(realtime=True)
+
+    async def main():
+        task = asyncio.create_task(replay([key('Key.shift', 0.0, 10.0)], backend=sink))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            return True
+        return False
+
+    assert asyncio.run(main())
+    assert [action for _, action, _ in sink.actions] == ['press_key', 'release_key']
+    assert not sink.pressed_keys
+
+
+HEADLESS_SCRIPT = """
+import asyncio, sys
+sys.modules['pynput'] = None  # Importing pynput fails, as it does without a display
+from asyncRecorder import replay
+from outputBackends import MemorySink
+sink = MemorySink()
+recording = [{'key': 'Key.shift', 'press_time': 0.0, 'release_time': 0.1, 'duration': 0.1}]
+asyncio.run(replay(recording, speed=100.0, backend=sink))
+print(repr([args for _, _, args in sink.actions]))
+"""
+
+
+def test_replay_without_pynput():
+    import os
+    import subprocess
+    import sys
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.run([sys.executable, '-c', HEADLESS_SCRIPT], cwd=root,
+                             capture_output=True, text=True)
+    assert process.returncode == 0, process.stderr
+    assert process.stdout.strip().splitlines()[-1] == "[('Key.shift',), ('Key.shift',)]"
+
+
+class FailingSink(MemorySink):
+    def move_to(self, x, y):
+        raise OSError("display went away")
+
+    def release_button(self, button):
+        raise OSError("display went away")
+
+
+def test_backend_errors_do_not_stop_replay(capsys):
+    sink = FailingSink()
+    recording = [key('mouse_left', 0.0, 0.01),
+                 {'key': 'mouse_move', 'start_x': 0, 'start_y': 0, 'end_x': 10, 'end_y': 0,
+                  'time': 0.02, 'duration': 0.01, 'total_distance': 10.0},
+                 key('a', 0.04, 0.05)]
+    asyncio.run(replay(recording, speed=100.0, backend=sink))
+    assert [args for _, action, args in sink.actions if action != 'press_button'] == [('a',), ('a',)]
+    assert "Error moving mouse" in capsys.readouterr().out
+
+
+def test_compiles_off_the_loop(events, monkeypatch):
+    import threading
+
+    import asyncRecorder
+
+    threads = []
+
+    def compile_plan(*args):
+        threads.append(threading.current_thread())
+        return real_compile(*args)
+    real_compile = asyncRecorder.compile_plan
+    monkeypatch.setattr(asyncRecorder, 'compile_plan', compile_plan)
+    asyncio.run(replay(events, speed=1000.0, backend=MemorySink()))
+    assert threads and threads[0] is not threading.main_thread()
@@ -0,0 +1,9 @@
+from benchmark import generate_recording
+from recordingWriter import event_time
+
+
+def test_generated_recording_is_reproducible():
+    events = generate_recording(500, seed=7)
+    assert len(events) == 500
+    assert events == generate_recording(500, seed=7)
+    assert all(event_time(a) <= event_time(b) for a, b in zip(events, events[1:]))
@@ -0,0 +1,18 @@
+from captureBuffer import CaptureRing
+
+
+def test_items_come_out_in_order():
+    ring = CaptureRing(capacity=8)
+    for i in range(5):
+        ring.push(i)
+    assert ring.pop_batch() == [0, 1, 2, 3, 4]
+    assert ring.pop_batch() == []
+
+
+def test_lapped_consumer_counts_drops():
+    ring = CaptureRing(capacity=4)
+    for i in range(10):
+        ring.push(i)
+    assert ring.pop_batch() == [6, 7, 8, 9]
+    assert ring.dropped == 6
+    assert ring.high_water == 10
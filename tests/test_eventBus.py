@@ -0,0 +1,83 @@
+import os
+
+import pytest
+
+from conftest import key
+from eventBus import EventBus, EventBusReader
+
+
+@pytest.fixture
+def bus_name():
+    return f"macro_test_{os.getpid()}"
+
+
+def test_publish_and_read(events, bus_name):
+    with EventBus(bus_name, capacity=1024) as bus, EventBusReader(bus_name) as reader:
+        bus.begin_recording(123.0)
+        for event in events[:50]:
+            bus.publish(event)
+        received = reader.read()
+        assert reader.recording_start == 123.0
+        assert reader.is_open
+    assert len(received) == 50
+    assert [event['key'] for event in received] == [event['key'] for event in events[:50]]
+    for sent, got in zip(events, received):
+        if sent['key'] not in ('mouse_move', 'scroll'):
+            assert (got['press_time'], got['release_time']) == (sent['press_time'], sent['release_time'])
+
+
+def test_lagging_reader_counts_missed(bus_name):
+    with EventBus(bus_name, capacity=16) as bus, EventBusReader(bus_name) as reader:
+        for i in range(50):
+            bus.publish(key('a', i * 0.1, i * 0.1 + 0.05))
+        received = reader.read()
+    assert len(received) + reader.missed == 50
+    assert reader.missed >= 50 - 16
+    assert received[-1]['press_time'] == pytest.approx(4.9)
+
+
+def test_follow_ends_when_bus_closes(bus_name):
+    bus = EventBus(bus_name, capacity=16)
+    reader = EventBusReader(bus_name, from_start=True)
+    bus.publish(key('a', 0.0, 0.1))
+    events = reader.read()
+    from eventBus import FLAG, OPEN_OFFSET
+    FLAG.pack_into(bus.shm.buf, OPEN_OFFSET, 0)
+    assert list(reader.follow(interval=0.001)) == []
+    reader.close()
+    bus.close()
+    assert events[0]['key'] == 'a'
+
+
+def test_bus_in_use_is_not_replaced(bus_name):
+    with EventBus(bus_name, capacity=16) as bus:
+        bus.publish(key('a', 0.0, 0.1))
+        with pytest.raises(FileExistsError):
+            EventBus(bus_name, capacity=16)
+        with EventBusReader(bus_name, from_start=True) as reader:
+            assert reader.read()[0]['key'] == 'a'
+
+
+def test_stale_bus_is_replaced(bus_name):
+    import subprocess
+    import sys
+
+    from eventBus import HEADER, SLOT, VERSION, attach
+
+    # A writer that exited without closing its bus
+    dead = subprocess.run([sys.executable, '-c', 'import os; print(os.getpid())'],
+                          capture_output=True, text=True)
+    bus = EventBus(bus_name, capacity=16)
+    bus.publish(key('a', 0.0, 0.1))
+    HEADER.pack_into(bus.shm.buf, 0, b'MBUS', VERSION, SLOT.size, 16, 1, 1, 0.0, int(dead.stdout))
+    bus.shm.close()
+    try:
+        with EventBus(bus_name, capacity=16), EventBusReader(bus_name) as reader:
+            assert reader.head() == 0 and reader.is_open
+    finally:
+        try:
+            stale = attach(bus_name)
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,125 @@
+import json
+
+import numpy as np
+import pytest
+
+from binaryFormat import KIND_MOVE
+from conftest import key
+from eventStore import ClickEvent, EventStore, KeyEvent, MarkerEvent, MoveEvent, RawEvent, ScrollEvent
+
+
+def test_round_trip(events):
+    events = events + [
+        {'key': 'marker', 'label': 'm', 'time': 99.0, 'duration': 0.0},
+        {'key': 'a', 'press_time': 100.0, 'duration': 0.1},
+        {'key': 'b', 'press_time': 101.0, 'release_time': 101.1, 'duration': 0.1, 'note': 1},
+        {'something': 'else'},
+    ]
+    store = EventStore.from_events(events)
+    assert len(store) == len(events)
+    assert list(store) == events
+    assert store[-1] == {'something': 'else'}
+
+
+def test_typed_events(events):
+    store = EventStore.from_events(events + [{'key': 'marker', 'label': 'm', 'time': 99.0,
+                                              'duration': 0.0}, {'odd': True}])
+    classes = {type(event) for event in store.events()}
+    assert classes == {KeyEvent, ClickEvent, ScrollEvent, MoveEvent, MarkerEvent, RawEvent}
+    for event, original in zip(store.events(), events):
+        assert event.to_dict() == original
+
+
+def test_sort_and_filter(events):
+    store = EventStore.from_events(events[::-1])
+    assert not store.is_sorted()
+    store.sort()
+    assert store.is_sorted()
+    assert list(store) == sorted(events, key=lambda event: event.get('press_time', event.get('time')))
+    moves = store.filter(store.columns()['kind'] == KIND_MOVE)
+    assert list(moves) == [event for event in store if event['key'] == 'mouse_move']
+
+
+def test_take_keeps_extras():
+    store = EventStore.from_events([key('a', 0.0, 0.1), dict(key('b', 1.0, 1.1), note='x')])
+    taken = store.take(np.array([1, 0]))
+    assert taken[0]['note'] == 'x'
+    assert 'note' not in taken[1]
+
+
+def test_smaller_than_dicts(events):
+    store = EventStore.from_events(events)
+    assert store.nbytes / len(store) < 70
+
+
+def test_lossy_events_stay_whole():
+    events = [{'key': 'scroll', 'direction': 'left', 'dx': -1, 'dy': 0, 'press_time': 0.0,
+               'release_time': 0.0, 'duration': 0.0},
+              {'key': 'scroll', 'direction': 'up', 'dx': 1, 'press_time': 1.0, 'release_time': 1.0,
+               'duration': 0.0},
+              {'key': 'a', 'press_time': 2.0, 'release_time': True, 'duration': 0.1}]
+    store = EventStore.from_events(events)
+    assert list(store) == events
+    assert [type(event) for event in store.events()] == [RawEvent] * 3
+
+
+def test_typed_events_read_like_dicts(events):
+    store = EventStore.from_events(events)
+    for event, original in zip(store.events(), events):
+        for name, value in original.items():
+            assert name in event and event[name] == value
+        assert event.get('release_time') == original.get('release_time')
+    scroll = ScrollEvent('up', None, None, 1.0, 1.0, 0.0)
+    assert 'dy' not in scroll and scroll.get('dy', 0) == 0
+    with pytest.raises(KeyError):
+        scroll['dy']
+
+
+def test_typed_append_skips_dicts(monkeypatch):
+    def no_dict(self):
+        raise AssertionError("built a dict")
+
+    for cls in (KeyEvent, ScrollEvent, MoveEvent, MarkerEvent):
+        monkeypatch.setattr(cls, 'to_dict', no_dict)
+    store = EventStore()
+    store.append(KeyEvent('a', 0.0, 0.1, 0.1))
+    store.append(ClickEvent('mouse_left', 0.2, 0.3, 0.1))
+    store.append(ScrollEvent('down', 0, -2, 0.4, 0.4, 0.0))
+    store.append(MoveEvent(0, 0, 30, 40, 50.0, 100.0, 0.9, 0.5, 0.5, [[0.0, 0, 0], [0.5, 30, 40]]))
+    store.append(MarkerEvent('m', 1.0))
+    monkeypatch.undo()
+    assert [event['key'] for event in store] == ['a', 'mouse_left', 'scroll', 'mouse_move', 'marker']
+    assert store[2]['dy'] == -2 and store[3]['path'][-1] == [0.5, 30, 40]
+
+
+def odd_events():
+    return [
+        {'key': 'a', 'press_time': 0, 'duration': 0.1},
+        {'key': 'scroll', 'direction': 'up', 'press_time': 0.5, 'release_time': 0.5, 'duration': 0.0},
+        {'key': 'mouse_move', 'start_x': 0, 'start_y': 0, 'end_x': 5, 'end_y': 5, 'total_distance': 7.0,
+         'avg_speed': 7.0, 'direction': 0.7, 'duration': 1.0, 'time': 1.0, 'path': [[0.0, 0, 0], [1.0, 5.5, 5]]},
+        {'key': 'mouse_move', 'start_x': 0, 'start_y': 0, 'end_x': 2**31, 'end_y': 5,
+         'total_distance': 7.0, 'avg_speed': 7.0, 'direction': 0.7, 'duration': 1.0, 'time': 2.0},
+        {'key': 'mouse_move', 'start_x': 0, 'start_y': 0, 'end_x': 5, 'end_y': 5, 'total_distance': 7.0,
+         'avg_speed': 7.0, 'direction': 0.7, 'duration': 1.0, 'time': 3.0, 'path': []},
+        {'key': 'marker', 'label': 'm', 'time': 4.0, 'duration': True},
+        {'key': 'scroll', 'press_time': 5.0, 'release_time': 5.1, 'duration': 0.1},
+    ]
+
+
+def test_bulk_load_matches_append(events):
+    events = events + odd_events()
+    bulk = EventStore.from_events(events)
+    appended = EventStore()
+    for event in events:
+        appended.append(event)
+    assert bulk.__dict__ == appended.__dict__
+    assert list(bulk) == list(appended)
+
+
+def test_json_rows_match_dumps(events):
+    events = events + odd_events() + [dict(key('b', 9.0, 9.1), note='x'), {'odd': True}]
+    store = EventStore.from_events(events)
+    assert list(store.json_rows()) == [json.dumps(event) for event in store]
+    store.append(key('c', float('nan'), 10.0))
+    assert list(store.json_rows()) == [json.dumps(event) for event in store]
@@ -0,0 +1,233 @@
+import benchmark
+from conftest import key, move
+from outputBackends import DeferringBackend, MemorySink
+from replayScheduler import CancellationToken
+
+
+def actions(recorder):
+    return [(action, args) for _, action, args in recorder.backend.actions]
+
+
+def test_capture_from_callbacks(recorder, events):
+    recorder.start_recording()
+    for name, args in benchmark.callback_stream(events[:100]):
+        getattr(recorder, name)(*args)
+    recorder.stop_recording()
+    recorded = list(recorder.recorded_keys)
+    keys = [event['key'] for event in events[:100] if event['key'] != 'mouse_move']
+    assert [event['key'] for event in recorded if event['key'] != 'mouse_move'] == keys
+    assert recorder.capture_ring.dropped == 0
+
+
+def test_replay_into_memory_sink(recorder):
+    recorder.recorded_keys = [key('a', 0.0, 0.1), key('Key.shift', 0.05, 0.2),
+                              {'key': 'mouse_left', 'press_time': 0.3, 'release_time': 0.35,
+                               'duration': 0.05},
+                              move(0.4, 0.1, (0, 0), (100, 0))]
+    recorder.replay_recording(countdown=0)
+    replayed = actions(recorder)
+    assert [action for action, _ in replayed[:5]] == ['press_key', 'press_key', 'release_key',
+                                                      'release_key', 'press_button']
+    assert replayed[0][1] == ('a',)
+    assert replayed[-1] == ('move_to', (100, 0))
+    assert not recorder.backend.pressed_keys and not recorder.backend.pressed_buttons
+    assert len(recorder.last_replay_telemetry) == len(replayed)
+
+
+def test_repeat_replays_back_to_back(recorder):
+    recorder.recorded_keys = [key('a', 0.0, 0.1)]
+    recorder.replay_recording(countdown=0, repeat=3)
+    assert actions(recorder) == [('press_key', ('a',)), ('release_key', ('a',))] * 3
+    # Timing is kept per iteration rather than growing with every repeat
+    assert len(recorder.last_replay_telemetry) == 2
+    assert recorder.last_replay_telemetry.columns()[1].tolist() == [0.0, 0.1]
+
+
+def test_cancelled_replay_releases_keys(recorder):
+    token = CancellationToken()
+    recorder.recorded_keys = [key('Key.shift', 0.0, 1.0), key('a', 0.5, 0.6)]
+    recorder.backend = sink = MemorySink()
+    sink.press_key = lambda key, press=sink.press_key: (press(key), token.cancel('test'))
+    recorder.replay_recording(countdown=0, cancel_token=token)
+    assert [action for _, action, _ in sink.actions] == ['press_key', 'release_key']
+    assert not sink.pressed_keys
+    assert recorder.last_abort_latency['reason'] == 'test'
+
+
+def test_deferred_failure_is_not_held_or_timed(recorder):
+    token = CancellationToken()
+    recorder.recorded_keys = [key('a', 0.0, 1.0), key('b', 0.5, 0.6)]
+    sink = MemorySink()
+
+    def press_key(key, press=sink.press_key):
+        if key == 'a':
+            raise RuntimeError('injection failed')
+        press(key)
+        token.cancel('test')
+    sink.press_key = press_key
+    recorder.replay_recording(countdown=0, cancel_token=token, backend=DeferringBackend(sink))
+    # The failed press is never released at cleanup and only what was injected is timed
+    assert [(action, args) for _, action, args in sink.actions] == [('press_key', ('b',)),
+                                                                    ('release_key', ('b',))]
+    assert len(recorder.last_replay_telemetry) == 1
+
+
+def test_partial_replay(recorder):
+    recorder.recorded_keys = [key('a', 0.0, 0.1), {'key': 'marker', 'label': 'go', 'time': 1.0,
+                                                   'duration': 0.0}, key('b', 2.0, 2.1)]
+    recorder.replay_recording(countdown=0, start='go')
+    assert actions(recorder) == [('press_key', ('b',)), ('release_key', ('b',))]
+    assert recorder.backend.actions[0][0] == 1.0
+
+
+def test_streamed_recording_replays_lazily(recorder, tmp_path):
+    from recordingWriter import EventStream, write_recording
+
+    path = str(tmp_path / 'stream.jsonl')
+    # Within the writer's reorder window events can be slightly out of order
+    write_recording([key('b', 0.2, 0.3), key('a', 0.1, 0.15), key('c', 0.4, 0.5)], path)
+    assert recorder.load_recording(path)
+    assert isinstance(recorder.recorded_keys, EventStream)
+    recorder.replay_recording(countdown=0)
+    assert [args for action, args in actions(recorder) if action == 'press_key'] == [('a',), ('b',), ('c',)]
+
+
+def test_fast_replay_is_packed(recorder):
+    recorder.recorded_keys = [key('a', 0.0, 0.1), key('b', 30.0, 30.1)]
+    recorder.replay_fast(countdown=0)
+    deadlines = [deadline for deadline, _, _ in recorder.backend.actions]
+    assert deadlines[-1] < 0.1
+
+
+def test_capture_survives_handler_errors(recorder):
+    def broken(current_time, x, y, dx, dy):
+        raise RuntimeError("broken handler")
+
+    recorder.handle_mouse_scroll = broken
+    recorder.start_recording()
+    recorder.on_mouse_scroll(0, 0, 0, 1)
+    for name, args in benchmark.callback_stream([key('a', 0.0, 0.1)]):
+        getattr(recorder, name)(*args)
+    recorder.stop_recording()
+    assert recorder.capture_stats.errors == 1
+    assert [event['key'] for event in recorder.recorded_keys] == ['a']
+
+
+HEADLESS_SCRIPT = """
+import sys
+sys.modules['pynput'] = None  # Importing pynput fails, as it does without a display
+from inputRecorder import InputRecorder
+from outputBackends import MemorySink
+recorder = InputRecorder(backend=MemorySink())
+recorder.recorded_keys = [{'key': 'Key.shift', 'press_time': 0.0, 'release_time': 0.1, 'duration': 0.1},
+                          {'key': 'mouse_left', 'press_time': 0.2, 'release_time': 0.3, 'duration': 0.1}]
+recorder.replay_recording(countdown=0)
+print(repr([args for _, _, args in recorder.backend.actions]))
+"""
+
+
+def test_replay_without_pynput():
+    import os
+    import subprocess
+    import sys
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.run([sys.executable, '-c', HEADLESS_SCRIPT], cwd=root,
+                             capture_output=True, text=True)
+    assert process.returncode == 0, process.stderr
+    last_line = process.stdout.strip().splitlines()[-1]
+    assert last_line == "[('Key.shift',), ('Key.shift',), ('left',), ('left',)]"
+
+
+def test_injected_keys_are_not_hotkeys(recorder):
+    from benchmark import FakeKeyCode
+    from inputRecorder import hotkey_callbacks
+
+    on_press, on_release = hotkey_callbacks(recorder)
+    assert on_release(FakeKeyCode('q'), True) is None
+    assert recorder.running
+    assert on_release(FakeKeyCode('q')) is False
+    assert not recorder.running
+
+
+def test_only_stop_key_works_during_replay(recorder):
+    import threading
+
+    from benchmark import FakeKeyCode, FakeSpecialKey
+    from inputRecorder import hotkey_callbacks
+
+    started = threading.Event()
+
+    def long_replay(cancel_token):
+        started.set()
+        cancel_token.wait(5)
+
+    on_press, on_release = hotkey_callbacks(recorder)
+    recorder.replay_worker.start(long_replay)
+    started.wait(1)
+    on_press(FakeSpecialKey('f7'))
+    assert not recorder.is_recording
+    on_release(FakeKeyCode('q'))
+    assert recorder.running
+    on_press(FakeSpecialKey('esc'), True)
+    assert not recorder.replay_worker.token.cancelled
+    on_press(FakeSpecialKey('esc'))
+    assert recorder.replay_worker.token.cancelled
+    recorder.replay_worker.join(1)
+
+
+def test_escape_in_recording_does_not_cancel(recorder):
+    recorder.recorded_keys = [key('Key.esc', 0.0, 0.1), key('a', 0.2, 0.3)]
+    recorder.replay_recording(countdown=0)
+    assert [args for _, args in actions(recorder)][-1] == ('a',)
+
+
+def test_loading_closes_the_previous_mapping(recorder, events, tmp_path):
+    from binaryFormat import write_binary
+
+    path = str(tmp_path / 'recording.mrec')
+    write_binary(events, path)
+    assert recorder.load_recording(path)
+    first = recorder.recorded_keys
+    assert recorder.load_recording(path)
+    assert first._mmap.closed
+    assert not recorder.recorded_keys._mmap.closed
+    recorder.recorded_keys.close()
+
+
+def test_first_replay_streams_and_keeps_the_plan(recorder, events):
+    recorder.recorded_keys = events
+    recorder.replay_recording(speed_multiplier=1000.0, countdown=0, repeat=2)
+    plan = recorder.cached_replay_plan()
+    assert plan is not None and plan.event_count == len(events)
+    passes = actions(recorder)
+    assert passes[:len(passes) // 2] == passes[len(passes) // 2:]
+
+
+def test_stopped_replay_keeps_no_plan(recorder):
+    token = CancellationToken()
+    token.cancel()
+    recorder.recorded_keys = [key('a', 0.0, 0.1), key('b', 5.0, 5.1)]
+    recorder.replay_recording(countdown=0, cancel_token=token)
+    assert recorder.cached_replay_plan() is None
+
+
+def test_single_mrec_pass_keeps_no_steps(recorder, events, tmp_path):
+    from binaryFormat import write_binary
+
+    path = str(tmp_path / 'recording.mrec')
+    write_binary(events, path)
+    recorder.load_recording(path)
+    recorder.replay_recording(speed_multiplier=1000.0, countdown=0)
+    assert recorder.cached_replay_plan() is None
+    recorder.recorded_keys.close()
+
+
+def test_replay_from_typed_events(recorder, events):
+    from eventStore import EventStore
+    from replayPlan import compile_plan
+
+    store = EventStore.from_events(events)
+    typed = compile_plan(store.events(), str, str).steps
+    dicts = compile_plan(list(store), str, str).steps
+    assert [(t, op) for t, op, _ in typed] == [(t, op) for t, op, _ in dicts]
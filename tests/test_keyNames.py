@@ -0,0 +1,16 @@
+from benchmark import FakeButton, FakeKeyCode, FakeSpecialKey
+from keyNames import button_name, key_name, resolve_button, resolve_key
+
+
+def test_recorded_names():
+    assert key_name(FakeKeyCode('a')) == 'a'
+    assert key_name(FakeSpecialKey('shift')) == 'Key.shift'
+    assert button_name(FakeButton.left) == 'left'
+    assert button_name(FakeButton.middle) == 'Button.middle'
+
+
+def test_resolve_names():
+    assert resolve_key('a') == 'a'
+    assert str(resolve_key('Key.shift')) == 'Key.shift'
+    assert resolve_button('left') is FakeButton.left
+    assert resolve_button('middle') is FakeButton.middle
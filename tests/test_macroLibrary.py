@@ -0,0 +1,34 @@
+import os
+
+from conftest import key
+from macroLibrary import MacroLibrary
+
+
+def test_add_list_and_load(tmp_path, events):
+    library = MacroLibrary(str(tmp_path))
+    library.add('login', events)
+    library.add('logout', events[:10], extension='.mrec')
+    assert [entry['name'] for entry in library.list()] == ['login', 'logout']
+    assert library.index['login']['events'] == len(events)
+    assert [entry['name'] for entry in library.search('OUT')] == ['logout']
+    assert list(library.load('login')) == events
+    assert list(library.load('logout')) == events[:10]
+
+
+def test_cache_hits_until_file_changes(tmp_path):
+    library = MacroLibrary(str(tmp_path))
+    library.add('a', [key('a', 0.0, 0.1)])
+    library.load('a')
+    library.load('a')
+    assert (library.hits, library.misses) == (1, 1)
+    library.add('a', [key('b', 0.0, 0.1)])
+    assert list(library.load('a'))[0]['key'] == 'b'
+
+
+def test_refresh_picks_up_removed_files(tmp_path):
+    library = MacroLibrary(str(tmp_path))
+    path = library.add('a', [key('a', 0.0, 0.1)])
+    os.remove(path)
+    library.refresh()
+    assert library.list() == []
+    assert MacroLibrary(str(tmp_path)).list() == []
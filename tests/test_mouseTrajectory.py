@@ -0,0 +1,72 @@
+import math
+
+from mouseTrajectory import TrajectoryBuffer, interpolate_move, interpolate_path, simplify_indices
+
+
+def test_straight_line_simplifies_to_endpoints():
+    buffer = TrajectoryBuffer(capacity=4)
+    for i in range(100):
+        buffer.append(i * 0.01, i * 3, i * 2)
+    path = buffer.simplify(1.0)
+    assert path == [[0.0, 0, 0], [0.99, 297, 198]]
+
+
+def test_simplification_stays_within_epsilon():
+    ts = [i * 0.01 for i in range(200)]
+    xs = [int(300 * math.cos(i / 30)) for i in range(200)]
+    ys = [int(300 * math.sin(i / 30)) for i in range(200)]
+    keep = simplify_indices(ts, xs, ys, len(ts), 2.0)
+    assert keep[0] == 0 and keep[-1] == len(ts) - 1
+    assert len(keep) < len(ts)
+    # Every dropped sample is close to where the simplified path is at its time
+    for first, last in zip(keep, keep[1:]):
+        for i in range(first + 1, last):
+            f = (ts[i] - ts[first]) / (ts[last] - ts[first])
+            x = xs[first] + (xs[last] - xs[first]) * f
+            y = ys[first] + (ys[last] - ys[first]) * f
+            assert math.hypot(xs[i] - x, ys[i] - y) <= 2.0
+
+
+def test_simplification_keeps_pauses():
+    buffer = TrajectoryBuffer()
+    # Moves right, waits, moves right again at the same speed
+    for i in range(50):
+        buffer.append(i * 0.01, i * 4, 0)
+    for i in range(50):
+        buffer.append(0.5 + i * 0.01, 196, 0)
+    for i in range(50):
+        buffer.append(1.0 + i * 0.01, 196 + i * 4, 0)
+    offsets = [vertex[0] for vertex in buffer.simplify(1.0)]
+    assert len(offsets) >= 4
+
+
+def test_buffer_grows_and_resets():
+    buffer = TrajectoryBuffer(capacity=2)
+    for i in range(10):
+        buffer.append(float(i), i, i)
+    assert len(buffer) == 10 and buffer.capacity >= 10
+    buffer.reset()
+    assert len(buffer) == 0 and buffer.simplify() == []
+
+
+def test_interpolate_move_reaches_endpoints():
+    samples = list(interpolate_move(0, 0, 100, 50, 1.0, 0.5))
+    assert samples[0] == (1.0, 0, 0)
+    assert samples[-1] == (1.5, 100, 50)
+    assert all(a[0] < b[0] for a, b in zip(samples, samples[1:]))
+
+
+def test_interpolate_path_follows_vertices():
+    path = [[0.0, 0, 0], [0.5, 100, 0], [1.0, 100, 100]]
+    samples = list(interpolate_path(path, 2.0, time_scale=0.5))
+    assert samples[0] == (2.0, 0, 0)
+    assert (2.25, 100, 0) in samples
+    assert samples[-1] == (2.5, 100, 100)
+
+
+def test_float_coordinates_are_rounded():
+    # macOS reports pointer positions as floats
+    buffer = TrajectoryBuffer()
+    buffer.append(0.0, 10.4, 20.6)
+    buffer.append(0.1, 110.5, 20.6)
+    assert buffer.simplify() == [[0.0, 10, 21], [0.1, 110, 21]]
@@ -0,0 +1,38 @@
+from outputBackends import DeferringBackend, MemorySink
+
+
+def test_memory_sink_tracks_state():
+    sink = MemorySink()
+    sink.press_key('a')
+    sink.press_button('left')
+    sink.move_to(5, 6)
+    sink.release_key('a')
+    assert [action for _, action, _ in sink.actions] == ['press_key', 'press_button', 'move_to',
+                                                         'release_key']
+    assert sink.pressed_keys == set() and sink.pressed_buttons == {'left'}
+    assert sink.position == (5, 6)
+
+
+def test_deferring_defers_until_flush():
+    sink = MemorySink()
+    backend = DeferringBackend(sink)
+    backend.press_key('a')
+    backend.move_to(1, 1)
+    backend.move_to(2, 2)
+    assert sink.actions == []
+    backend.flush()
+    assert [(action, args) for _, action, args in sink.actions] == [('press_key', ('a',)),
+                                                                    ('move_to', (2, 2))]
+    assert backend.coalesced == 1
+
+
+def test_deferred_send_reports_injection():
+    sink = MemorySink()
+    sink.release_key = lambda key: 1 / 0
+    backend = DeferringBackend(sink)
+    sent = []
+    backend.send('press_key', ('a',), lambda call_start, latency: sent.append('a'))
+    backend.send('release_key', ('a',), lambda call_start, latency: sent.append('release'))
+    assert sent == []
+    backend.flush()
+    assert sent == ['a']
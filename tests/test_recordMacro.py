@@ -0,0 +1,18 @@
+import json
+
+from binaryFormat import BinaryRecording
+import recordMacro
+
+
+def test_convert(events, tmp_path):
+    source = tmp_path / 'recording.json'
+    source.write_text(json.dumps(events))
+    destination = str(tmp_path / 'recording.mrec')
+    recordMacro.main(['convert', str(source), destination])
+    with BinaryRecording(destination) as recording:
+        assert list(recording) == events
+
+
+def test_unknown_command(capsys):
+    assert recordMacro.main(['frobnicate']) == 2
+    assert "Unknown command" in capsys.readouterr().out
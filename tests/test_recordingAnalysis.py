@@ -0,0 +1,55 @@
+import pytest
+
+from binaryFormat import write_binary
+from conftest import key, move
+from eventStore import EventStore
+from recordingAnalysis import analyze
+
+
+def test_sources_agree(events, tmp_path):
+    path = str(tmp_path / 'recording.mrec')
+    write_binary(events, path)
+    from_list = analyze(events)
+    for report in (analyze(path), analyze(EventStore.from_events(events))):
+        assert report['events_by_type'] == from_list['events_by_type']
+        assert report['keys'].keys() == from_list['keys'].keys()
+        for name, stats in report['keys'].items():
+            assert stats == pytest.approx(from_list['keys'][name])
+        assert report['mouse']['total_distance'] == pytest.approx(from_list['mouse']['total_distance'])
+        assert report['idle_gaps']['count'] == from_list['idle_gaps']['count']
+
+
+def test_report_contents():
+    events = [key('a', 0.0, 0.1), key('a', 0.5, 0.7), key('b', 1.0, 1.05),
+              move(2.0, 1.0, (0, 0), (300, 400)), key('c', 5.0, 5.1)]
+    report = analyze(events, idle_threshold=1.0)
+    assert report['events'] == 5
+    assert report['total_duration'] == pytest.approx(5.1)
+    assert report['events_by_type'] == {'key': 4, 'click': 0, 'scroll': 0, 'move': 1}
+    assert report['keys']['a']['count'] == 2
+    assert report['keys']['a']['mean'] == pytest.approx(0.15)
+    assert report['mouse']['total_distance'] == pytest.approx(500.0)
+    assert report['mouse']['speed']['max'] == pytest.approx(500.0)
+    assert report['idle_gaps']['count'] == 1
+    assert report['idle_gaps']['longest'][0]['length'] == pytest.approx(2.0)
+
+
+def test_empty_recording():
+    assert analyze([]) == {'events': 0}
+
+
+def test_mouse_distance_follows_the_path(tmp_path):
+    path = [[0.0, 0, 0], [0.5, 300, 400], [1.0, 0, 0]]
+    events = [move(0.0, 1.0, (0, 0), (0, 0), path), move(2.0, 1.0, (0, 0), (30, 40))]
+    mrec = str(tmp_path / 'recording.mrec')
+    write_binary(events, mrec)
+    for source in (events, mrec, EventStore.from_events(events)):
+        assert analyze(source)['mouse']['total_distance'] == pytest.approx(1050.0)
+
+
+def test_key_statistics_skip_scrolls_and_markers():
+    events = [key('a', 0.0, 0.1), key('mouse_left', 0.2, 0.3),
+              {'key': 'scroll', 'direction': 'up', 'dx': 0, 'dy': 1, 'press_time': 0.4,
+               'release_time': 0.4, 'duration': 0.0},
+              {'key': 'marker', 'label': 'checkpoint', 'time': 0.5, 'duration': 0.0}]
+    assert set(analyze(events)['keys']) == {'a', 'mouse_left'}
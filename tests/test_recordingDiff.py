@@ -0,0 +1,79 @@
+import pytest
+
+from conftest import key
+from recordingDiff import check, compare
+
+
+def test_identical_recordings_match(events):
+    report = compare(events, [dict(event) for event in events])
+    assert report['matched'] == len(events)
+    assert report['missing'] == report['inserted'] == report['reordered'] == 0
+    assert report['timing']['start_error']['max'] == 0.0
+    assert report['mouse']['path_deviation']['max'] == 0.0
+    assert check(report, max_missing=0, max_time_error=0.001) == []
+
+
+def test_missing_and_inserted(events):
+    candidate = [dict(event) for event in events]
+    removed = candidate.pop(100)
+    candidate.append(key('z', events[-1]['press_time'] + 5.0, events[-1]['press_time'] + 5.1))
+    report = compare(events, candidate)
+    assert report['missing'] == 1 and report['inserted'] == 1
+    assert report['missing_events'][0]['key'] == removed['key']
+    assert check(report, max_missing=0) != []
+
+
+def test_constant_delay_is_bias():
+    reference = [key(name, i * 0.2, i * 0.2 + 0.1) for i, name in enumerate('abcdef')]
+    candidate = [key(name, i * 0.2 + 0.03, i * 0.2 + 0.13) for i, name in enumerate('abcdef')]
+    report = compare(reference, candidate, align_start=False)
+    assert report['matched'] == 6
+    assert report['timing']['start_bias'] == pytest.approx(0.03)
+
+
+def test_swapped_events_are_reordered():
+    reference = [key('a', 0.0, 0.05), key('b', 0.1, 0.15), key('c', 0.2, 0.25)]
+    candidate = [key('b', 0.0, 0.05), key('a', 0.1, 0.15), key('c', 0.2, 0.25)]
+    report = compare(reference, candidate)
+    assert report['matched'] == 3 and report['reordered'] == 1
+
+
+def slower(event, factor):
+    event = dict(event)
+    for field in ('press_time', 'release_time', 'time', 'duration'):
+        if field in event:
+            event[field] = event[field] * factor
+    if 'path' in event:
+        event['path'] = [[t * factor, x, y] for t, x, y in event['path']]
+    return event
+
+
+def test_slower_replay_still_matches():
+    from benchmark import generate_recording
+
+    reference = generate_recording(2000, seed=3)
+    candidate = [slower(event, 1.05) for event in reference]
+    report = compare(reference, candidate)
+    assert report['matched'] == 2000
+    assert report['missing'] == report['inserted'] == report['reordered'] == 0
+    assert report['timing']['start_bias'] > 0
+
+
+def test_faster_replay_still_matches():
+    from benchmark import generate_recording
+
+    reference = generate_recording(2000, seed=3)
+    candidate = [slower(event, 0.9) for event in reference]
+    report = compare(reference, candidate)
+    assert report['matched'] == 2000
+    assert report['timing']['start_bias'] < 0
+
+
+def test_jitter_does_not_pair_distant_events():
+    times = [('a', 0.6), ('b', 0.9), ('a', 0.902), ('a', 1.202), ('a', 1.802), ('b', 1.804)]
+    jitter = [-0.003, 0.003, -0.003, -0.003, 0.003, -0.003]
+    reference = [key(name, t, t + 0.05) for name, t in times]
+    candidate = [key(name, t + dt, t + dt + 0.05) for (name, t), dt in zip(times, jitter)]
+    report = compare(reference, candidate, align_start=False)
+    assert report['missing'] == report['inserted'] == 0
+    assert report['timing']['start_error']['max'] <= 0.003 + 1e-9
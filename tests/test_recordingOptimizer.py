@@ -0,0 +1,93 @@
+from conftest import key, move
+from recordingOptimizer import (coalesce_scrolls, compress_idle, drop_idle_moves, merge_moves,
+                                optimize, pack_timing)
+from recordingWriter import event_end, event_time
+
+
+def scroll(t, direction='down'):
+    return {'key': 'scroll', 'direction': direction, 'press_time': t, 'release_time': t,
+            'duration': 0.0}
+
+
+def test_drop_idle_moves():
+    events = [move(0.0, 0.1, (10, 10), (10, 10)), move(1.0, 0.1, (10, 10), (50, 10))]
+    assert drop_idle_moves(events) == events[1:]
+
+
+def test_merge_moves_joins_neighbours_only():
+    events = [move(0.0, 0.1, (0, 0), (10, 0)), move(0.12, 0.1, (10, 0), (20, 0)),
+              key('a', 0.3, 0.35), move(0.36, 0.1, (20, 0), (30, 0))]
+    merged = merge_moves(events)
+    assert len(merged) == 3
+    assert (merged[0]['start_x'], merged[0]['end_x']) == (0, 20)
+    assert merged[0]['path'][-1] == [0.22, 20, 0]
+
+
+def test_coalesce_scrolls():
+    events = [scroll(0.0), scroll(0.05), scroll(0.1), scroll(0.15, 'up'), scroll(1.0)]
+    coalesced = coalesce_scrolls(events)
+    assert [(event.get('dy'), event['press_time']) for event in coalesced] == \
+        [(-3, 0.0), (None, 0.15), (None, 1.0)]
+    assert all(event['release_time'] == event['press_time'] for event in coalesced)
+
+
+def test_compress_idle_keeps_holds():
+    events = [key('a', 0.0, 0.1), key('shift', 1.0, 10.0), key('b', 20.0, 20.1)]
+    compressed = compress_idle(events, threshold=1.0)
+    assert [event_time(event) for event in compressed] == [0.0, 1.0, 11.0]
+    # The 9 second hold is untouched
+    assert compressed[1]['release_time'] == 10.0
+
+
+def test_optimize_report(events):
+    optimized, report = optimize(events)
+    assert report['events']['before'] == len(events)
+    assert report['events']['after'] == len(optimized)
+    assert report['controller_calls']['after'] <= report['controller_calls']['before']
+    assert report['duration']['after'] <= report['duration']['before']
+
+
+def test_pack_timing_keeps_order_and_min_hold(events):
+    packed, report = pack_timing(events, min_hold=0.02, min_gap=0.005)
+    assert report['events'] == len(events)
+    # Moves may be split, everything else is kept one to one
+    assert [e['key'] for e in packed if e['key'] != 'mouse_move'] == \
+        [e['key'] for e in sorted(events, key=event_time) if e['key'] != 'mouse_move']
+    assert report['duration']['after'] < report['duration']['before']
+    for event in packed:
+        if 'press_time' in event and event['key'] != 'scroll':
+            assert event['release_time'] - event['press_time'] >= 0.02 - 1e-9
+    assert all(event_time(a) <= event_time(b) for a, b in zip(packed, packed[1:]))
+    assert max(map(event_end, packed)) == report['duration']['after']
+
+
+def test_pack_timing_keeps_chords():
+    events = [key('Key.shift', 0.0, 1.0), key('a', 0.5, 0.6)]
+    packed, _ = pack_timing(events)
+    shift, a = packed
+    assert shift['press_time'] < a['press_time'] < a['release_time'] < shift['release_time']
+
+
+def test_pack_timing_keeps_waits_after_markers():
+    events = [key('a', 0.0, 0.1), {'key': 'marker', 'label': 'wait', 'time': 1.0, 'duration': 0.0},
+              key('b', 3.0, 3.1)]
+    packed, _ = pack_timing(events, keep_waits=True)
+    marker, b = packed[1], packed[2]
+    assert round(b['press_time'] - marker['time'], 6) == 2.0
+
+
+def test_pack_timing_clicks_where_the_mouse_was():
+    from timeIndex import interpolate_position
+
+    events = [move(0.0, 2.0, (0, 0), (1000, 0), [[0.0, 0, 0], [2.0, 1000, 0]]),
+              key('mouse_left', 1.5, 1.6)]
+    packed, _ = pack_timing(events)
+    click = next(event for event in packed if event['key'] == 'mouse_left')
+    # Where the packed moves have taken the mouse when the click fires
+    x = 0
+    for event in packed:
+        if event['key'] == 'mouse_move' and event['time'] <= click['press_time']:
+            offset = min(click['press_time'] - event['time'], event['duration'])
+            x, _ = interpolate_position(event['path'], offset)
+    assert abs(x - 750) <= 1
+    assert packed[-1]['end_x'] == 1000
@@ -0,0 +1,28 @@
+from conftest import key
+from recordingWriter import StreamingRecordingWriter, read_event_stream, write_recording
+from replayPipeline import iter_recording
+
+
+def test_streaming_writer_reorders(tmp_path):
+    path = str(tmp_path / 'stream.jsonl')
+    writer = StreamingRecordingWriter(path, fsync=False)
+    writer.start()
+    # Keys arrive at release time, after events that started later
+    writer.write(key('b', 0.2, 0.3))
+    writer.write(key('a', 0.1, 0.5))
+    writer.close()
+    assert [event['key'] for event in read_event_stream(path)] == ['a', 'b']
+    assert writer.events_written == 2
+
+
+def test_torn_tail_is_ignored(tmp_path):
+    path = tmp_path / 'stream.jsonl'
+    path.write_text('{"key": "a", "press_time": 0.0, "duration": 0.1}\n{"key": "b", "pre')
+    assert read_event_stream(str(path)) == [{'key': 'a', 'press_time': 0.0, 'duration': 0.1}]
+
+
+def test_formats_round_trip(tmp_path, events):
+    for name in ('recording.json', 'recording.jsonl', 'recording.mrec'):
+        path = str(tmp_path / name)
+        write_recording(events, path)
+        assert list(iter_recording(path)) == events
@@ -0,0 +1,39 @@
+from conftest import key, move
+from eventStore import EventStore, KeyEvent
+from replayPipeline import iter_replay_events, reorder_events, resolve_events, schedule_events
+
+HANDLERS = {op: op for op in ('press_key', 'release_key', 'press_mouse', 'release_mouse',
+                              'scroll', 'move_start', 'move_mouse')}
+
+
+def test_reorder_within_window():
+    events = [key('b', 1.0, 1.1), key('a', 0.5, 0.6), key('c', 2.0, 2.1)]
+    assert [event['key'] for event in reorder_events(events)] == ['a', 'b', 'c']
+
+
+def test_resolve_skips_unresolvable_keys(capsys):
+    def resolve_key(name):
+        if name == 'Key.bogus':
+            raise AttributeError(name)
+        return name.upper()
+
+    events = [key('a', 0.0, 0.1), key('Key.bogus', 0.2, 0.3), key('mouse_left', 0.4, 0.5)]
+    resolved = list(resolve_events(events, resolve_key, lambda name: name))
+    assert [(kind, target) for kind, _, target in resolved] == [('key', 'A'), ('click', 'left')]
+    assert "Key.bogus" in capsys.readouterr().out
+
+
+def test_schedule_presses_and_moves():
+    events = [key('a', 1.0, 1.5), move(2.0, 0.5, (0, 0), (100, 0))]
+    resolved = resolve_events(events, str, str)
+    scheduled = list(schedule_events(resolved, HANDLERS, speed_multiplier=2.0))
+    (press_deadline, press), (move_deadline, moves) = scheduled
+    assert press == [(0.5, 'press_key', ('a', 'a')), (0.75, 'release_key', ('a',))]
+    assert move_deadline == 1.0 and moves[0][1] == 'move_start'
+    assert moves[-1][2] == (100, 0)
+
+
+def test_store_replays_typed_events(events):
+    store = EventStore.from_events([key('a', 0.0, 0.1)])
+    assert [type(event) for event in iter_replay_events(store)] == [KeyEvent]
+    assert list(iter_replay_events(events)) == events
@@ -0,0 +1,37 @@
+from conftest import key
+from replayPlan import PlanBuilder, PlanCache, ReplayPlan, compile_plan
+
+
+def test_compile_sorts_steps(events):
+    plan = compile_plan(events, str, str, 'hash')
+    deadlines = [deadline for deadline, _, _ in plan.steps]
+    assert deadlines == sorted(deadlines)
+    assert plan.event_count == len(events)
+    assert plan.duration == deadlines[-1]
+
+
+def test_timeline_binds_and_scales():
+    plan = compile_plan([key('a', 1.0, 2.0)], str, str)
+    callbacks = {op: op.upper() for op in ('press_key', 'release_key', 'press_mouse',
+                                             'release_mouse', 'scroll', 'move_start', 'move_mouse')}
+    timeline = list(plan.timeline(callbacks, speed_multiplier=2.0))
+    assert [actions[0][:2] for _, actions in timeline] == [(0.5, 'PRESS_KEY'), (1.0, 'RELEASE_KEY')]
+
+
+def test_builder_plan_matches_compile(events):
+    builder = PlanBuilder(events, str, str)
+    assert builder.plan() is None
+    callbacks = {op: op for op in ('press_key', 'release_key', 'press_mouse', 'release_mouse',
+                                   'scroll', 'move_start', 'move_mouse')}
+    for _ in builder.timeline(callbacks, speed_multiplier=4.0):
+        pass
+    assert builder.plan().steps == compile_plan(events, str, str).steps
+
+
+def test_cache_evicts_oldest():
+    cache = PlanCache(max_plans=2)
+    for name in 'abc':
+        cache.put(ReplayPlan((), 0, name))
+    cache.put(ReplayPlan((), 0, None))  # Plans without a hash are not cached
+    assert cache.get('a') is None
+    assert cache.get('b') is not None and cache.get('c') is not None
@@ -0,0 +1,74 @@
+import asyncio
+
+from replayScheduler import AsyncDeadlineScheduler, CancellationToken, DeadlineScheduler
+
+
+def test_actions_fire_in_deadline_order():
+    scheduler = DeadlineScheduler(realtime=False)
+    fired = []
+    for deadline in (0.3, 0.1, 0.2, 0.1):
+        scheduler.schedule(deadline, fired.append, deadline)
+    assert scheduler.run()
+    assert fired == [0.1, 0.1, 0.2, 0.3]
+
+
+def test_deadlines_are_waited_for():
+    scheduler = DeadlineScheduler()
+    fired = []
+    scheduler.schedule(0.02, lambda: fired.append(scheduler.elapsed()))
+    assert scheduler.run()
+    assert 0.02 <= fired[0] < 0.1
+
+
+def test_source_is_pulled_lazily():
+    scheduler = DeadlineScheduler(realtime=False, lookahead=0.0)
+    pulled = []
+    fired = []
+
+    def source():
+        for deadline in (0.0, 1.0, 2.0):
+            pulled.append(deadline)
+            yield deadline, [(deadline, fired.append, (deadline,))]
+
+    assert scheduler.run(source())
+    assert fired == [0.0, 1.0, 2.0]
+    # Nothing was queued far ahead of the action being dispatched
+    assert len(scheduler) == 0
+
+
+def test_cancellation_stops_replay():
+    token = CancellationToken()
+    scheduler = DeadlineScheduler(realtime=False)
+    fired = []
+    scheduler.schedule(0.1, fired.append, 1)
+    scheduler.schedule(0.2, token.cancel, 'test')
+    scheduler.schedule(0.3, fired.append, 3)
+    assert not scheduler.run(should_stop=token)
+    assert fired == [1]
+    assert token.cancelled and token.reason == 'test'
+
+
+def test_cancellation_interrupts_wait():
+    token = CancellationToken()
+    token.cancel('early')
+    scheduler = DeadlineScheduler()
+    scheduler.schedule(60.0, lambda: None)
+    assert not scheduler.run(should_stop=token)
+    assert token.wait(0)
+
+
+def test_on_tick_runs_after_each_tick():
+    scheduler = DeadlineScheduler(realtime=False)
+    ticks = []
+    for deadline in (0.1, 0.1, 0.2):
+        scheduler.schedule(deadline, lambda: None)
+    scheduler.run(on_tick=lambda: ticks.append(scheduler.current_deadline))
+    assert ticks == [0.1, 0.2]
+
+
+def test_async_scheduler_runs_on_loop():
+    scheduler = AsyncDeadlineScheduler()
+    fired = []
+    source = [(deadline, [(deadline, fired.append, (deadline,))]) for deadline in (0.0, 0.01, 0.02)]
+    assert asyncio.run(scheduler.run(source))
+    assert fired == [0.0, 0.01, 0.02]
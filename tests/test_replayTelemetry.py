@@ -0,0 +1,29 @@
+import csv
+import json
+
+import pytest
+
+from replayTelemetry import MOVE, PRESS, RELEASE, ReplayTelemetry
+
+
+def test_grows_and_reports():
+    telemetry = ReplayTelemetry(capacity=4)
+    for i in range(10):
+        telemetry.record(PRESS if i % 2 else RELEASE, i * 0.1, i * 0.1 + 0.002, 0.0005)
+    assert len(telemetry) == 10 and telemetry.capacity >= 10
+    report = telemetry.report()
+    assert report['actions'] == 10
+    assert report['lateness_p50'] == pytest.approx(0.002)
+    assert set(report['by_type']) == {'press', 'release'}
+
+
+def test_export(tmp_path):
+    telemetry = ReplayTelemetry()
+    telemetry.record(MOVE, 0.0, 0.001, 0.0001)
+    telemetry.export(str(tmp_path / 'timing.json'))
+    telemetry.export(str(tmp_path / 'timing.csv'))
+    data = json.loads((tmp_path / 'timing.json').read_text())
+    assert data['samples']['type'] == ['move']
+    with open(tmp_path / 'timing.csv', newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0][0] == 'type' and rows[1][0] == 'move'
@@ -0,0 +1,24 @@
+import threading
+
+from replayWorker import ReplayWorker
+
+
+def test_one_replay_at_a_time():
+    worker = ReplayWorker()
+    started = threading.Event()
+    stopped = []
+
+    def replay(name, cancel_token):
+        started.set()
+        cancel_token.wait(5)
+        stopped.append((name, cancel_token.cancelled))
+
+    assert worker.start(replay, 'first')
+    started.wait(1)
+    assert worker.running
+    assert not worker.start(replay, 'second')
+    assert worker.cancel()
+    worker.join(1)
+    assert not worker.running
+    assert stopped == [('first', True)]
+    assert not worker.cancel()
@@ -0,0 +1,49 @@
+import pytest
+
+from conftest import key, move
+from eventStore import EventStore
+from timeIndex import KEYFRAME_INTERVAL, TimeIndex
+
+
+def recording():
+    events = [key('Key.shift', 0.0, 10.0), move(1.0, 2.0, (0, 0), (200, 0),
+                                               [[0.0, 0, 0], [2.0, 200, 0]]),
+              {'key': 'marker', 'label': 'half', 'time': 2.5, 'duration': 0.0}]
+    events += [key('a', 3.0 + i * 0.01, 3.005 + i * 0.01) for i in range(KEYFRAME_INTERVAL * 2)]
+    return events
+
+
+@pytest.mark.parametrize('wrap', [list, EventStore.from_events])
+def test_window_rebuilds_state(wrap):
+    index = TimeIndex(wrap(recording()))
+    window = index.window(2.0)
+    # Mouse mid-move, shift still held
+    first_move = window[0]
+    assert first_move['key'] == 'mouse_move' and first_move['time'] == 0.0
+    assert first_move['start_x'] == 100 and first_move['end_x'] == 200
+    shift = next(event for event in window if event['key'] == 'Key.shift')
+    assert (shift['press_time'], shift['release_time']) == (0.0, 8.0)
+
+
+def test_window_by_marker_and_end():
+    index = TimeIndex(recording())
+    window = index.window('half', 3.1)
+    assert window[0]['key'] == 'mouse_move' and window[0]['duration'] == 0.5
+    shift = next(event for event in window if event['key'] == 'Key.shift')
+    assert shift['release_time'] == 0.6
+    assert sum(1 for event in window if event['key'] == 'a') == 10
+
+
+def test_state_far_into_recording():
+    index = TimeIndex(recording())
+    held, last_move = index.state_at(3.0 + KEYFRAME_INTERVAL * 1.5 * 0.01)
+    assert 0 in held
+    assert last_move == 1
+
+
+def test_unknown_marker_and_empty_window():
+    index = TimeIndex(recording())
+    with pytest.raises(KeyError):
+        index.window('missing')
+    with pytest.raises(ValueError):
+        index.window(2.0, 1.0)
@@ -0,0 +1,247 @@
+"""Time index for seeking inside long recordings.
+
+TimeIndex keeps the start time of every event in a sorted array, so finding
+the first event at or after a time is a bisect. Every KEYFRAME_INTERVAL
+events it also stores a keyframe: the keys and buttons held at that point
+and the last mouse move. The state at any time is then the nearest
+keyframe before it plus at most KEYFRAME_INTERVAL events, so seeking costs
+O(log n) however long the recording is.
+"""
+from array import array
+import bisect
+import heapq
+
+from binaryFormat import (FLAG_RELEASE, KIND_CLICK, KIND_KEY, KIND_MOVE, KIND_RAW,
+                          BinaryRecording, from_us, read_extra)
+from eventStore import KIND_MARKER, EventStore
+from recordingWriter import event_end, event_time
+
+KEYFRAME_INTERVAL = 256
+
+# Per-event kind codes kept in the index
+OTHER = 0  # Scrolls and markers: nothing held afterwards
+HELD = 1  # Keys and clicks: held from press to release
+MOVE = 2
+
+
+def event_kind(event):
+    key = event['key']
+    if key == 'mouse_move':
+        return MOVE
+    if key in ('scroll', 'marker'):
+        return OTHER
+    return HELD
+
+
+def interpolate_position(path, offset):
+    """(x, y) along an [offset, x, y] path at the given offset"""
+    previous = path[0]
+    for vertex in path:
+        if vertex[0] >= offset:
+            span = vertex[0] - previous[0]
+            f = (offset - previous[0]) / span if span > 0 else 1.0
+            return (int(previous[1] + (vertex[1] - previous[1]) * f),
+                    int(previous[2] + (vertex[2] - previous[2]) * f))
+        previous = vertex
+    return previous[1], previous[2]
+
+
+def slice_path(path, start, end):
+    """Part of a path between two offsets, re-based to start at 0"""
+    x, y = interpolate_position(path, start)
+    sliced = [[0.0, x, y]]
+    for offset, vx, vy in path:
+        if start < offset < end:
+            sliced.append([round(offset - start, 6), vx, vy])
+    if end < path[-1][0]:
+        x, y = interpolate_position(path, end)
+        sliced.append([round(end - start, 6), x, y])
+    elif len(sliced) == 1 or sliced[-1][0] < path[-1][0] - start:
+        sliced.append([round(path[-1][0] - start, 6), path[-1][1], path[-1][2]])
+    return sliced
+
+
+class TimeIndex:
+    """Sorted start times, markers and held-state keyframes of a recording"""
+
+    def __init__(self, events):
+        if isinstance(events, EventStore):
+            if not events.is_sorted():
+                events = events.sorted()
+            self.starts = array('d', events.start)
+        elif isinstance(events, BinaryRecording):
+            self.starts = array('d', map(from_us, events.start_us()))
+            if any(a > b for a, b in zip(self.starts, self.starts[1:])):
+                # Random access needs start order
+                events = sorted(events, key=event_time)
+                self.starts = array('d', map(event_time, events))
+        else:
+            events = sorted(events, key=event_time)
+            self.starts = array('d', map(event_time, events))
+        self.events = events
+        self.ends = array('d')
+        self.kinds = array('B')
+        self.markers = {}
+        self.keyframes = []  # (held event indices, last move index) per interval
+
+        held = []  # (end, index) of keys and buttons that may still be down
+        last_move = -1
+        for i, (kind, end, marker) in enumerate(self.scan(events)):
+            if i % KEYFRAME_INTERVAL == 0:
+                if i:
+                    # Held right after the previous event started
+                    boundary = self.starts[i - 1]
+                    while held and held[0][0] <= boundary:
+                        heapq.heappop(held)
+                self.keyframes.append((tuple(index for _, index in held), last_move))
+            self.kinds.append(kind)
+            self.ends.append(end)
+            if kind == HELD:
+                heapq.heappush(held, (end, i))
+            elif kind == MOVE:
+                last_move = i
+            elif marker is not None:
+                self.markers.setdefault(marker['label'], marker['time'])
+        self.duration = max(self.ends) if self.ends else 0.0
+
+    @staticmethod
+    def scan(events):
+        """Yield (kind, end, marker event or None) for every event"""
+        if isinstance(events, EventStore):
+            # Straight from the columns
+            for i, (kind, end) in enumerate(zip(events.kind, events.end)):
+                if kind == KIND_MOVE:
+                    yield MOVE, end, None
+                elif kind in (KIND_KEY, KIND_CLICK):
+                    yield HELD, end, None
+                elif kind == KIND_MARKER:
+                    yield OTHER, end, events[i]
+                elif kind == KIND_RAW:
+                    event = events[i]
+                    yield event_kind(event), end, event if event['key'] == 'marker' else None
+                else:
+                    yield OTHER, end, None
+        elif isinstance(events, BinaryRecording):
+            # Straight from the records, without building event dicts
+            for start_us, fields in events.iter_raw():
+                kind, flags, _, _, hold, duration = fields[:6]
+                # Same arithmetic as decoding the event and calling event_end
+                if kind == KIND_MOVE:
+                    yield MOVE, from_us(start_us) + from_us(duration), None
+                elif kind in (KIND_KEY, KIND_CLICK):
+                    if flags & FLAG_RELEASE:
+                        yield HELD, from_us(start_us + hold), None
+                    else:
+                        yield HELD, from_us(start_us) + from_us(duration), None
+                elif kind == KIND_RAW:
+                    event = read_extra(events.extras, fields[11])
+                    yield event_kind(event), event_end(event), event if event['key'] == 'marker' else None
+                else:
+                    yield OTHER, from_us(start_us), None
+        else:
+            for event in events:
+                yield event_kind(event), event_end(event), event if event['key'] == 'marker' else None
+
+    def __len__(self):
+        return len(self.starts)
+
+    def resolve_time(self, position):
+        """Seconds for a time or marker label"""
+        if isinstance(position, str):
+            if position not in self.markers:
+                raise KeyError(f"No marker named {position!r}")
+            return self.markers[position]
+        return float(position)
+
+    def find(self, t):
+        """Index of the first event starting at or after t"""
+        return bisect.bisect_left(self.starts, t)
+
+    def state_at(self, t):
+        """(held event indices, last move index or -1) just before t"""
+        i = self.find(t)
+        if not self.keyframes:
+            return [], -1
+        held, last_move = self.keyframes[i // KEYFRAME_INTERVAL]
+        held = [index for index in held if self.ends[index] > t]
+        ends, kinds = self.ends, self.kinds
+        for index in range(i // KEYFRAME_INTERVAL * KEYFRAME_INTERVAL, i):
+            if kinds[index] == HELD and ends[index] > t:
+                held.append(index)
+            elif kinds[index] == MOVE:
+                last_move = index
+        return held, last_move
+
+    def window(self, start=None, end=None):
+        """Events between start and end (times or markers), re-based to start at 0.
+
+        The keys, buttons and mouse position at start are rebuilt by events at
+        time 0 instead of replaying everything before it. Anything still held
+        at end is released there and moves crossing it are cut short.
+        """
+        t1 = self.resolve_time(start) if start is not None else 0.0
+        t2 = self.resolve_time(end) if end is not None else float('inf')
+        if t2 <= t1:
+            raise ValueError(f"Replay window ends ({t2}s) before it starts ({t1}s)")
+        held, last_move = self.state_at(t1)
+
+        window = []
+        if last_move >= 0:
+            move = self.events[last_move]
+            offset = t1 - event_time(move)
+            if offset < move['duration']:
+                # Seeking into a movement: keep the rest of it
+                window.append(self.clip_move(move, t1, t2))
+            else:
+                x, y = (interpolate_position(move['path'], offset) if move.get('path')
+                        else (move['end_x'], move['end_y']))
+                window.append({'key': 'mouse_move', 'start_x': x, 'start_y': y, 'end_x': x,
+                               'end_y': y, 'total_distance': 0.0, 'avg_speed': 0.0,
+                               'direction': 0.0, 'duration': 0.0, 'time': 0.0})
+        for index in sorted(held):
+            window.append(self.clip_held(self.events[index], t1, t2))
+        for index in range(self.find(t1), self.find(t2)):
+            event = self.events[index]
+            if self.kinds[index] == MOVE:
+                window.append(self.clip_move(event, t1, t2))
+            elif self.kinds[index] == HELD:
+                window.append(self.clip_held(event, t1, t2))
+            else:
+                event = dict(event)
+                for field in ('press_time', 'release_time', 'time'):
+                    if field in event:
+                        event[field] = round(event[field] - t1, 6)
+                window.append(event)
+        return window
+
+    @staticmethod
+    def clip_held(event, t1, t2):
+        press = max(event_time(event), t1)
+        release = min(event_end(event), t2)
+        event = dict(event)
+        event['press_time'] = round(press - t1, 6)
+        event['release_time'] = round(release - t1, 6)
+        event['duration'] = round(release - press, 6)
+        return event
+
+    @staticmethod
+    def clip_move(event, t1, t2):
+        start = event_time(event)
+        if start >= t1 and start + event['duration'] <= t2:
+            event = dict(event)
+            event['time'] = round(start - t1, 6)
+            return event
+        path = event.get('path') or [[0.0, event['start_x'], event['start_y']],
+                                     [event['duration'], event['end_x'], event['end_y']]]
+        path = slice_path(path, max(t1 - start, 0.0), min(t2 - start, event['duration']))
+        event = dict(event)
+        event.update({
+            'start_x': path[0][1],
+            'start_y': path[0][2],
+            'end_x': path[-1][1],
+            'end_y': path[-1][2],
+            'duration': path[-1][0],
+            'time': round(max(start, t1) - t1, 6),
+            'path': path,
+        })
+        return event